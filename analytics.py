@@ -0,0 +1,311 @@
+"""
+Núcleo analítico do dashboard, importável sem o Streamlit (sem chamadas st.*).
+
+Reúne, com nomes estáveis, as etapas usadas pelo dashboard, pelos benchmarks e por scripts em lote:
+  - load_dataset: leitura e padronização dos CSVs de ingressantes ou egressos;
+  - opções dos filtros globais (nível de ensino, anos, sexo e a cascata unidade > curso);
+  - filter_rows: aplicação dos filtros a um DataFrame;
+  - paginate_dataframe: página ordenada de uma tabela de dados filtrados;
+  - build_count_cube / rollup_count_cube e sunburst_nodes: agregações dos gráficos (definidas em figures.py,
+    junto das figuras que as consomem, e reexportadas aqui);
+  - classification_dataset, regression_dataset, regression_split e train_duration_model: preparação
+    dos dados, divisão treino/teste e treino dos modelos de desempenho e de duração da graduação.
+
+O dashboard apenas coloca essas funções em cache e exibe os resultados. Exemplo de uso em lote:
+
+    import analytics
+    egressos, _ = analytics.load_dataset('egressos')
+    filtrados = analytics.filter_rows(egressos, {'anos': [2018, 2022], 'niveis_ensino': ['GRADUAÇÃO']})
+    bundle, X_test, y_test = analytics.train_duration_model(filtrados)
+"""
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_loading
+from data_loading import DATASET_FOLDER
+from figures import COMPARATIVO_DIMENSOES, build_count_cube, rollup_count_cube, sunburst_nodes
+from filters import apply_sidebar_filters
+from lazy_imports import lazy_import
+from perf_timing import timed
+from ml_pipeline import REGRESSION_BACKENDS, train_regression_bundle
+
+__all__ = [
+    'DATASETS', 'YEAR_MIN', 'YEAR_MAX', 'SEX_ORDER', 'COMPARATIVO_DIMENSOES', 'COLUNAS_OCULTAS_TABELA',
+    'FEATURES_CLASSIFICACAO', 'TARGET_CLASSIFICACAO', 'FEATURES_REGRESSAO', 'TARGET_REGRESSAO',
+    'CLASSIFICATION_SPLIT', 'REGRESSION_SPLIT',
+    'load_dataset',
+    'nivel_ensino_options', 'year_bounds', 'sex_options', 'unidade_options', 'course_options',
+    'filter_rows', 'sort_order', 'paginate_dataframe',
+    'build_count_cube', 'rollup_count_cube', 'sunburst_nodes',
+    'classification_dataset', 'regression_dataset', 'stable_train_test_split', 'regression_split',
+    'train_duration_model',
+]
+
+logger = logging.getLogger(__name__)
+
+# sklearn só é carregado na preparação dos modelos (ver lazy_imports)
+model_selection = lazy_import('sklearn.model_selection')
+preprocessing = lazy_import('sklearn.preprocessing')
+
+DATASETS = {
+    'ingressantes': data_loading.load_and_preprocess_ingressantes_data,
+    'egressos': data_loading.load_and_preprocess_egressos_data,
+}
+
+# Intervalo de anos oferecido pelo slider global
+YEAR_MIN, YEAR_MAX = 2014, 2024
+# Ordem de exibição dos códigos de sexo (os demais vêm depois, em ordem alfabética)
+SEX_ORDER = ['M', 'F', 'INDEFINIDO']
+
+# Features, alvos e divisões treino/teste dos modelos
+FEATURES_CLASSIFICACAO = ['nivel_ensino', 'sexo', 'nome_curso', 'nome_unidade']
+TARGET_CLASSIFICACAO = 'desempenho'
+FEATURES_REGRESSAO = ['nivel_ensino', 'sexo', 'nome_curso', 'nome_unidade', 'ano_ingresso']
+TARGET_REGRESSAO = 'total_periodos'
+CLASSIFICATION_SPLIT = {'test_size': 0.2, 'random_state': 42}
+# A divisão do modelo de duração é estável por aluno (ver regression_split): com arquivos de anos novos,
+# as linhas já vistas continuam do mesmo lado e a atualização incremental não avalia no próprio treino
+REGRESSION_SPLIT = {'test_size': 0.2, 'random_state': 42, 'id_column': 'matricula'}
+# Resolução da fração de teste na divisão estável (a linha vai para o teste se hash % SPLIT_BUCKETS < fração)
+SPLIT_BUCKETS = 10_000
+
+
+# --- Dados ---
+def load_dataset(kind, dataset_folder=DATASET_FOLDER):
+    """
+    Carrega e padroniza os CSVs de 'kind' ('ingressantes' ou 'egressos') em '<dataset_folder>/<kind>'.
+    Retorna o DataFrame e a lista de mensagens (sucesso/erro/aviso) da leitura.
+    """
+    if kind not in DATASETS:
+        raise ValueError(f"Conjunto de dados desconhecido: {kind!r} (esperado um de {list(DATASETS)}).")
+    return DATASETS[kind](os.path.join(dataset_folder, kind))
+
+
+# --- Opções dos filtros globais ---
+# Cada função recebe a lista de DataFrames (ingressantes e egressos) cujas opções são combinadas.
+def _unique_values(frames, column):
+    values = set()
+    for df in frames:
+        if column in df.columns:
+            values.update(df[column].unique())
+    return values
+
+
+def nivel_ensino_options(frames):
+    """Níveis de ensino presentes nos dados, em ordem alfabética."""
+    return sorted(_unique_values(frames, 'nivel_ensino'))
+
+
+def year_bounds(frames):
+    """(menor ano, maior ano, seleção padrão) do slider, limitados a [YEAR_MIN, YEAR_MAX]."""
+    # DataFrames vazios contam como YEAR_MIN/YEAR_MAX
+    min_available = min(df['ano'].min() if not df.empty else YEAR_MIN for df in frames)
+    max_available = max(df['ano'].max() if not df.empty else YEAR_MAX for df in frames)
+    min_year, max_year = max(YEAR_MIN, min_available), min(YEAR_MAX, max_available)
+    default = (min_year, max_year) if min_year <= max_year else (YEAR_MIN, YEAR_MAX)
+    return min_year, max_year, default
+
+
+def sex_options(frames):
+    """Códigos de sexo presentes nos dados: M, F e INDEFINIDO primeiro, depois os demais."""
+    values = _unique_values(frames, 'sexo')
+    return [s for s in SEX_ORDER if s in values] + sorted(values - set(SEX_ORDER))
+
+
+def _cascade_masks(frames, niveis_ensino, years, unidades=None):
+    """
+    Linhas de cada DataFrame que respeitam os níveis de ensino e o intervalo de anos (e as unidades, se
+    informadas). Sem níveis (ou unidades) selecionados, nenhuma linha é mantida, como na sidebar.
+    DataFrames sem a coluna de um filtro ficam de fora; o filtro de ano só é ignorado se nenhum tiver 'ano'.
+    """
+    if not niveis_ensino or (unidades is not None and not unidades):
+        return []
+    has_year = any('ano' in df.columns for df in frames)
+    if not has_year:
+        logger.warning("Coluna 'ano' não encontrada nos dados para as opções de unidade e curso; "
+                       "as opções podem ser imprecisas.")
+    selected = []
+    for df in frames:
+        if df.empty or 'nivel_ensino' not in df.columns:
+            continue
+        mask = df['nivel_ensino'].isin(niveis_ensino)
+        if has_year and years:
+            if 'ano' not in df.columns:
+                continue
+            mask &= df['ano'].between(years[0], years[1])
+        if unidades is not None:
+            if 'nome_unidade' not in df.columns:
+                continue
+            mask &= df['nome_unidade'].isin(unidades)
+        selected.append((df, mask))
+    return selected
+
+
+def _cascade_options(selected, column):
+    values = set()
+    for df, mask in selected:
+        if column in df.columns:
+            values.update(df.loc[mask, column].unique())
+    return sorted(values)
+
+
+def unidade_options(frames, niveis_ensino, years):
+    """Unidades com alunos nos níveis de ensino e anos selecionados, em ordem alfabética."""
+    return _cascade_options(_cascade_masks(frames, niveis_ensino, years), 'nome_unidade')
+
+
+def course_options(frames, niveis_ensino, years, unidades):
+    """Cursos com alunos nos níveis de ensino, anos e unidades selecionados, em ordem alfabética."""
+    return _cascade_options(_cascade_masks(frames, niveis_ensino, years, unidades), 'nome_curso')
+
+
+# --- Filtros ---
+def filter_rows(df, filter_state):
+    """
+    Aplica os filtros globais a 'df'. 'filter_state' tem as chaves 'anos' ([início, fim]) e, opcionalmente,
+    'sexos', 'cursos', 'niveis_ensino' e 'unidades' (listas; ausentes ou vazias não filtram, exceto
+    'niveis_ensino': sem níveis, o resultado é vazio, como na sidebar). Sem 'niveis_ensino' no estado,
+    todos os níveis presentes em 'df' são mantidos.
+    """
+    niveis_ensino = filter_state.get('niveis_ensino')
+    if niveis_ensino is None and 'nivel_ensino' in df.columns:
+        niveis_ensino = list(df['nivel_ensino'].unique())
+    return apply_sidebar_filters(df, filter_state['anos'], filter_state.get('sexos') or [],
+                                 filter_state.get('cursos') or [], niveis_ensino or [],
+                                 filter_state.get('unidades') or [])
+
+
+# --- Tabela paginada ---
+# Colunas não exibidas nas tabelas de dados filtrados
+COLUNAS_OCULTAS_TABELA = ['nome_discente']
+
+
+@timed('tabela_ordenacao', rows_arg=0)
+def sort_order(df, sort_column, ascending=True):
+    """
+    Posições das linhas de 'df' ordenadas por 'sort_column' (textos comparados como str). Empates seguem
+    a posição original da linha nas duas direções, de modo que as páginas formam uma partição das linhas:
+    cada linha aparece em exatamente uma.
+    """
+    valores = df[sort_column]
+    if valores.dtype == 'object':
+        valores = valores.astype(str)
+    valores = valores.to_numpy()
+
+    # Ordem total (valor, posição): a última chave do lexsort é a principal. Na ordem decrescente,
+    # a posição entra negada para que, depois de inverter, os empates fiquem em ordem crescente de posição
+    posicoes = np.arange(len(df))
+    if ascending:
+        return np.lexsort((posicoes, valores))
+    return np.lexsort((-posicoes, valores))[::-1]
+
+
+@timed('tabela_paginada', rows_arg=0)
+def paginate_dataframe(df, page_size, page_number, sort_column=None, ascending=True, hidden_columns=COLUNAS_OCULTAS_TABELA,
+                       order=None):
+    """
+    Retorna apenas a página solicitada de um DataFrame, sem copiá-lo por inteiro.
+    A ordenação é resolvida sobre os índices posicionais (sort_order), e somente as linhas e colunas
+    visíveis da página são materializadas. 'order' é a ordem já calculada por sort_order para
+    (df, sort_column, ascending), reaproveitada entre páginas. Retorna a página e o número total de páginas.
+    """
+    total_rows = len(df)
+    total_pages = max(1, -(-total_rows // page_size))
+    page_number = min(max(1, page_number), total_pages)
+    visible_columns = [i for i, col in enumerate(df.columns) if col not in hidden_columns]
+
+    start = (page_number - 1) * page_size
+    end = min(start + page_size, total_rows)
+    if start >= end:
+        return df.iloc[0:0, visible_columns], total_pages
+
+    if sort_column and sort_column in df.columns:
+        if order is None:
+            order = sort_order(df, sort_column, ascending)
+        positions = order[start:end]
+    else:
+        positions = np.arange(start, end)
+
+    return df.iloc[positions, visible_columns], total_pages
+
+
+# --- Modelos ---
+def classification_dataset(egressos, threshold, features=FEATURES_CLASSIFICACAO):
+    """
+    Dados do modelo de desempenho: alvo 'Curto' (total_periodos <= threshold) ou 'Longo' e features
+    categóricas codificadas com um LabelEncoder por coluna. Retorna (X codificado, y, encoders).
+    """
+    missing = [f for f in features if f not in egressos.columns]
+    if missing:
+        raise KeyError(f"Features ausentes nos dados de egressos: {', '.join(missing)}")
+    y = pd.Series(np.where(egressos['total_periodos'] <= threshold, 'Curto', 'Longo'), index=egressos.index,
+                  name=TARGET_CLASSIFICACAO)
+    encoders = {}
+    X_codes = pd.DataFrame()
+    for col in features:
+        if egressos[col].dtype == 'object':
+            encoders[col] = preprocessing.LabelEncoder()
+            X_codes[col] = encoders[col].fit_transform(egressos[col])
+        else:
+            X_codes[col] = egressos[col].to_numpy()
+    return X_codes, y, encoders
+
+
+def regression_dataset(egressos, features=FEATURES_REGRESSAO, target=TARGET_REGRESSAO):
+    """
+    Dados do modelo de duração: linhas com alvo preenchido e 'ano_ingresso' numérico (valores inválidos
+    recebem a média). Retorna (X, y); ambos vazios se nenhuma linha tiver o alvo.
+    """
+    df = egressos[features + [target]].dropna(subset=[target]).copy()
+    if 'ano_ingresso' in df.columns:
+        ano_ingresso = pd.to_numeric(df['ano_ingresso'], errors='coerce')
+        df['ano_ingresso'] = ano_ingresso.fillna(ano_ingresso.mean())
+    return df[features], df[target]
+
+
+def stable_train_test_split(X, y, ids, test_size=0.2, random_state=42):
+    """
+    Divisão treino/teste determinística por linha: a linha vai para o teste conforme o hash do seu
+    identificador em 'ids' (combinado com 'random_state'), independentemente das demais linhas.
+    Acrescentar ou remover linhas não muda o lado das outras, e linhas com o mesmo identificador
+    ficam juntas. Retorna (X_train, X_test, y_train, y_test) na ordem original das linhas.
+    """
+    keys = f"{random_state}:" + pd.Series(ids, index=X.index).astype(str)
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    in_test = hashes % SPLIT_BUCKETS < round(test_size * SPLIT_BUCKETS)
+    return X[~in_test], X[in_test], y[~in_test], y[in_test]
+
+
+def regression_split(egressos, X, y, split=REGRESSION_SPLIT):
+    """
+    Divisão treino/teste dos dados de regression_dataset, estável por aluno: o identificador é a coluna
+    split['id_column'] (matrícula) das linhas correspondentes de 'egressos'. Sem essa coluna nos dados,
+    recorre ao train_test_split aleatório.
+    """
+    split = dict(split)
+    id_column = split.pop('id_column', None)
+    if id_column is None or id_column not in egressos.columns:
+        if id_column is not None:
+            logger.warning("Coluna '%s' ausente: divisão treino/teste aleatória (não estável entre atualizações).",
+                           id_column)
+        return model_selection.train_test_split(X, y, **split)
+    return stable_train_test_split(X, y, egressos.loc[X.index, id_column], **split)
+
+
+def train_duration_model(egressos, backend='random_forest_regressor', params=None, features=FEATURES_REGRESSAO,
+                         split=REGRESSION_SPLIT):
+    """
+    Treina o modelo de duração da graduação (total de períodos) sobre os egressos informados, com a mesma
+    preparação e divisão treino/teste do dashboard. 'params' padrão: os do backend em REGRESSION_BACKENDS.
+    Retorna (pacote do modelo, X de teste, y de teste); o pacote é usado com ml_pipeline.encode_for_model.
+    """
+    X, y = regression_dataset(egressos, features)
+    if X.empty:
+        raise ValueError("Não há egressos com 'total_periodos' para treinar o modelo de duração.")
+    X_train, X_test, y_train, y_test = regression_split(egressos, X, y, split)
+    if params is None:
+        params = REGRESSION_BACKENDS[backend]['params']
+    return train_regression_bundle(backend, params, X_train, y_train), X_test, y_test
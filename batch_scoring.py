@@ -0,0 +1,130 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from data_loading import standardize_student_columns
+from ml_pipeline import encode_for_model
+
+# Número de linhas lidas, codificadas e preditas de cada vez
+BATCH_CHUNK_ROWS = 20_000
+
+# Colunas acrescentadas ao arquivo pontuado
+COLUNA_DESEMPENHO = 'desempenho_previsto'
+COLUNA_PERIODOS = 'periodos_estimados'
+COLUNA_OBSERVACAO = 'observacao_predicao'
+
+
+def read_student_chunks(source, chunksize=BATCH_CHUNK_ROWS):
+    """
+    Lê um CSV no formato de dataset/ingressantes (separado por ';') em blocos de 'chunksize' linhas.
+    Os valores são lidos como texto, sem conversão, para que o arquivo devolvido preserve o original.
+    """
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return pd.read_csv(source, sep=';', dtype=str, keep_default_na=False, chunksize=chunksize)
+
+
+def prepare_features(chunk):
+    """Cópia do bloco com as colunas das features padronizadas pelas mesmas regras dos carregadores."""
+    features = chunk.copy()
+    features.columns = features.columns.str.lower()
+    standardize_student_columns(features, 'predição em lote')
+    if 'ano_ingresso' in features.columns:
+        features['ano_ingresso'] = pd.to_numeric(features['ano_ingresso'], errors='coerce')
+    else:
+        features['ano_ingresso'] = np.nan
+    return features
+
+
+def known_categories(bundle):
+    """{feature categórica: categorias vistas no treino} de um pacote do registro."""
+    if isinstance(bundle['encoders'], dict):
+        # Classificação: um LabelEncoder por coluna
+        return {col: encoder.classes_ for col, encoder in bundle['encoders'].items()}
+    # Regressão: ColumnTransformer com o encoder categórico em 'categoricas'
+    categorical = bundle['encoders'].named_transformers_['categoricas']
+    columns = bundle['encoders'].transformers_[0][2]
+    return dict(zip(columns, categorical.categories_))
+
+
+def invalid_inputs(features, bundle):
+    """
+    Máscara (linhas × features do modelo) dos valores que o modelo não sabe pontuar:
+    categorias não vistas no treino e números ausentes ou inválidos.
+    """
+    categories = known_categories(bundle)
+    return pd.DataFrame({
+        col: ~features[col].isin(categories[col]) if col in categories else features[col].isna()
+        for col in bundle['feature_columns']
+    }, index=features.index)
+
+
+def score_chunk(chunk, classification_bundle=None, regression_bundle=None):
+    """
+    Pontua um bloco inteiro de uma vez com cada modelo informado e devolve o bloco original
+    acrescido das colunas de predição. Linhas com valores que o modelo não conhece ficam sem
+    predição, e as features responsáveis são listadas em COLUNA_OBSERVACAO.
+    """
+    features = prepare_features(chunk)
+    scored = chunk.copy()
+    problems = {}  # feature -> máscara das linhas com valor inválido para algum dos modelos
+
+    if classification_bundle is not None:
+        invalid = invalid_inputs(features, classification_bundle)
+        valid = ~invalid.any(axis=1)
+        model = classification_bundle['model']
+        scored[COLUNA_DESEMPENHO] = ''
+        for cls in model.classes_:
+            scored[f"probabilidade_{str(cls).lower()}"] = np.nan
+        if valid.any():
+            # Códigos do LabelEncoder calculados para a coluna inteira (posição da categoria em classes_)
+            codes = pd.DataFrame({
+                col: pd.Categorical(features.loc[valid, col], categories=encoder.classes_).codes
+                for col, encoder in classification_bundle['encoders'].items()
+            }, index=features.index[valid])
+            proba = model.predict_proba(codes[classification_bundle['feature_columns']])
+            scored.loc[valid, COLUNA_DESEMPENHO] = model.classes_[proba.argmax(axis=1)]
+            for i, cls in enumerate(model.classes_):
+                scored.loc[valid, f"probabilidade_{str(cls).lower()}"] = proba[:, i].round(4)
+        for col in invalid.columns:
+            problems[col] = problems.get(col, False) | invalid[col]
+
+    if regression_bundle is not None:
+        invalid = invalid_inputs(features, regression_bundle)
+        valid = ~invalid.any(axis=1)
+        scored[COLUNA_PERIODOS] = np.nan
+        if valid.any():
+            X = features.loc[valid, regression_bundle['feature_columns']]
+            scored.loc[valid, COLUNA_PERIODOS] = regression_bundle['model'].predict(
+                encode_for_model(regression_bundle, X)
+            ).round(1)
+        for col in invalid.columns:
+            problems[col] = problems.get(col, False) | invalid[col]
+
+    if problems:
+        problems = pd.DataFrame(problems)
+        # Lista, por linha, os nomes das features marcadas (produto das máscaras pelos nomes)
+        notes = problems.dot(problems.columns + ', ').str.rstrip(', ')
+        scored[COLUNA_OBSERVACAO] = np.where(notes != '', 'valor inválido ou não visto no treino: ' + notes, '')
+    return scored
+
+
+def score_csv(source, classification_bundle=None, regression_bundle=None, chunksize=BATCH_CHUNK_ROWS, output=None):
+    """
+    Pontua o CSV enviado bloco a bloco, escrevendo cada bloco pontuado (separado por ';') em 'output'
+    (arquivo binário; por padrão um buffer em memória) assim que fica pronto; apenas um bloco fica em
+    memória como DataFrame por vez. Retorna 'output' posicionado no início, pronto para download.
+
+    O buffer padrão guarda o arquivo pontuado inteiro em memória. No dashboard isso não aumenta o pico:
+    o st.download_button lê o arquivo todo e o mantém em memória para servi-lo, qualquer que seja a origem.
+    Para arquivos maiores que a memória disponível, use um arquivo em disco (ex.: tempfile.TemporaryFile()).
+    """
+    if output is None:
+        output = io.BytesIO()
+    for i, chunk in enumerate(read_student_chunks(source, chunksize)):
+        score_chunk(chunk, classification_bundle, regression_bundle).to_csv(
+            output, sep=';', index=False, header=(i == 0), encoding='utf-8'
+        )
+    output.seek(0)
+    return output
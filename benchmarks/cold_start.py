@@ -0,0 +1,143 @@
+"""
+Partida a frio do dashboard: custo das importações e tempo até a primeira pintura.
+
+Duas medidas, cada uma em processos novos (sem módulos já carregados nem caches do Streamlit):
+  - perfil de importação: 'python -X importtime' importando os mesmos módulos que dashboard.py,
+    com o tempo gasto nos módulos de cada pacote de nível superior (pandas, sklearn, plotly...);
+  - primeira pintura: inicia 'streamlit run dashboard.py' em uma porta livre, abre uma sessão pelo
+    websocket do navegador e mede, a partir do envio do primeiro rerun, o tempo até o primeiro elemento
+    desenhado ('primeira_pintura_s') e até o fim do rerun ('primeiro_rerun_s'). O tempo entre iniciar o
+    processo e o endpoint de saúde responder é 'servidor_pronto_s'.
+
+Com --comparar, cada medida é feita com as importações sob demanda ligadas e desligadas
+(DASHBOARD_LAZY_IMPORTS=1 e 0). As abas de predição só são executadas quando abertas, e a sessão medida fica
+na aba inicial: o primeiro rerun completo não importa o sklearn nem carrega os modelos. O plotly continua
+sendo carregado no primeiro rerun, pelos gráficos da aba inicial.
+
+Como o teste de carga (benchmarks.load_test), requer o pacote websockets (pip install websockets).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.cold_start [--repeticoes 3] [--comparar] [--json resultados.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.load_test import REPO_ROOT, RERUN_TIMEOUT, Session, connect_session, free_port, start_server
+
+# Módulos importados no topo de dashboard.py (a própria página não é importável fora do Streamlit)
+DASHBOARD_IMPORTS = ['streamlit', 'pandas', 'numpy', 'PIL.Image', 'analytics', 'data_loading', 'memory_profiling',
+                     'metrics_export', 'model_evaluation', 'perf_timing', 'model_registry', 'training_service',
+                     'batch_scoring', 'figures', 'lazy_imports', 'ml_pipeline']
+REPETITIONS = 3
+TOP_PACKAGES = 15
+
+
+def _environment(lazy_imports):
+    env = dict(os.environ)
+    env['DASHBOARD_LAZY_IMPORTS'] = '1' if lazy_imports else '0'
+    return env
+
+
+def import_profile(lazy_imports=True, modules=DASHBOARD_IMPORTS):
+    """
+    Importa 'modules' em um processo novo com -X importtime e retorna (segundos totais, tabela com o tempo
+    gasto nos módulos de cada pacote de nível superior, em ms, do mais caro ao mais barato).
+    """
+    code = f"import {', '.join(modules)}"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=REPO_ROOT,
+                            env=_environment(lazy_imports), capture_output=True, text=True, check=True)
+    # Linhas "import time: próprio (us) | acumulado (us) | módulo"; somar o tempo próprio atribui a cada pacote
+    # o que foi gasto nos seus módulos, mesmo quando ele é importado por outro (ex.: sklearn por analytics)
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(own) / 1000
+    table = pd.DataFrame(sorted(packages.items(), key=lambda item: item[1], reverse=True),
+                         columns=['pacote', 'ms'])
+    return table['ms'].sum() / 1000, table
+
+
+def first_paint(lazy_imports=True):
+    """Inicia um servidor novo e mede a primeira sessão; retorna um dicionário com os tempos (s)."""
+    started = time.perf_counter()
+    process, url = start_server(free_port(), env=_environment(lazy_imports))
+    try:
+        ready = time.perf_counter() - started
+        with connect_session(url) as websocket:
+            session = Session(websocket)
+            seconds, error = session.rerun(timeout=RERUN_TIMEOUT)
+        return {'servidor_pronto_s': ready, 'primeira_pintura_s': session.first_element_seconds,
+                'primeiro_rerun_s': seconds, 'erro': error}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run_cold_start(variants, repetitions):
+    """Mede cada variante ({rótulo: importações sob demanda?}) 'repetitions' vezes."""
+    imports, paints = [], []
+    for label, lazy_imports in variants.items():
+        for repetition in range(repetitions):
+            seconds, table = import_profile(lazy_imports)
+            imports.append({'variante': label, 'repeticao': repetition, 'importacao_s': seconds,
+                            'pacotes': table.to_dict('records')})
+            paint = first_paint(lazy_imports)
+            paints.append({'variante': label, 'repeticao': repetition, **paint})
+            print(f"  {label} {repetition + 1}/{repetitions}: importação {seconds:.2f} s, primeira pintura "
+                  f"{paint['primeira_pintura_s'] or float('nan'):.2f} s, primeiro rerun {paint['primeiro_rerun_s']:.2f} s",
+                  file=sys.stderr)
+    return imports, paints
+
+
+def summary_table(imports, paints):
+    """Mediana de cada medida por variante."""
+    merged = pd.DataFrame(paints).drop(columns='erro').merge(
+        pd.DataFrame(imports)[['variante', 'repeticao', 'importacao_s']], on=['variante', 'repeticao'])
+    return merged.drop(columns='repeticao').groupby('variante', sort=False).median().reset_index()
+
+
+def slowest_packages(imports, top=TOP_PACKAGES):
+    """Pacotes com maior tempo de importação (mediana entre as repetições), por variante."""
+    rows = [{'variante': record['variante'], **package} for record in imports for package in record['pacotes']]
+    table = pd.DataFrame(rows).groupby(['variante', 'pacote'], sort=False)['ms'].median().reset_index()
+    return table.sort_values('ms', ascending=False).groupby('variante', sort=False).head(top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticoes', type=int, default=REPETITIONS)
+    parser.add_argument('--comparar', action='store_true',
+                        help="Mede também com as importações sob demanda desligadas (DASHBOARD_LAZY_IMPORTS=0).")
+    parser.add_argument('--json', help="Arquivo onde salvar os resultados em JSON.")
+    args = parser.parse_args()
+
+    variants = {'sob_demanda': True, 'imediata': False} if args.comparar else {'sob_demanda': True}
+    imports, paints = run_cold_start(variants, args.repeticoes)
+    summary = summary_table(imports, paints)
+    packages = slowest_packages(imports)
+
+    print("Partida a frio (mediana, s):")
+    print(summary.round(3).to_string(index=False))
+    print("\nPacotes mais caros de importar (ms):")
+    print(packages.round(1).to_string(index=False))
+    errors = [paint for paint in paints if paint['erro']]
+    if errors:
+        print(f"\nO primeiro rerun exibiu uma exceção em {len(errors)} execução(ões): {errors[0]['erro']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'resumo': summary.to_dict('records'), 'pacotes': packages.to_dict('records'),
+                       'primeira_pintura': paints, 'importacao': imports}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Calibração do teste de drift da atualização incremental do modelo de regressão.
+
+Para cada ano N, simula a chegada dos arquivos de N a um modelo treinado com os anos anteriores:
+  - aplica o teste de drift (ml_pipeline.check_drift) às linhas de treino do ano N e registra as medidas
+    (fração de dados novos, linhas com categorias não vistas, PSI por feature) e a decisão;
+  - treina a atualização incremental (como o dashboard: árvores novas com as linhas de N e uma amostra
+    das antigas) e o treino completo com todos os anos até N;
+  - compara o RMSE do modelo base, do incremental e do completo no holdout estável por matrícula
+    (analytics.regression_split), nas linhas do ano N e em todas as linhas até N.
+
+Os limites DRIFT_* de ml_pipeline estão bem calibrados quando o teste pede o treino completo nos anos em
+que a atualização incremental perde qualidade ('perda_incremental', RMSE relativo nas linhas do ano novo).
+
+Ao final, compara as métricas exibidas pela aba de regressão (MSE, RMSE e R² do modelo com todos os anos)
+na divisão aleatória usada antes (train_test_split) e na divisão estável por matrícula usada agora.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.drift_calibration [--anos 2018 2023] [--backend random_forest_regressor] [--json resultados.json]
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+
+from analytics import FEATURES_REGRESSAO, REGRESSION_SPLIT, load_dataset, regression_dataset, regression_split
+from data_loading import DATASET_FOLDER
+from ml_pipeline import (INCREMENTAL_BACKENDS, INCREMENTAL_REPLAY_RATIO, REGRESSION_BACKENDS, check_drift,
+                         encode_for_model, train_regression_bundle, update_regression_bundle)
+
+
+def rmse(bundle, X, y):
+    y_pred = bundle['model'].predict(encode_for_model(bundle, X))
+    return float(np.sqrt(np.mean((y_pred - y.to_numpy()) ** 2)))
+
+
+def calibrate_year(X, y, years, is_test, new_year, backend, params):
+    """Resultado da chegada de 'new_year' a um modelo treinado com os anos anteriores (um dicionário)."""
+    old, new = (years < new_year).to_numpy(), (years == new_year).to_numpy()
+    X_old, y_old = X[old & ~is_test], y[old & ~is_test]
+    X_new, y_new = X[new & ~is_test], y[new & ~is_test]
+    base = train_regression_bundle(backend, params, X_old, y_old)
+    drift = check_drift(base['profile'], X_new, y_new)
+
+    n_replay = min(len(X_old), int(np.ceil(INCREMENTAL_REPLAY_RATIO * len(X_new))))
+    replay = X_old.sample(n=n_replay, random_state=42).index
+    start = time.perf_counter()
+    incremental = update_regression_bundle(base, X_new, y_new, X_old.loc[replay], y_old.loc[replay])
+    incremental_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    full = train_regression_bundle(backend, params, X[(old | new) & ~is_test], y[(old | new) & ~is_test])
+    full_seconds = time.perf_counter() - start
+
+    result = {
+        'ano': int(new_year),
+        'fracao_nova': round(drift['new_fraction'], 3),
+        'linhas_nao_vistas': round(drift['unseen_share'], 3),
+        **{f"psi_{col}": round(value, 3) for col, value in drift['psi'].items()},
+        'retreino': drift['retrain'],
+        'motivos': '; '.join(drift['reasons']),
+        'tempo_incremental_s': round(incremental_seconds, 2),
+        'tempo_completo_s': round(full_seconds, 2),
+    }
+    for scope, mask in (('ano_novo', new & is_test), ('todos', (old | new) & is_test)):
+        for label, bundle in (('base', base), ('incremental', incremental), ('completo', full)):
+            result[f"rmse_{label}_{scope}"] = round(rmse(bundle, X[mask], y[mask]), 4)
+    result['perda_incremental'] = round(result['rmse_incremental_ano_novo'] / result['rmse_completo_ano_novo'] - 1, 3)
+    return result
+
+
+def compare_splits(egressos, X, y, backend, params):
+    """Métricas do modelo com todos os anos na divisão aleatória e na estável por matrícula (DataFrame)."""
+    random_split = {name: value for name, value in REGRESSION_SPLIT.items() if name != 'id_column'}
+    rows = []
+    for label, (X_train, X_test, y_train, y_test) in (
+            ('aleatoria', train_test_split(X, y, **random_split)),
+            ('estavel_por_matricula', regression_split(egressos, X, y))):
+        bundle = train_regression_bundle(backend, params, X_train, y_train)
+        y_pred = bundle['model'].predict(encode_for_model(bundle, X_test))
+        mse = mean_squared_error(y_test, y_pred)
+        rows.append({'divisao': label, 'linhas_teste': len(X_test), 'mse': round(mse, 4),
+                     'rmse': round(float(np.sqrt(mse)), 4), 'r2': round(r2_score(y_test, y_pred), 4)})
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default=DATASET_FOLDER, help="Pasta com as subpastas de ingressantes e egressos.")
+    parser.add_argument('--anos', type=int, nargs=2, default=[2018, 2023], metavar=('INICIO', 'FIM'),
+                        help="Anos novos simulados (intervalo fechado).")
+    parser.add_argument('--backend', default=INCREMENTAL_BACKENDS[0], choices=INCREMENTAL_BACKENDS)
+    parser.add_argument('--json', help="Arquivo onde salvar os resultados em JSON.")
+    args = parser.parse_args()
+
+    egressos, _ = load_dataset('egressos', args.dataset)
+    X, y = regression_dataset(egressos, FEATURES_REGRESSAO)
+    _, X_test, _, _ = regression_split(egressos, X, y)
+    is_test = X.index.isin(X_test.index)
+    years = egressos.loc[X.index, 'ano']
+    params = REGRESSION_BACKENDS[args.backend]['params']
+
+    results = []
+    for new_year in range(args.anos[0], args.anos[1] + 1):
+        if not (years == new_year).any() or not (years < new_year).any():
+            continue
+        results.append(calibrate_year(X, y, years, is_test, new_year, args.backend, params))
+        print(f"  {new_year}: retreino={results[-1]['retreino']}, "
+              f"perda incremental={results[-1]['perda_incremental']:.1%}", file=sys.stderr)
+
+    print(pd.DataFrame(results).drop(columns='motivos').to_string(index=False))
+    splits = compare_splits(egressos, X, y, args.backend, params)
+    print("\nMétricas da aba de regressão (todos os anos) em cada divisão treino/teste:")
+    print(splits.to_string(index=False))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'anos': results, 'divisoes': splits.to_dict('records')}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
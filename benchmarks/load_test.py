@@ -0,0 +1,479 @@
+"""
+Teste de carga do dashboard com várias sessões simultâneas contra um servidor Streamlit local.
+
+Inicia 'streamlit run dashboard.py' em uma porta livre (ou usa um servidor já em execução, com --url)
+e abre N sessões pelo mesmo websocket usado pelo navegador (/_stcore/stream). Cada sessão faz o
+primeiro rerun e, depois, uma sequência de interações aleatórias nos filtros globais (intervalo de
+anos, unidade, sexo, nível de ensino e restauração dos filtros), com um tempo de "pensar" entre elas.
+Cada interação envia o estado dos widgets como o navegador faria e é medida até o fim do rerun.
+
+Durante o teste, o uso de CPU e a memória residente do servidor (e dos processos filhos) são
+amostrados de /proc. O relatório traz:
+  - vazão (reruns concluídos por segundo) e percentis da latência, no total e por interação;
+  - saturação de CPU: tempo de CPU do servidor / (tempo decorrido x número de CPUs), média e pico;
+  - memória por sessão: (pico de memória durante o teste - memória após o aquecimento) / N.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.load_test [--sessoes 10] [--duracao 120] [--pensar 2]
+                                   [--url http://127.0.0.1:8501] [--json resultados.json]
+
+Para medir em escala maior, aponte DASHBOARD_DATASET para um dataset gerado por synthetic_data.py
+(a variável é repassada ao servidor iniciado pelo script). As sessões simuladas ficam na aba inicial, e as
+abas de predição só são executadas quando abertas: os reruns medidos não incluem os modelos. Os fragmentos
+com 'run_every' (progresso dos treinos) não são reexecutados pelas sessões simuladas: isso é feito pelo navegador.
+Requer Linux para as medidas de CPU e memória (/proc) e o pacote websockets (pip install websockets),
+que não faz parte de requirements.txt.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import numpy as np
+import pandas as pd
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+# O cliente websocket só é usado pelos benchmarks e não está em requirements.txt
+try:
+    from websockets.sync.client import connect
+except ImportError:
+    sys.exit("Este benchmark requer o pacote websockets (>= 11, com o cliente síncrono): pip install websockets")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_SCRIPT = os.path.join(REPO_ROOT, "dashboard.py")
+SESSIONS = 10
+DURATION = 120
+THINK_TIME = 2.0
+# Tempo máximo de um rerun, da subida do servidor e do aquecimento (carga dos dados e modelos), em s
+RERUN_TIMEOUT = 600
+STARTUP_TIMEOUT = 120
+SAMPLE_INTERVAL = 0.5
+PERCENTILES = [50, 90, 95, 99]
+# Tamanho máximo das mensagens do servidor (figuras grandes passam de 1 MB)
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def free_port():
+    """Porta TCP livre na interface de loopback."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, env=None):
+    """
+    Inicia o dashboard em um processo separado e espera o endpoint de saúde responder.
+    'env' substitui o ambiente do servidor (ex.: para ligar ou desligar variáveis DASHBOARD_*).
+    """
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', DASHBOARD_SCRIPT, '--server.headless', 'true',
+         '--server.port', str(port), '--server.address', '127.0.0.1', '--server.fileWatcherType', 'none',
+         '--browser.gatherUsageStats', 'false'],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"O servidor terminou com código {process.returncode} durante a inicialização.")
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    return process, url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    process.terminate()
+    raise TimeoutError("O servidor não respondeu a tempo.")
+
+
+def server_pid(port):
+    """PID do processo que escuta na porta (para --url apontando para um servidor local), ou None."""
+    inodes = set()
+    for table in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(table) as f:
+                lines = f.readlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            # Estado 0A = LISTEN
+            if int(fields[1].rsplit(':', 1)[1], 16) == port and fields[3] == '0A':
+                inodes.add(f'socket:[{fields[9]}]')
+    if not inodes:
+        return None
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            for fd in os.listdir(f'/proc/{pid}/fd'):
+                if os.readlink(f'/proc/{pid}/fd/{fd}') in inodes:
+                    return int(pid)
+        except OSError:
+            continue
+    return None
+
+
+def process_tree(pid):
+    """PIDs do processo e dos seus descendentes (ex.: workers do joblib)."""
+    children = {}
+    for entry in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def cpu_and_memory(pid):
+    """(segundos de CPU usados, memória residente em bytes) do processo e dos descendentes."""
+    cpu, rss = 0.0, 0
+    for member in process_tree(pid):
+        try:
+            with open(f'/proc/{member}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{member}/statm') as f:
+                rss += int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, ValueError, IndexError):
+            continue
+        # utime e stime (campos 14 e 15 de /proc/<pid>/stat)
+        cpu += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    return cpu, rss
+
+
+class ResourceSampler(threading.Thread):
+    """Amostra periodicamente o uso de CPU e a memória do servidor até 'stop()'."""
+
+    def __init__(self, pid, interval=SAMPLE_INTERVAL):
+        super().__init__(name='load-test-sampler', daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            cpu, rss = cpu_and_memory(self.pid)
+            self.samples.append((time.monotonic(), cpu, rss))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        cpu, rss = cpu_and_memory(self.pid)
+        self.samples.append((time.monotonic(), cpu, rss))
+
+    def summary(self):
+        """Saturação de CPU média e de pico (entre amostras consecutivas) e pico de memória."""
+        samples = np.array(self.samples)
+        cpus = os.cpu_count() or 1
+        elapsed = samples[-1, 0] - samples[0, 0]
+        average = (samples[-1, 1] - samples[0, 1]) / (elapsed * cpus) if elapsed > 0 else 0.0
+        deltas = np.diff(samples[:, :2], axis=0)
+        deltas = deltas[deltas[:, 0] > 0]
+        peak = float((deltas[:, 1] / (deltas[:, 0] * cpus)).max()) if len(deltas) else average
+        return {'cpus': cpus, 'saturacao_cpu_media': float(average), 'saturacao_cpu_pico': peak,
+                'memoria_pico_mb': float(samples[:, 2].max()) / 2 ** 20}
+
+
+def connect_session(url):
+    """Abre o websocket de uma sessão (context manager que fecha a conexão na saída)."""
+    ws_url = url.replace('http://', 'ws://').replace('https://', 'wss://').rstrip('/')
+    return connect(f"{ws_url}/_stcore/stream", subprotocols=['streamlit'], max_size=MAX_MESSAGE_BYTES,
+                   open_timeout=STARTUP_TIMEOUT)
+
+
+class Session:
+    """
+    Sessão do dashboard falando o protocolo do navegador: cada rerun envia o estado atual dos widgets
+    e recebe as mensagens do servidor até 'script_finished'. Os widgets exibidos (sliders e multiselects)
+    são guardados pelo sufixo do id, que é a 'key' informada no dashboard.
+    """
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.widgets = {}
+        self.widget_states = {}
+        self.first_element_seconds = None
+
+    def widget(self, key):
+        """(tipo, elemento) do widget exibido com a 'key' informada, ou None."""
+        return next((value for widget_id, value in self.widgets.items() if widget_id.endswith(f"-{key}")), None)
+
+    def set_widget(self, key, value):
+        """Altera o valor do widget para o próximo rerun; retorna False se ele não estiver sendo exibido."""
+        found = self.widget(key)
+        if found is None:
+            return False
+        kind, element = found
+        message = WidgetState(id=element.id)
+        if kind == 'slider':
+            message.double_array_value.data.extend(value)
+        else:
+            message.string_array_value.data.extend(value)
+        self.widget_states[element.id] = message
+        return True
+
+    def rerun(self, timeout=RERUN_TIMEOUT):
+        """
+        Executa um rerun e retorna (segundos, mensagem da exceção exibida ou None). O tempo até o primeiro
+        elemento desenhado pelo rerun fica em 'first_element_seconds' (None se nenhum foi desenhado).
+        """
+        msg = BackMsg()
+        msg.rerun_script.SetInParent()
+        for state in self.widget_states.values():
+            msg.rerun_script.widget_states.widgets.append(state)
+        start = time.perf_counter()
+        self.websocket.send(msg.SerializeToString())
+        self.first_element_seconds = None
+        error = None
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.websocket.recv(timeout=timeout))
+            kind = forward.WhichOneof('type')
+            if kind == 'script_finished':
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                return time.perf_counter() - start, error
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                if self.first_element_seconds is None:
+                    self.first_element_seconds = time.perf_counter() - start
+                element = forward.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type in ('slider', 'multiselect'):
+                    self.widgets[getattr(element, element_type).id] = (element_type, getattr(element, element_type))
+                elif element_type == 'exception' and error is None:
+                    error = element.exception.message
+
+
+# Cada interação altera um filtro global e retorna False se o widget não estiver sendo exibido.
+def change_years(session, rng):
+    """Escolhe um novo intervalo de anos."""
+    found = session.widget('global_years_filter')
+    if found is None:
+        return False
+    slider = found[1]
+    start = rng.randint(int(slider.min), int(slider.max))
+    return session.set_widget('global_years_filter', [start, rng.randint(start, int(slider.max))])
+
+
+def pick_options(key):
+    """Interação que escolhe um subconjunto aleatório (não vazio) das opções do multiselect 'key'."""
+    def interaction(session, rng):
+        found = session.widget(key)
+        if found is None or not found[1].options:
+            return False
+        options = list(found[1].options)
+        return session.set_widget(key, rng.sample(options, rng.randint(1, min(3, len(options)))))
+    interaction.__doc__ = f"Escolhe algumas opções de '{key}'."
+    return interaction
+
+
+def restore_filters(session, rng):
+    """Volta os filtros globais à seleção completa."""
+    changed = False
+    for key in ('global_unidade_filter', 'global_sex_filter', 'global_nivel_ensino_filter'):
+        found = session.widget(key)
+        if found is not None:
+            changed = session.set_widget(key, list(found[1].options)) or changed
+    found = session.widget('global_years_filter')
+    if found is not None:
+        changed = session.set_widget('global_years_filter', [found[1].min, found[1].max]) or changed
+    return changed
+
+
+INTERACTIONS = {
+    'ano': change_years,
+    'unidade': pick_options('global_unidade_filter'),
+    'sexo': pick_options('global_sex_filter'),
+    'nivel': pick_options('global_nivel_ensino_filter'),
+    'restaurar': restore_filters,
+}
+
+
+def run_session(index, url, interactions, think_time, seed, records, start_barrier, stop):
+    """
+    Executa uma sessão: o primeiro rerun, a espera pelas demais sessões e as interações até 'stop'.
+    Acrescenta um registro por rerun medido em 'records'.
+    """
+    rng = random.Random(seed * 10_000 + index)
+    try:
+        with connect_session(url) as websocket:
+            session = Session(websocket)
+            seconds, error = session.rerun()
+            records.append({'sessao': index, 'interacao': 'abertura', 'segundos': seconds, 'erro': error})
+            start_barrier.wait()
+            # Tempo de "pensar" exponencial, como a chegada de cliques independentes
+            while not stop.wait(rng.expovariate(1 / think_time) if think_time > 0 else 0):
+                name = rng.choice(interactions)
+                if not INTERACTIONS[name](session, rng):
+                    continue
+                seconds, error = session.rerun()
+                records.append({'sessao': index, 'interacao': name, 'segundos': seconds, 'erro': error})
+    except threading.BrokenBarrierError:
+        pass
+    except Exception as e:
+        records.append({'sessao': index, 'interacao': 'falha', 'segundos': float('nan'),
+                        'erro': f"{type(e).__name__}: {e}"})
+        # Não deixa as demais sessões esperando por esta na barreira
+        start_barrier.abort()
+
+
+def warm_up(url):
+    """
+    Abre uma sessão e espera o primeiro rerun (leitura dos dados, caches e modelos), para que a memória
+    de referência e o teste não incluam o custo da primeira carga do processo.
+    """
+    with connect_session(url) as websocket:
+        seconds, error = Session(websocket).rerun()
+    if error:
+        raise RuntimeError(f"O dashboard falhou no aquecimento: {error}")
+    return seconds
+
+
+def run_load_test(url, pid, sessions, duration, think_time, interactions, seed=42):
+    """
+    Executa o teste de carga e retorna (registros dos reruns, resumo da fase de interações).
+    A memória de referência é medida após o aquecimento, antes de abrir as sessões; CPU e memória
+    são amostrados apenas se o PID do servidor for conhecido.
+    """
+    seconds = warm_up(url)
+    print(f"Aquecimento (primeiro rerun do processo): {seconds:.2f} s", file=sys.stderr)
+    baseline_rss = cpu_and_memory(pid)[1] if pid else None
+
+    records = []
+    # As sessões começam a interagir juntas, depois que todas fizeram o primeiro rerun
+    start_barrier = threading.Barrier(sessions + 1)
+    stop = threading.Event()
+    threads = [threading.Thread(target=run_session, name=f'load-test-{index}', daemon=True,
+                                args=(index, url, interactions, think_time, seed, records, start_barrier, stop))
+               for index in range(sessions)]
+    opening = time.monotonic()
+    for thread in threads:
+        thread.start()
+    try:
+        start_barrier.wait(timeout=RERUN_TIMEOUT)
+    except threading.BrokenBarrierError:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        failures = [r['erro'] for r in records if r['interacao'] == 'falha']
+        raise RuntimeError(f"Nem todas as sessões abriram: {failures[:1] or 'tempo esgotado'}")
+    print(f"{sessions} sessões abertas em {time.monotonic() - opening:.2f} s; interagindo por {duration} s",
+          file=sys.stderr)
+
+    sampler = ResourceSampler(pid) if pid else None
+    if sampler:
+        sampler.start()
+    start = time.monotonic()
+    stop.wait(duration)
+    stop.set()
+    # Os reruns em andamento terminam e entram na medida
+    for thread in threads:
+        thread.join()
+    summary = {'sessoes': sessions, 'duracao_s': time.monotonic() - start}
+    if sampler:
+        sampler.stop()
+        summary.update(sampler.summary())
+        summary['memoria_base_mb'] = baseline_rss / 2 ** 20
+        summary['memoria_por_sessao_mb'] = (summary['memoria_pico_mb'] - summary['memoria_base_mb']) / sessions
+    return records, summary
+
+
+def latency_table(records):
+    """Número de reruns, erros e percentis da latência (ms), no total e por interação."""
+    df = pd.DataFrame([r for r in records if r['interacao'] not in ('abertura', 'falha')])
+    if df.empty:
+        return df
+    rows = []
+    for name, group in [('total', df), *df.groupby('interacao', sort=True)]:
+        ms = group['segundos'].to_numpy() * 1000
+        rows.append({
+            'interacao': name, 'reruns': len(ms), 'erros': int(group['erro'].notna().sum()),
+            **{f"p{p}_ms": float(np.percentile(ms, p)) for p in PERCENTILES},
+            'max_ms': float(ms.max()),
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessoes', type=int, default=SESSIONS, help="Número de sessões simultâneas.")
+    parser.add_argument('--duracao', type=float, default=DURATION, help="Duração da fase de interações (s).")
+    parser.add_argument('--pensar', type=float, default=THINK_TIME,
+                        help="Tempo médio entre as interações de uma sessão (s); 0 = sem pausa.")
+    parser.add_argument('--interacoes', nargs='+', choices=list(INTERACTIONS), default=list(INTERACTIONS),
+                        help="Interações sorteadas pelas sessões.")
+    parser.add_argument('--url', help="Servidor já em execução (ex.: http://127.0.0.1:8501); "
+                                      "por padrão, um servidor é iniciado em uma porta livre.")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--json', help="Arquivo onde salvar os resultados em JSON.")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        url = args.url
+        port = urllib.parse.urlsplit(url).port or 80
+        pid = server_pid(port) if urllib.parse.urlsplit(url).hostname in ('127.0.0.1', 'localhost') else None
+        if pid is None:
+            print("PID do servidor não encontrado: CPU e memória não serão medidas.", file=sys.stderr)
+    else:
+        process, url = start_server(free_port())
+        pid = process.pid
+    try:
+        records, summary = run_load_test(url, pid, args.sessoes, args.duracao, args.pensar, args.interacoes,
+                                         args.semente)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    table = latency_table(records)
+    completed = len([r for r in records if r['interacao'] not in ('abertura', 'falha')])
+    summary['vazao_reruns_s'] = completed / summary['duracao_s']
+    opening = [r['segundos'] for r in records if r['interacao'] == 'abertura']
+    summary['abertura_p95_ms'] = float(np.percentile(opening, 95)) * 1000 if opening else None
+    failures = [r['erro'] for r in records if r['interacao'] == 'falha']
+
+    print(f"Vazão: {summary['vazao_reruns_s']:.2f} reruns/s com {args.sessoes} sessões "
+          f"({completed} reruns em {summary['duracao_s']:.1f} s)")
+    if 'saturacao_cpu_media' in summary:
+        print(f"CPU: {summary['saturacao_cpu_media']:.0%} em média, {summary['saturacao_cpu_pico']:.0%} no pico "
+              f"({summary['cpus']} CPUs)")
+        print(f"Memória: {summary['memoria_base_mb']:.0f} MB após o aquecimento, pico de "
+              f"{summary['memoria_pico_mb']:.0f} MB; {summary['memoria_por_sessao_mb']:.1f} MB por sessão")
+    if failures:
+        print(f"Sessões com falha: {len(failures)} (ex.: {failures[0]})")
+    if not table.empty:
+        print("\nLatência por interação (ms):")
+        print(table.round(1).to_string(index=False))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'resumo': summary, 'latencia': table.to_dict('records'), 'reruns': records},
+                      f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark dos backends de Machine Learning sobre os dados completos de egressos.
+
+Compara, para a classificação (tempo 'Curto'/'Longo') e para a regressão (total de períodos),
+o tempo de treino, o tamanho do modelo serializado e a qualidade no conjunto de teste dos
+estimadores disponíveis em ml_pipeline (Árvore de Decisão/Random Forest e HistGradientBoosting).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.ml_backends [--json resultados.json]
+"""
+import argparse
+import json
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from data_loading import EGRESSOS_FOLDER, load_and_preprocess_egressos_data
+from ml_pipeline import (CLASSIFICATION_BACKENDS, REGRESSION_BACKENDS, encode_for_model,
+                         train_classifier, train_regression_bundle)
+
+FEATURES_CLASSIFICACAO = ['nivel_ensino', 'sexo', 'nome_curso', 'nome_unidade']
+FEATURES_REGRESSAO = ['nivel_ensino', 'sexo', 'nome_curso', 'nome_unidade', 'ano_ingresso']
+SPLIT = {'test_size': 0.2, 'random_state': 42}
+
+
+def model_size_bytes(model):
+    """Tamanho do modelo serializado com pickle."""
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def benchmark_classification(df_egressos):
+    """Treina cada backend de classificação com o limiar na mediana, como na aba do dashboard."""
+    threshold = int(df_egressos['total_periodos'].median())
+    y = np.where(df_egressos['total_periodos'] <= threshold, 'Curto', 'Longo')
+
+    encoders = {col: LabelEncoder().fit(df_egressos[col]) for col in FEATURES_CLASSIFICACAO}
+    X_codes = pd.DataFrame({col: encoders[col].transform(df_egressos[col]) for col in FEATURES_CLASSIFICACAO})
+    cardinalities = [len(encoders[col].classes_) for col in FEATURES_CLASSIFICACAO]
+    X_train, X_test, y_train, y_test = train_test_split(X_codes, y, stratify=y, **SPLIT)
+
+    results = []
+    for backend, config in CLASSIFICATION_BACKENDS.items():
+        start = time.perf_counter()
+        model = train_classifier(backend, config['params'], X_train, y_train, cardinalities)
+        train_seconds = time.perf_counter() - start
+        results.append({
+            'tarefa': 'classificacao',
+            'backend': backend,
+            'linhas_treino': len(X_train),
+            'tempo_treino_s': round(train_seconds, 3),
+            'tamanho_modelo_bytes': model_size_bytes(model),
+            'acuracia': round(accuracy_score(y_test, model.predict(X_test)), 4),
+        })
+    return results
+
+
+def benchmark_regression(df_egressos):
+    """Treina cada backend de regressão sobre o total de períodos, como na aba do dashboard."""
+    df_regressao = df_egressos[FEATURES_REGRESSAO + ['total_periodos']].dropna(subset=['total_periodos']).copy()
+    df_regressao['ano_ingresso'] = pd.to_numeric(df_regressao['ano_ingresso'], errors='coerce').fillna(df_regressao['ano_ingresso'].mean())
+    X_train, X_test, y_train, y_test = train_test_split(
+        df_regressao[FEATURES_REGRESSAO], df_regressao['total_periodos'], **SPLIT
+    )
+
+    results = []
+    for backend, config in REGRESSION_BACKENDS.items():
+        start = time.perf_counter()
+        bundle = train_regression_bundle(backend, config['params'], X_train, y_train)
+        train_seconds = time.perf_counter() - start
+        y_pred = bundle['model'].predict(encode_for_model(bundle, X_test))
+        results.append({
+            'tarefa': 'regressao',
+            'backend': backend,
+            'linhas_treino': len(X_train),
+            'tempo_treino_s': round(train_seconds, 3),
+            'tamanho_modelo_bytes': model_size_bytes(bundle['model']),
+            'rmse': round(float(np.sqrt(mean_squared_error(y_test, y_pred))), 4),
+            'r2': round(float(r2_score(y_test, y_pred)), 4),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--egressos', default=EGRESSOS_FOLDER, help="Pasta com os CSVs de egressos.")
+    parser.add_argument('--json', help="Arquivo onde salvar os resultados em JSON.")
+    args = parser.parse_args()
+
+    df_egressos, _ = load_and_preprocess_egressos_data(args.egressos)
+    results = benchmark_classification(df_egressos) + benchmark_regression(df_egressos)
+
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""
+Benchmark das etapas do dashboard: leitura dos CSVs, carregamento completo, filtros da sidebar,
+agregações e figuras (sunburst, violino, histograma, cubo do comparativo), montagem das figuras da
+página (em sequência e em um pool de threads), tamanho e tempo de serialização das figuras e treino
+dos modelos de classificação e regressão.
+
+Cada caso é medido em cada escala pedida: a escala 1 usa os dados reais (dataset/) e as demais,
+os datasets sintéticos de synthetic_data.py (gerados na primeira execução, com a mesma semente).
+Os resultados (mediana, mínimo e máximo de cada caso, após uma execução de aquecimento) podem ser
+salvos em JSON e comparados com uma execução anterior pelo menor tempo de cada caso: o script termina
+com código 1 se algum caso ficar mais lento (ou alguma figura maior) do que a linha de base além da tolerância.
+
+Com o pacote opcional duckdb instalado, os filtros e as contagens também são medidos no backend SQL
+(casos 'sql/*', ver sql_backend.py), sobre arquivos Parquet gravados em uma pasta temporária.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.pipeline [--escala 1 10] [--casos 'filtros/*'] [--json resultados.json]
+                                  [--baseline base.json --tolerancia 0.25]
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import plotly
+import sklearn
+
+import data_loading
+import sql_backend
+import synthetic_data
+from analytics import FEATURES_CLASSIFICACAO, FEATURES_REGRESSAO, classification_dataset, regression_dataset
+from figures import (build_count_cube, build_figures, build_period_histogram_figure, build_sex_pie_figure,
+                     build_sunburst_figure, build_violin_figure, build_yearly_bar_figure, figure_payload_bytes,
+                     sunburst_nodes)
+from filters import apply_sidebar_filters
+from ml_pipeline import CLASSIFICATION_BACKENDS, REGRESSION_BACKENDS, train_classifier, train_regression_bundle
+
+SUNBURST_PATHS = {
+    'unidade': ['nome_unidade', 'nivel_ensino', 'nome_curso'],
+    'sexo': ['sexo', 'nivel_ensino', 'nome_curso'],
+    'nivel': ['nivel_ensino', 'nome_curso'],
+}
+# Valores padrão dos controles da aba de egressos
+LIMITE_PERIODOS = 20
+SEXO_ROTULOS = {'M': 'Masculino', 'F': 'Feminino', 'INDEFINIDO': 'Não Informado'}
+
+# Threads do pool comparado com a montagem sequencial das figuras da página
+FIGURE_WORKERS = 8
+
+# Repetições de cada caso (o treino, mais caro, tem contagem própria)
+REPEATS = 5
+TRAINING_REPEATS = 1
+# Execuções descartadas antes das medidas (exceto no treino)
+WARMUP = 1
+# Tolerância relativa na comparação com a linha de base e diferença mínima (s) considerada regressão
+TOLERANCE = 0.25
+NOISE_FLOOR_SECONDS = 0.01
+
+
+def measure(func, repeats, warmup=0):
+    """
+    Executa 'func' 'warmup' vezes sem medir e depois 'repeats' vezes;
+    retorna os tempos (s) e o resultado da última execução.
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def build_figures_pooled(specs, workers=FIGURE_WORKERS):
+    """Como figures.build_figures, mas com uma tarefa por figura em um pool de threads."""
+    with ThreadPoolExecutor(max_workers=min(workers, len(specs))) as executor:
+        futures = {name: executor.submit(func, *args) for name, (func, *args) in specs.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def page_figure_specs(filtered):
+    """Figuras montadas a cada rerun nas abas de ingressantes e egressos (como em dashboard.py)."""
+    specs = {}
+    for dataset, df in filtered.items():
+        for path_name, path in SUNBURST_PATHS.items():
+            specs[f"{dataset}_sunburst_{path_name}"] = (build_sunburst_figure, df, path, path_name)
+        specs[f"{dataset}_por_ano"] = (build_yearly_bar_figure, df, dataset, 'Ano')
+        specs[f"{dataset}_sexo"] = (build_sex_pie_figure, df)
+    return specs
+
+
+def dataset_folder(scale, seed, synthetic_folder=synthetic_data.SYNTHETIC_FOLDER):
+    """Pasta do dataset da escala: os dados reais na escala 1, senão o sintético (gerado se ainda não existir)."""
+    if scale == 1:
+        return data_loading.DATASET_FOLDER
+    folder = os.path.join(synthetic_folder, f"x{scale:g}")
+    if not all(os.path.isdir(os.path.join(folder, sub)) for sub in synthetic_data.SUBFOLDERS):
+        print(f"Gerando o dataset sintético {folder}...", file=sys.stderr)
+        synthetic_data.generate_dataset(folder, scale, seed)
+    return folder
+
+
+def default_filters(df_ingressantes, df_egressos):
+    """Seleção padrão da sidebar: todos os níveis, anos, sexos, unidades e cursos."""
+    combined = pd.concat([df_ingressantes, df_egressos], ignore_index=True)
+    return {
+        'years_range': (max(2014, int(combined['ano'].min())), min(2024, int(combined['ano'].max()))),
+        'sex_filter_list': sorted(combined['sexo'].unique()),
+        'course_filter_list': sorted(combined['nome_curso'].unique()),
+        'nivel_ensino_filter_list': sorted(combined['nivel_ensino'].unique()),
+        'unidade_filter_list': sorted(combined['nome_unidade'].unique()),
+    }
+
+
+def filter_sets(df_ingressantes, df_egressos):
+    """Conjuntos representativos de filtros, derivados da seleção padrão."""
+    default = default_filters(df_ingressantes, df_egressos)
+    last_year = default['years_range'][1]
+    biggest_unit = df_egressos['nome_unidade'].value_counts().index[0]
+    biggest_courses = df_egressos['nome_curso'].value_counts().index[:5].tolist()
+    return {
+        'padrao': default,
+        'ultimo_ano': {**default, 'years_range': (last_year, last_year)},
+        'uma_unidade': {**default, 'unidade_filter_list': [biggest_unit]},
+        'graduacao_feminino': {**default, 'nivel_ensino_filter_list': ['GRADUAÇÃO'], 'sex_filter_list': ['F']},
+        'cinco_cursos': {**default, 'course_filter_list': biggest_courses},
+    }
+
+
+def filter_state(filters):
+    """Estado dos filtros (como em analytics.filter_rows) equivalente aos argumentos de apply_sidebar_filters."""
+    return {
+        'anos': list(filters['years_range']),
+        'sexos': filters['sex_filter_list'],
+        'cursos': filters['course_filter_list'],
+        'niveis_ensino': filters['nivel_ensino_filter_list'],
+        'unidades': filters['unidade_filter_list'],
+    }
+
+
+def run_scale(scale, seed, selected, repeats, training_repeats):
+    """Mede todos os casos selecionados na escala informada e retorna a lista de resultados."""
+    folder = dataset_folder(scale, seed)
+    ingressantes_folder = os.path.join(folder, 'ingressantes')
+    egressos_folder = os.path.join(folder, 'egressos')
+    results = []
+
+    def case(name, func, rows=None, n=repeats, warmup=WARMUP, needed=False, **extra):
+        """Mede 'func' se o caso foi selecionado; casos cujo resultado alimenta os seguintes ('needed') rodam sempre."""
+        if not any(fnmatch.fnmatch(name, pattern) for pattern in selected):
+            return func() if needed else None
+        times, result = measure(func, n, warmup)
+        results.append({
+            'caso': name, 'escala': scale, 'linhas': rows, 'repeticoes': n,
+            'mediana_s': statistics.median(times), 'min_s': min(times), 'max_s': max(times), **extra,
+        })
+        print(f"  {name:<55} {statistics.median(times):9.4f} s", file=sys.stderr)
+        return result
+
+    # --- Leitura de cada CSV e carregamento completo ---
+    for subfolder in synthetic_data.SUBFOLDERS:
+        source_dir = os.path.join(folder, subfolder)
+        for file_name in sorted(os.listdir(source_dir)):
+            path = os.path.join(source_dir, file_name)
+            case(f"csv/{subfolder}/{file_name}", lambda: pd.read_csv(path, sep=';'))
+
+    df_ingressantes, _ = case('carregamento/ingressantes',
+                              lambda: data_loading.load_and_preprocess_ingressantes_data(ingressantes_folder),
+                              needed=True)
+    df_egressos, _ = case('carregamento/egressos',
+                          lambda: data_loading.load_and_preprocess_egressos_data(egressos_folder), needed=True)
+
+    # --- Filtros da sidebar ---
+    frames = {'ingressantes': df_ingressantes, 'egressos': df_egressos}
+    filtered = {}
+    for set_name, filters in filter_sets(df_ingressantes, df_egressos).items():
+        for dataset, df in frames.items():
+            result = case(f"filtros/{set_name}/{dataset}", lambda: apply_sidebar_filters(df, **filters),
+                          rows=len(df), needed=set_name == 'padrao')
+            if set_name == 'padrao':
+                filtered[dataset] = result
+
+    filtered_egressos = filtered['egressos'].assign(
+        sexo_rotulo=lambda df: df['sexo'].map(SEXO_ROTULOS).fillna('Não Informado')
+    )
+
+    # --- Agregações e figuras (seleção padrão) ---
+    figures = {}
+    for dataset, df in filtered.items():
+        for path_name, path in SUNBURST_PATHS.items():
+            case(f"agregacao/sunburst/{dataset}/{path_name}", lambda: sunburst_nodes(df, path), rows=len(df))
+            figures[f"sunburst/{dataset}/{path_name}"] = case(
+                f"figura/sunburst/{dataset}/{path_name}", lambda: build_sunburst_figure(df, path, path_name),
+                rows=len(df), needed=True
+            )
+
+    df_violin = filtered_egressos[(filtered_egressos['total_periodos'] <= LIMITE_PERIODOS) &
+                                  (filtered_egressos['total_periodos'] > 0)]
+    for compact in (False, True):
+        variant = 'compacto' if compact else 'completo'
+        figures[f"violino/{variant}"] = case(
+            f"figura/violino/{variant}", lambda: build_violin_figure(df_violin, LIMITE_PERIODOS, compact),
+            rows=len(df_violin), needed=True
+        )
+        figures[f"histograma/{variant}"] = case(
+            f"figura/histograma/{variant}",
+            lambda: build_period_histogram_figure(filtered_egressos, LIMITE_PERIODOS, compact),
+            rows=len(filtered_egressos), needed=True
+        )
+
+    # Montagem das figuras da página: em sequência (build_figures, como no dashboard) e com uma thread por
+    # figura, para reavaliar o pool em máquinas com mais núcleos
+    page_specs = page_figure_specs(filtered)
+    page_rows = sum(len(df) for df in filtered.values())
+    case('figuras_da_pagina/sequencial', lambda: build_figures(page_specs), rows=page_rows)
+    case('figuras_da_pagina/pool', lambda: build_figures_pooled(page_specs), rows=page_rows)
+
+    case('agregacao/cubo_comparativo',
+         lambda: build_count_cube({'Ingressantes': filtered['ingressantes'], 'Egressos': filtered_egressos}),
+         rows=len(filtered['ingressantes']) + len(filtered_egressos))
+
+    # --- Backend SQL: filtros e contagens no DuckDB (gravação do Parquet medida uma vez) ---
+    if sql_backend.available() and any(pattern.startswith(('sql', '*')) for pattern in selected):
+        with tempfile.TemporaryDirectory() as parquet_folder:
+            backend = case('sql/parquet', lambda: sql_backend.DuckDBBackend(frames, parquet_folder),
+                           rows=len(df_ingressantes) + len(df_egressos), n=1, warmup=0, needed=True)
+            sets = filter_sets(df_ingressantes, df_egressos)
+            for set_name, filters in sets.items():
+                for dataset, df in frames.items():
+                    case(f"sql/filtros/{set_name}/{dataset}", lambda: backend.filter_rows(dataset, filter_state(filters)),
+                         rows=len(df))
+            state = filter_state(sets['padrao'])
+            for dataset, df in frames.items():
+                for path_name, path in SUNBURST_PATHS.items():
+                    case(f"sql/contagens/sunburst/{dataset}/{path_name}",
+                         lambda: backend.count_rows(dataset, state, path), rows=len(df))
+            case('sql/contagens/cubo_comparativo',
+                 lambda: backend.count_cube({'Ingressantes': 'ingressantes', 'Egressos': 'egressos'}, state),
+                 rows=len(df_ingressantes) + len(df_egressos))
+
+    # --- Serialização das figuras (JSON enviado ao navegador) ---
+    for name, fig in figures.items():
+        if fig is not None:
+            case(f"serializacao/{name}", lambda: fig.to_json(), bytes=figure_payload_bytes(fig))
+
+    # --- Treino dos modelos (todas as linhas de egressos, hiperparâmetros padrão) ---
+    threshold = int(df_egressos['total_periodos'].median())
+    X_codes, y_class, encoders = classification_dataset(df_egressos, threshold, FEATURES_CLASSIFICACAO)
+    cardinalities = [len(encoders[col].classes_) if col in encoders else None for col in FEATURES_CLASSIFICACAO]
+    for backend, config in CLASSIFICATION_BACKENDS.items():
+        case(f"treino/classificacao/{backend}",
+             lambda: train_classifier(backend, config['params'], X_codes, y_class, cardinalities),
+             rows=len(X_codes), n=training_repeats, warmup=0)
+
+    X_reg, y_reg = regression_dataset(df_egressos, FEATURES_REGRESSAO)
+    for backend, config in REGRESSION_BACKENDS.items():
+        case(f"treino/regressao/{backend}",
+             lambda: train_regression_bundle(backend, config['params'], X_reg, y_reg),
+             rows=len(X_reg), n=training_repeats, warmup=0)
+
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance=TOLERANCE, noise_floor=NOISE_FLOOR_SECONDS):
+    """
+    Compara cada caso com o mesmo caso (e escala) da linha de base. A comparação usa o menor tempo
+    de cada caso, menos sensível à carga da máquina que a mediana. É regressão o caso cujo tempo
+    cresceu mais que 'tolerance' (e mais que 'noise_floor' segundos) ou cuja figura cresceu mais que 'tolerance'.
+    Retorna a tabela da comparação.
+    """
+    base = {(r['caso'], r['escala']): r for r in baseline['resultados']}
+    rows = []
+    for result in results:
+        reference = base.get((result['caso'], result['escala']))
+        if reference is None:
+            continue
+        ratio = result['min_s'] / reference['min_s'] if reference['min_s'] else float('inf')
+        regression = ratio > 1 + tolerance and result['min_s'] - reference['min_s'] > noise_floor
+        if 'bytes' in result and 'bytes' in reference and result['bytes'] > reference['bytes'] * (1 + tolerance):
+            regression = True
+        rows.append({
+            'caso': result['caso'], 'escala': result['escala'],
+            'base_s': reference['min_s'], 'atual_s': result['min_s'], 'razao': ratio,
+            'base_bytes': reference.get('bytes'), 'atual_bytes': result.get('bytes'),
+            'regressao': regression,
+        })
+    return pd.DataFrame(rows)
+
+
+def environment():
+    """Versões e máquina, para saber se duas execuções são comparáveis."""
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'scikit-learn': sklearn.__version__,
+        'plotly': plotly.__version__,
+        'cpus': os.cpu_count(),
+        'maquina': platform.platform(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', type=float, nargs='+', default=[1], help="Escalas dos dados (1 = dados reais).")
+    parser.add_argument('--casos', nargs='+', default=['*'],
+                        help="Padrões (glob) dos casos a executar, ex.: 'filtros/*' 'figura/violino/*'.")
+    parser.add_argument('--repeticoes', type=int, default=REPEATS)
+    parser.add_argument('--repeticoes-treino', type=int, default=TRAINING_REPEATS)
+    parser.add_argument('--semente', type=int, default=42, help="Semente dos datasets sintéticos.")
+    parser.add_argument('--json', help="Arquivo onde salvar os resultados em JSON.")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparação.")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCE,
+                        help="Aumento relativo tolerado em relação à linha de base (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.escala:
+        print(f"Escala {scale:g}:", file=sys.stderr)
+        results += run_scale(scale, args.semente, args.casos, args.repeticoes, args.repeticoes_treino)
+
+    print(pd.DataFrame(results).round(4).to_string(index=False))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'ambiente': environment(), 'resultados': results}, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparison = compare_with_baseline(results, baseline, args.tolerancia)
+        if comparison.empty:
+            print("\nNenhum caso em comum com a linha de base.")
+            return
+        print("\nComparação com a linha de base:")
+        print(comparison.round(4).to_string(index=False))
+        regressions = comparison[comparison['regressao']]
+        if not regressions.empty:
+            print(f"\n{len(regressions)} caso(s) com regressão acima de {args.tolerancia:.0%}.")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
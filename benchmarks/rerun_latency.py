@@ -0,0 +1,227 @@
+"""
+Latência dos reruns do dashboard em interações realistas, sem navegador.
+
+Executa dashboard.py com a API de testes do Streamlit (streamlit.testing.v1.AppTest) e repete,
+em cada iteração, uma sequência de interações: mudar o intervalo de anos, escolher uma única
+unidade, mover o limite do gráfico de violino, clicar em "Prever Desempenho" e restaurar os filtros.
+Cada interação é seguida de um rerun completo do script, cujo tempo é medido.
+
+Com a instrumentação por etapa ligada (perf_timing), o relatório traz os percentis de latência de
+cada interação e as etapas mais lentas. Os resultados podem ser salvos em JSON e comparados com uma
+execução anterior: o script termina com código 1 se o p95 de alguma interação piorar além da tolerância.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.rerun_latency [--iteracoes 20] [--interacoes ano unidade]
+                                       [--json resultados.json] [--baseline base.json]
+
+Para medir em escala maior, aponte DASHBOARD_DATASET para um dataset gerado por synthetic_data.py.
+As abas de predição só são executadas quando abertas: as interações são feitas com a aba de classificação
+aberta (ela inclui "Prever Desempenho"), então cada rerun medido inclui o modelo de classificação, e não o
+de regressão.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# A instrumentação por etapa é lida na importação de perf_timing, que acontece dentro do AppTest
+os.environ.setdefault("DASHBOARD_PROFILING", "1")
+os.environ.setdefault("DASHBOARD_PROFILING_LOG", os.path.join(tempfile.gettempdir(), "rerun_latency_perf.jsonl"))
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+DASHBOARD_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dashboard.py")
+# Tempo máximo de um rerun (s)
+RERUN_TIMEOUT = 600
+ITERATIONS = 20
+PERCENTILES = [50, 90, 95, 99]
+TOLERANCE = 0.25
+# Aba aberta durante as interações (chave e rótulo de st.tabs em dashboard.py)
+TABS_KEY = 'aba_ativa'
+ACTIVE_TAB = "Predição de Desempenho (Classificação)"
+
+
+# Cada interação altera um widget da página atual e retorna False se ele não estiver sendo exibido
+# (ex.: o violino some quando a unidade escolhida não tem egressos); nesse caso não há rerun.
+def widget(elements, key):
+    """Widget da lista com a chave informada, ou None."""
+    return next((element for element in elements if element.key == key), None)
+
+
+def change_years(at, rng):
+    """Escolhe um novo intervalo de anos no slider global."""
+    slider = widget(at.slider, 'global_years_filter')
+    start = rng.randint(slider.min, slider.max)
+    slider.set_value((start, rng.randint(start, slider.max)))
+    return True
+
+
+def pick_one_unit(at, rng):
+    """Seleciona uma única unidade no filtro global."""
+    multiselect = widget(at.multiselect, 'global_unidade_filter')
+    if multiselect is None or not multiselect.options:
+        return False
+    multiselect.set_value([rng.choice(multiselect.options)])
+    return True
+
+
+def move_violin_limit(at, rng):
+    """Move o limite de semestres do gráfico de violino."""
+    slider = widget(at.slider, 'violin_periods_limit_egressos')
+    if slider is None:
+        return False
+    slider.set_value(rng.randint(slider.min, slider.max))
+    return True
+
+
+def predict_performance(at, rng):
+    """Clica em "Prever Desempenho" na aba de classificação."""
+    button = next((button for button in at.button if button.label == "Prever Desempenho"), None)
+    if button is None:
+        return False
+    button.click()
+    return True
+
+
+def restore_filters(at, rng):
+    """Volta o intervalo de anos e as unidades à seleção completa."""
+    slider = widget(at.slider, 'global_years_filter')
+    slider.set_value((slider.min, slider.max))
+    multiselect = widget(at.multiselect, 'global_unidade_filter')
+    if multiselect is not None:
+        multiselect.set_value(multiselect.options)
+    return True
+
+
+INTERACTIONS = {
+    'ano': change_years,
+    'unidade': pick_one_unit,
+    'violino': move_violin_limit,
+    'prever': predict_performance,
+    'restaurar': restore_filters,
+}
+
+
+def rerun(at):
+    """Executa um rerun e retorna (segundos, etapas do perfil do rerun, mensagem da exceção ou None)."""
+    start = time.perf_counter()
+    at.run()
+    seconds = time.perf_counter() - start
+    profile = at.session_state['perf_profile'] if 'perf_profile' in at.session_state else None
+    error = at.exception[0].message if at.exception else None
+    return seconds, (profile.stages if profile is not None else []), error
+
+
+def run_harness(interactions, iterations, seed=42):
+    """
+    Executa as interações 'iterations' vezes e retorna uma lista com um registro por rerun medido.
+    Interações cujo widget não está na página no momento são ignoradas (e contadas).
+    """
+    rng = random.Random(seed)
+    at = AppTest.from_file(DASHBOARD_SCRIPT, default_timeout=RERUN_TIMEOUT)
+    at.session_state[TABS_KEY] = ACTIVE_TAB
+    seconds, _, error = rerun(at)
+    print(f"Primeiro rerun (carregamento e modelo de classificação): {seconds:.2f} s", file=sys.stderr)
+    if error:
+        raise RuntimeError(f"O dashboard falhou no primeiro rerun: {error}")
+
+    records, skipped = [], {}
+    for iteration in range(iterations):
+        for name in interactions:
+            if not INTERACTIONS[name](at, rng):
+                skipped[name] = skipped.get(name, 0) + 1
+                continue
+            seconds, stages, error = rerun(at)
+            records.append({'iteracao': iteration, 'interacao': name, 'segundos': seconds,
+                            'etapas': stages, 'erro': error})
+        print(f"  iteração {iteration + 1}/{iterations}", file=sys.stderr)
+    if skipped:
+        print(f"Interações ignoradas (widget não exibido): {skipped}", file=sys.stderr)
+    return records
+
+
+def latency_table(records):
+    """Percentis (ms) da latência de cada interação."""
+    rows = []
+    for name, group in pd.DataFrame(records).groupby('interacao', sort=False):
+        ms = group['segundos'].to_numpy() * 1000
+        rows.append({
+            'interacao': name, 'reruns': len(ms), 'erros': int(group['erro'].notna().sum()),
+            **{f"p{p}_ms": float(np.percentile(ms, p)) for p in PERCENTILES},
+            'max_ms': float(ms.max()),
+        })
+    return pd.DataFrame(rows)
+
+
+def slowest_stages(records, top=10):
+    """Etapas com maior tempo médio por rerun, por interação (etapas em threads somam o tempo de cada uma)."""
+    stages = pd.DataFrame([
+        {'interacao': record['interacao'], 'rerun': i, 'etapa': stage['etapa'], 'parede_s': stage['parede_s']}
+        for i, record in enumerate(records) for stage in record['etapas']
+    ])
+    if stages.empty:
+        return stages
+    reruns = pd.DataFrame(records).groupby('interacao').size()
+    per_rerun = stages.groupby(['interacao', 'etapa'])['parede_s'].sum().div(reruns, level='interacao')
+    table = per_rerun.mul(1000).rename('media_ms_por_rerun').reset_index()
+    return table.sort_values('media_ms_por_rerun', ascending=False).head(top)
+
+
+def compare_with_baseline(table, baseline, tolerance=TOLERANCE):
+    """Compara o p95 de cada interação com o da linha de base; retorna a tabela da comparação."""
+    base = {row['interacao']: row for row in baseline['latencia']}
+    rows = []
+    for row in table.to_dict('records'):
+        reference = base.get(row['interacao'])
+        if reference is None:
+            continue
+        ratio = row['p95_ms'] / reference['p95_ms']
+        rows.append({'interacao': row['interacao'], 'base_p95_ms': reference['p95_ms'],
+                     'atual_p95_ms': row['p95_ms'], 'razao': ratio, 'regressao': ratio > 1 + tolerance})
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iteracoes', type=int, default=ITERATIONS)
+    parser.add_argument('--interacoes', nargs='+', choices=list(INTERACTIONS), default=list(INTERACTIONS),
+                        help="Interações executadas em cada iteração, na ordem informada.")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--json', help="Arquivo onde salvar os resultados em JSON.")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparação.")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCE,
+                        help="Aumento relativo tolerado no p95 (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    records = run_harness(args.interacoes, args.iteracoes, args.semente)
+    table = latency_table(records)
+    stages = slowest_stages(records)
+
+    print("Latência por interação (ms):")
+    print(table.round(1).to_string(index=False))
+    if not stages.empty:
+        print("\nEtapas mais lentas (média por rerun):")
+        print(stages.round(1).to_string(index=False))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'latencia': table.to_dict('records'), 'etapas_mais_lentas': stages.to_dict('records'),
+                       'reruns': [{k: v for k, v in r.items() if k != 'etapas'} for r in records]},
+                      f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            comparison = compare_with_baseline(table, json.load(f), args.tolerancia)
+        print("\nComparação com a linha de base (p95):")
+        print(comparison.round(2).to_string(index=False))
+        if not comparison.empty and comparison['regressao'].any():
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
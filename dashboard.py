@@ -1,44 +1,128 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import re
 import os
 import base64
-from sklearn.model_selection import train_test_split
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+import hashlib
+import io
+import logging
+import uuid
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score
+from PIL import Image
+import analytics
+import data_loading
+import memory_profiling
+import metrics_export
+import model_evaluation
+import perf_timing
+import sql_backend
+from data_loading import EGRESSOS_FOLDER
+from analytics import (CLASSIFICATION_SPLIT, COLUNAS_OCULTAS_TABELA, FEATURES_CLASSIFICACAO, FEATURES_REGRESSAO,
+                       REGRESSION_SPLIT, TARGET_CLASSIFICACAO, TARGET_REGRESSAO)
+from model_registry import ModelRegistry, fingerprint, fingerprint_source_files, list_source_files
+from training_service import TrainingService
+from batch_scoring import score_csv
+from figures import (build_count_cube, build_figures, build_period_histogram_figure, build_sex_pie_figure,
+                     build_sunburst_figure, build_violin_figure, build_yearly_bar_figure, fit_figure_to_budget,
+                     rollup_count_cube)
+from perf_timing import stage, timed
+from lazy_imports import lazy_import
+from metrics_export import observe_tab, observe_training
+from ml_pipeline import (CLASSIFICATION_BACKENDS, INCREMENTAL_BACKENDS, INCREMENTAL_REPLAY_RATIO,
+                         REGRESSION_BACKENDS, build_prediction_lookup, check_drift, encode_for_model,
+                         enumerate_input_space, split_feature_types, train_classifier,
+                         train_regression_bundle, tuned_params_key, update_regression_bundle)
+
+# plotly e sklearn só são carregados quando a primeira aba que os usa é desenhada (ver lazy_imports)
+px = lazy_import('plotly.express')
+model_selection = lazy_import('sklearn.model_selection')
+sklearn_metrics = lazy_import('sklearn.metrics')
+
+logger = logging.getLogger(__name__)
 
 # --- Configuração da página Streamlit ---
 st.set_page_config(layout="wide", page_title="Dashboard de Análise Acadêmica")
 
+# --- Instrumentação por etapa (DASHBOARD_PROFILING=1) ---
+# Cada rerun tem um perfil próprio; o da execução anterior é gravado aqui se ela foi interrompida (st.stop)
+if perf_timing.PROFILING_ENABLED:
+    st.session_state.setdefault('perf_session_id', uuid.uuid4().hex[:8])
+    rerun_profile = perf_timing.begin_rerun(st.session_state.perf_session_id, st.session_state.get('perf_profile'))
+    st.session_state.perf_profile = rerun_profile
+else:
+    rerun_profile = None
+
+# --- Métricas no formato do Prometheus (DASHBOARD_METRICS=1) ---
+rerun_metrics = metrics_export.begin_rerun()
+
+# --- Memória por sessão e orçamento dos caches (DASHBOARD_MEMORY_PROFILING=1 ou DASHBOARD_MEMORY_BUDGET_MB) ---
+# Como no perfil por etapa, a contabilidade de um rerun interrompido (st.stop) é encerrada no rerun seguinte
+if memory_profiling.ACCOUNTING_ENABLED:
+    st.session_state.setdefault('perf_session_id', uuid.uuid4().hex[:8])
+    memory_rerun = memory_profiling.begin_rerun(st.session_state.perf_session_id,
+                                                st.session_state.get('memory_rerun'), st.session_state)
+    st.session_state.memory_rerun = memory_rerun
+else:
+    memory_rerun = None
+
 # --- Adicionar Imagem de Fundo (App e Sidebar) ---
 background_image_app_path = "Background_app.jpg"
 background_image_sidebar_path = "background_sidebar.jpg"
 
-@st.cache_data
-def get_base64_image(image_path):
-    """Lê uma imagem e retorna sua representação em base64 para uso em CSS."""
-    if os.path.exists(image_path):
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode()
-    return None
+# Pasta servida pelo Streamlit em 'app/static/' (server.enableStaticServing em .streamlit/config.toml)
+STATIC_FOLDER = "static"
+STATIC_URL_PREFIX = "app/static"
 
-encoded_background_app = get_base64_image(background_image_app_path)
-encoded_background_sidebar = get_base64_image(background_image_sidebar_path)
+@metrics_export.cached('imagens', memory_profiling.tracked('imagens', st.cache_resource(show_spinner=False)))
+def prepare_static_asset(image_path, max_width, quality=80):
+    """
+    Redimensiona a imagem para a largura de exibição e a recomprime em WebP uma única vez por processo,
+    gravando-a em 'static/' com o hash do conteúdo no nome (cacheável indefinidamente pelo navegador).
+    Retorna (nome_do_arquivo, bytes_webp), ou None se a imagem não existir.
+    """
+    if not os.path.exists(image_path):
+        return None
+
+    with Image.open(image_path) as img:
+        img = img.convert("RGBA" if "A" in img.getbands() or img.mode == "P" else "RGB")
+        if img.width > max_width:
+            img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, format="WEBP", quality=quality)
+    data = buffer.getvalue()
+
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    file_name = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}.webp"
+    file_path = os.path.join(STATIC_FOLDER, file_name)
+    if not os.path.exists(file_path):
+        os.makedirs(STATIC_FOLDER, exist_ok=True)
+        with open(file_path, "wb") as static_file:
+            static_file.write(data)
+    return file_name, data
+
+def get_asset_url(image_path, max_width):
+    """
+    Retorna a URL estática da versão otimizada da imagem. Se o servidor não estiver servindo
+    arquivos estáticos, recorre a um data URI com o WebP já reduzido. Retorna None se a imagem não existir.
+    """
+    asset = prepare_static_asset(image_path, max_width)
+    if asset is None:
+        return None
+    file_name, data = asset
+    if st.get_option("server.enableStaticServing"):
+        return f"{STATIC_URL_PREFIX}/{file_name}"
+    return f"data:image/webp;base64,{base64.b64encode(data).decode()}"
+
+background_app_url = get_asset_url(background_image_app_path, max_width=1920)
+background_sidebar_url = get_asset_url(background_image_sidebar_path, max_width=600)
 
 css_string = """
 <style>
 /* Estilo para o fundo principal do aplicativo */
 """
-if encoded_background_app:
+if background_app_url:
     css_string += f"""
     .stApp {{
-        background-image: url("data:image/jpeg;base64,{encoded_background_app}");
+        background-image: url("{background_app_url}");
         background-size: cover;
         background-position: center;
         background-repeat: no-repeat;
@@ -51,10 +135,10 @@ else:
 css_string += """
 /* Estilo para o fundo da sidebar */
 """
-if encoded_background_sidebar:
+if background_sidebar_url:
     css_string += f"""
     .stSidebar {{
-        background-image: url("data:image/jpeg;base64,{encoded_background_sidebar}");
+        background-image: url("{background_sidebar_url}");
         background-size: cover;
         background-position: center;
         background-repeat: no-repeat;
@@ -135,255 +219,29 @@ st.title("🎓 Dashboard de Análise Acadêmica 🎓")
 st.markdown("Explore dados de ingressantes e egressos, filtrando por ano, nível de ensino, sexo, curso e unidade. **Novo!** Preveja o tempo de graduação com Machine Learning.")
 
 
-# --- Caminhos para as pastas dos CSVs ---
-INGRESSANTES_FOLDER = os.path.join("dataset", "ingressantes")
-EGRESSOS_FOLDER = os.path.join("dataset", "egressos")
-
-# Função auxiliar para extrair o ano do nome do arquivo
-def extract_year_from_filename(filename):
-    """Tenta extrair um ano (quatro dígitos) de uma string de nome de arquivo."""
-    match = re.search(r'(\d{4})', filename)
-    if match:
-        return int(match.group(0))
-    return None
-
-@st.cache_data(show_spinner="Carregando e processando dados de INGRESSANTES...")
+# --- Carregamento dos dados (em cache) ---
+# O carregamento e a padronização ficam em analytics.py/data_loading.py (sem dependência do Streamlit),
+# para serem reaproveitados por benchmarks e scripts offline; aqui apenas os colocamos em cache.
+@timed('carregamento_ingressantes', rows=lambda result: len(result[0]))
+@metrics_export.cached('dados', memory_profiling.tracked(
+    'dados', st.cache_data(show_spinner="Carregando e processando dados de INGRESSANTES...")))
 def load_and_preprocess_ingressantes_data():
-    """
-    Carrega todos os arquivos CSV de ingressantes, os concatena,
-    adiciona a coluna 'ano' e padroniza as colunas 'nivel_ensino', 'sexo', 'nome_curso',
-    'nome_unidade'.
-    Retorna o DataFrame processado e uma lista de mensagens (sucesso/erro/aviso).
-    """
-    all_ingressantes_dfs = []
-    messages = []
-
-    if not os.path.exists(INGRESSANTES_FOLDER):
-        messages.append({"type": "error", "text": f"Erro: A pasta de ingressantes '{INGRESSANTES_FOLDER}' não foi encontrada. "
-                                                  "Certifique-se de que a estrutura é 'seu_app/dataset/ingressantes'."})
-        return pd.DataFrame(), messages
-
-    ingressantes_files = [f for f in os.listdir(INGRESSANTES_FOLDER) if f.endswith('.csv')]
-    
-    if not ingressantes_files:
-        messages.append({"type": "warning", "text": f"Nenhum arquivo CSV encontrado na pasta '{INGRESSANTES_FOLDER}'."})
-        return pd.DataFrame(), messages
-
-    for file_name in ingressantes_files:
-        file_path = os.path.join(INGRESSANTES_FOLDER, file_name)
-        year = extract_year_from_filename(file_name)
-        
-        try:
-            df = pd.read_csv(file_path, sep=';')
-            df.columns = df.columns.str.lower() # Converte todos os nomes de colunas para minúsculas
-
-            if year:
-                df['ano'] = year
-            else:
-                messages.append({"type": "warning", "text": f"Não foi possível extrair o ano de '{file_name}'. O arquivo pode não ser incluído em filtros por ano."})
-
-            all_ingressantes_dfs.append(df)
-            messages.append({"type": "toast", "text": f"Carregado: {file_name}"})
-        except Exception as e:
-            messages.append({"type": "error", "text": f"Erro ao carregar o arquivo de ingressantes '{file_name}': {e}. Verifique o formato do CSV e a codificação."})
-            continue
-
-    if not all_ingressantes_dfs:
-        messages.append({"type": "error", "text": "Nenhum dado de ingressantes pôde ser carregado. Retornando DataFrame vazio."})
-        return pd.DataFrame(), messages
-
-    df_ingressantes_combined = pd.concat(all_ingressantes_dfs, ignore_index=True)
-
-    # --- Pré-processamento FINAIS para INGRESSANTES ---
-    # Padroniza a coluna 'nivel_ensino'
-    if 'nivel_ensino' in df_ingressantes_combined.columns:
-        df_ingressantes_combined['nivel_ensino'] = df_ingressantes_combined['nivel_ensino'].astype(str).str.strip().str.upper()
-        df_ingressantes_combined['nivel_ensino'].fillna('DESCONHECIDO', inplace=True)
-    else:
-        df_ingressantes_combined['nivel_ensino'] = 'DESCONHECIDO'
-        messages.append({"type": "warning", "text": "Coluna 'nivel_ensino' não encontrada nos dados de ingressantes. Criando coluna 'nivel_ensino' com 'DESCONHECIDO'."})
-
-    # Padroniza a coluna 'sexo'
-    sexo_cols = [col for col in df_ingressantes_combined.columns if 'sexo' in col]
-    if sexo_cols:
-        df_ingressantes_combined['sexo'] = df_ingressantes_combined[sexo_cols[0]].astype(str).str.strip().str.upper()
-        df_ingressantes_combined['sexo'] = df_ingressantes_combined['sexo'].replace({
-            'MASCULINO': 'M', 'FEMININO': 'F', 'HOMEM': 'M', 'MULHER': 'F',
-            'MALE': 'M', 'FEMALE': 'F'
-        })
-        df_ingressantes_combined['sexo'].fillna('INDEFINIDO', inplace=True)
-        df_ingressantes_combined.loc[~df_ingressantes_combined['sexo'].isin(['M', 'F']), 'sexo'] = 'INDEFINIDO'
-    else:
-        df_ingressantes_combined['sexo'] = 'INDEFINIDO'
-        messages.append({"type": "warning", "text": "Coluna de sexo não encontrada nos dados de ingressantes. Criando coluna 'sexo' com 'INDEFINIDO'."})
-
-    # Padroniza a coluna 'nome_curso'
-    if 'nome_curso' in df_ingressantes_combined.columns:
-        df_ingressantes_combined['nome_curso'] = df_ingressantes_combined['nome_curso'].astype(str).str.strip().str.upper()
-        df_ingressantes_combined['nome_curso'].fillna('DESCONHECIDO', inplace=True)
-    else:
-        df_ingressantes_combined['nome_curso'] = 'DESCONHECIDO'
-        messages.append({"type": "warning", "text": "Coluna 'nome_curso' não encontrada nos dados de ingressantes. Criando coluna 'nome_curso' com 'DESCONHECIDO'."})
-
-    # Padroniza a coluna 'nome_unidade' (Substitui 'nome_unidade_gestora')
-    if 'nome_unidade' in df_ingressantes_combined.columns:
-        df_ingressantes_combined['nome_unidade'] = df_ingressantes_combined['nome_unidade'].astype(str).str.strip().str.upper()
-        df_ingressantes_combined['nome_unidade'].fillna('DESCONHECIDA', inplace=True)
-    elif 'nome_unidade_gestora' in df_ingressantes_combined.columns: # Se existir a antiga, renomeia e padroniza
-        df_ingressantes_combined['nome_unidade'] = df_ingressantes_combined['nome_unidade_gestora'].astype(str).str.strip().str.upper()
-        df_ingressantes_combined['nome_unidade'].fillna('DESCONHECIDA', inplace=True)
-        df_ingressantes_combined.drop(columns=['nome_unidade_gestora'], errors='ignore', inplace=True)
-        messages.append({"type": "info", "text": "Coluna 'nome_unidade_gestora' renomeada para 'nome_unidade' nos dados de ingressantes."})
-    else:
-        df_ingressantes_combined['nome_unidade'] = 'DESCONHECIDA'
-        messages.append({"type": "warning", "text": "Coluna 'nome_unidade' (ou 'nome_unidade_gestora') não encontrada nos dados de ingressantes. Criando coluna 'nome_unidade' com 'DESCONHECIDA'."})
-
-    # 'total_periodos' não é aplicável para ingressantes, removendo qualquer referência
-    if 'total_periodos' in df_ingressantes_combined.columns:
-        df_ingressantes_combined.drop(columns=['total_periodos'], errors='ignore', inplace=True)
-
-
-    df_ingressantes_combined.drop_duplicates(inplace=True)
+    """Carrega e padroniza os dados de ingressantes (ver analytics.load_dataset)."""
+    return analytics.load_dataset('ingressantes')
 
-    if 'ano' in df_ingressantes_combined.columns:
-        df_ingressantes_combined['ano'] = pd.to_numeric(df_ingressantes_combined['ano'], errors='coerce').fillna(0).astype(int)
-    else:
-        messages.append({"type": "error", "text": "Coluna 'ano' não disponível nos dados de ingressantes para filtros. Verifique o nome dos arquivos."})
-        
-    messages.append({"type": "success", "text": "Dados de Ingressantes carregados e pré-processados!"})
-    return df_ingressantes_combined, messages
-
-@st.cache_data(show_spinner="Carregando e processando dados de EGRESSOS...")
+@timed('carregamento_egressos', rows=lambda result: len(result[0]))
+@metrics_export.cached('dados', memory_profiling.tracked(
+    'dados', st.cache_data(show_spinner="Carregando e processando dados de EGRESSOS...")))
 def load_and_preprocess_egressos_data():
-    """
-    Carrega todos os arquivos CSV de egressos, os concatena,
-    adiciona a coluna 'ano' e padroniza as colunas 'nivel_ensino', 'sexo', 'nome_curso',
-    'nome_unidade' e CALCULA 'total_periodos'.
-    Retorna o DataFrame processado e uma lista de mensagens.
-    """
-    all_egressos_dfs = []
-    messages = []
-
-    if not os.path.exists(EGRESSOS_FOLDER):
-        messages.append({"type": "error", "text": f"Erro: A pasta de egressos '{EGRESSOS_FOLDER}' não foi encontrada. "
-                                                 "Certifique-se de que a estrutura é 'seu_app/dataset/egressos'."})
-        return pd.DataFrame(), messages
-
-    egressos_files = [f for f in os.listdir(EGRESSOS_FOLDER) if f.endswith('.csv')]
-
-    if not egressos_files:
-        messages.append({"type": "warning", "text": f"Nenhum arquivo CSV encontrado na pasta '{EGRESSOS_FOLDER}'."})
-        return pd.DataFrame(), messages
-
-    for file_name in egressos_files:
-        file_path = os.path.join(EGRESSOS_FOLDER, file_name)
-        year = extract_year_from_filename(file_name)
-
-        try:
-            df = pd.read_csv(file_path, sep=';')
-            df.columns = df.columns.str.lower()
-
-            if year:
-                df['ano'] = year
-            else:
-                messages.append({"type": "warning", "text": f"Não foi possível extrair o ano de '{file_name}'. O arquivo pode não ser incluído em filtros por ano."})
-            
-            all_egressos_dfs.append(df)
-            messages.append({"type": "toast", "text": f"Carregado: {file_name}"})
-        except Exception as e:
-            messages.append({"type": "error", "text": f"Erro ao carregar o arquivo de egressos '{file_name}': {e}. Verifique o formato do CSV e a codificação."})
-            continue
-
-    if not all_egressos_dfs:
-        messages.append({"type": "error", "text": "Nenhum dado de egressos pôde ser carregado. Retornando DataFrame vazio."})
-        return pd.DataFrame(), messages
-
-    df_egressos_combined = pd.concat(all_egressos_dfs, ignore_index=True)
+    """Carrega e padroniza os dados de egressos (ver analytics.load_dataset)."""
+    return analytics.load_dataset('egressos')
 
-    # --- Pré-processamento FINAIS para EGRESSOS ---
-    # Padroniza a coluna 'nivel_ensino'
-    if 'nivel_ensino' in df_egressos_combined.columns:
-        df_egressos_combined['nivel_ensino'] = df_egressos_combined['nivel_ensino'].astype(str).str.strip().str.upper()
-        df_egressos_combined['nivel_ensino'].fillna('DESCONHECIDO', inplace=True)
-    else:
-        df_egressos_combined['nivel_ensino'] = 'DESCONHECIDO'
-        messages.append({"type": "warning", "text": "Coluna 'nivel_ensino' não encontrada nos dados de egressos. Criando coluna 'nivel_ensino' com 'DESCONHECIDO'."})
-
-    # Padroniza a coluna 'sexo'
-    sexo_cols = [col for col in df_egressos_combined.columns if 'sexo' in col]
-    if sexo_cols:
-        df_egressos_combined['sexo'] = df_egressos_combined[sexo_cols[0]].astype(str).str.strip().str.upper()
-        df_egressos_combined['sexo'] = df_egressos_combined['sexo'].replace({
-            'MASCULINO': 'M', 'FEMININO': 'F', 'HOMEM': 'M', 'MULHER': 'F',
-            'MALE': 'M', 'FEMALE': 'F'
-        })
-        df_egressos_combined['sexo'].fillna('INDEFINIDO', inplace=True)
-        df_egressos_combined.loc[~df_egressos_combined['sexo'].isin(['M', 'F']), 'sexo'] = 'INDEFINIDO'
-    else:
-        df_egressos_combined['sexo'] = 'INDEFINIDO'
-        messages.append({"type": "warning", "text": "Coluna de sexo não encontrada nos dados de egressos. Criando coluna 'sexo' com 'INDEFINIDO'."})
-
-    # Padroniza a coluna 'nome_curso'
-    if 'nome_curso' in df_egressos_combined.columns:
-        df_egressos_combined['nome_curso'] = df_egressos_combined['nome_curso'].astype(str).str.strip().str.upper()
-        df_egressos_combined['nome_curso'].fillna('DESCONHECIDO', inplace=True)
-    else:
-        df_egressos_combined['nome_curso'] = 'DESCONHECIDO'
-        messages.append({"type": "warning", "text": "Coluna 'nome_curso' não encontrada nos dados de egressos. Criando coluna 'nome_curso' com 'DESCONHECIDO'."})
-
-    # Padroniza a coluna 'nome_unidade' (Substitui 'nome_unidade_gestora')
-    if 'nome_unidade' in df_egressos_combined.columns:
-        df_egressos_combined['nome_unidade'] = df_egressos_combined['nome_unidade'].astype(str).str.strip().str.upper()
-        df_egressos_combined['nome_unidade'].fillna('DESCONHECIDA', inplace=True)
-    elif 'nome_unidade_gestora' in df_egressos_combined.columns: # Se existir a antiga, renomeia e padroniza
-        df_egressos_combined['nome_unidade'] = df_egressos_combined['nome_unidade_gestora'].astype(str).str.strip().str.upper()
-        df_egressos_combined['nome_unidade'].fillna('DESCONHECIDA', inplace=True)
-        df_egressos_combined.drop(columns=['nome_unidade_gestora'], errors='ignore', inplace=True)
-        messages.append({"type": "info", "text": "Coluna 'nome_unidade_gestora' renomeada para 'nome_unidade' nos dados de egressos."})
-    else:
-        df_egressos_combined['nome_unidade'] = 'DESCONHECIDA'
-        messages.append({"type": "warning", "text": "Coluna 'nome_unidade' (ou 'nome_unidade_gestora') não encontrada nos dados de egressos. Criando coluna 'nome_unidade' com 'DESCONHECIDA'."})
-
-    # --- CALCULA total_periodos para EGRESSOS ---
-    required_cols_for_periods = ['ano_conclusao', 'periodo_conclusao', 'ano_ingresso', 'periodo_ingresso']
-    # Verifica se todas as colunas necessárias estão presentes no DataFrame antes de tentar o cálculo
-    if all(col in df_egressos_combined.columns for col in required_cols_for_periods):
-        try:
-            # Converte para numérico e preenche NaN com 0 antes do cálculo
-            for col in required_cols_for_periods:
-                df_egressos_combined[col] = pd.to_numeric(df_egressos_combined[col], errors='coerce').fillna(0)
-            
-            # Garante que os períodos sejam inteiros para o cálculo
-            df_egressos_combined['periodo_conclusao'] = df_egressos_combined['periodo_conclusao'].astype(int)
-            df_egressos_combined['periodo_ingresso'] = df_egressos_combined['periodo_ingresso'].astype(int)
-            df_egressos_combined['ano_conclusao'] = df_egressos_combined['ano_conclusao'].astype(int)
-            df_egressos_combined['ano_ingresso'] = df_egressos_combined['ano_ingresso'].astype(int)
-
-            # Cálculo do total de períodos
-            df_egressos_combined['total_periodos'] = (
-                (df_egressos_combined['ano_conclusao'] - df_egressos_combined['ano_ingresso']) * 2 +
-                (df_egressos_combined['periodo_conclusao'] - df_egressos_combined['periodo_ingresso'])
-            )
-            # Garante que total_periodos não seja negativo (caso haja dados inconsistentes)
-            df_egressos_combined['total_periodos'] = df_egressos_combined['total_periodos'].apply(lambda x: max(0, x))
-            messages.append({"type": "success", "text": "Coluna 'total_periodos' calculada para egressos."})
-        except Exception as e:
-            df_egressos_combined['total_periodos'] = 0
-            messages.append({"type": "warning", "text": f"Erro ao calcular 'total_periodos' para egressos: {e}. Coluna criada com 0."})
-    else:
-        df_egressos_combined['total_periodos'] = 0
-        messages.append({"type": "warning", "text": f"Colunas ({', '.join(required_cols_for_periods)}) necessárias para calcular 'total_periodos' não encontradas nos dados de egressos. Coluna criada com 0."})
-
-
-    df_egressos_combined.drop_duplicates(inplace=True)
-
-    if 'ano' in df_egressos_combined.columns:
-        df_egressos_combined['ano'] = pd.to_numeric(df_egressos_combined['ano'], errors='coerce').fillna(0).astype(int)
-    else:
-        messages.append({"type": "error", "text": "Coluna 'ano' não disponível nos dados de egressos para filtros. Verifique o nome dos arquivos."})
-
-    messages.append({"type": "success", "text": "Dados de Egressos carregados e pré-processados!"})
-    return df_egressos_combined, messages
+# Backend SQL opcional para os filtros e as agregações dos gráficos (DASHBOARD_DATA_BACKEND=duckdb).
+# As fingerprints das pastas de dados compõem a chave do cache; os DataFrames não entram no hash.
+@st.cache_resource(show_spinner="Preparando os arquivos Parquet do backend SQL...")
+def get_sql_backend(ingressantes_fp, egressos_fp, _frames):
+    """Backend DuckDB sobre os DataFrames carregados (ver sql_backend.py)."""
+    return sql_backend.DuckDBBackend(_frames)
 
 # --- Carrega os DataFrames e as mensagens no início do seu app ---
 df_ingressantes, ingressantes_load_messages = load_and_preprocess_ingressantes_data()
@@ -405,10 +263,11 @@ for msg in egressos_load_messages:
 
 # Colunas de logo na barra lateral
 col1, col2 = st.sidebar.columns(2)
-with col1:
-    st.image("ufrn.png", width=150)
-with col2:
-    st.image("dca.png", width=100)
+# As logos vêm da mesma pasta estática (em 2x a largura exibida, para telas de alta densidade)
+for logo_col, logo_path, logo_width in [(col1, "ufrn.png", 150), (col2, "dca.png", 100)]:
+    logo_url = get_asset_url(logo_path, max_width=logo_width * 2)
+    if logo_url:
+        logo_col.markdown(f'<img src="{logo_url}" width="{logo_width}">', unsafe_allow_html=True)
 
 # --- Verificação inicial se os DataFrames foram carregados com sucesso ---
 if df_ingressantes.empty and df_egressos.empty:
@@ -421,194 +280,398 @@ if df_ingressantes.empty and df_egressos.empty:
 # --- Filtros na Barra Lateral (Sidebar) ---
 st.sidebar.header("Filtros Globais")
 
-# Coleta todas as opções possíveis de nível de ensino dos dados brutos combinados
-all_niveis_ensino_options = set()
-if 'nivel_ensino' in df_ingressantes.columns:
-    all_niveis_ensino_options.update(df_ingressantes['nivel_ensino'].unique())
-if 'nivel_ensino' in df_egressos.columns:
-    all_niveis_ensino_options.update(df_egressos['nivel_ensino'].unique())
-
-sorted_niveis_ensino = sorted(list(all_niveis_ensino_options))
-default_nivel_ensino_selection = sorted_niveis_ensino
-
-selected_niveis_ensino = st.sidebar.multiselect(
-    "Filtrar por Nível de Ensino:",
-    options=sorted_niveis_ensino,
-    default=default_nivel_ensino_selection,
-    key='global_nivel_ensino_filter'
-)
-
-# Slider de Ano (2014-2024)
-min_available_year = min(df_ingressantes['ano'].min() if not df_ingressantes.empty else 2014, 
-                         df_egressos['ano'].min() if not df_egressos.empty else 2014)
-max_available_year = max(df_ingressantes['ano'].max() if not df_ingressantes.empty else 2024, 
-                         df_egressos['ano'].max() if not df_egressos.empty else 2024)
-
-min_slider_year = max(2014, min_available_year)
-max_slider_year = min(2024, max_available_year)
-
-default_slider_value = (min_slider_year, max_slider_year)
-if default_slider_value[0] > default_slider_value[1]:
-    default_slider_value = (2014, 2024)
-
-selected_years = st.sidebar.slider(
-    'Intervalo de Anos:',
-    min_value=min_slider_year,
-    max_value=max_slider_year,
-    value=default_slider_value,
-    step=1,
-    key='global_years_filter'
-)
-
-# Filtro por Sexo
-all_sexos_options = set()
-if 'sexo' in df_ingressantes.columns:
-    all_sexos_options.update(df_ingressantes['sexo'].unique())
-if 'sexo' in df_egressos.columns:
-    all_sexos_options.update(df_egressos['sexo'].unique())
-
-sorted_sexos = []
-if 'M' in all_sexos_options: sorted_sexos.append('M')
-if 'F' in all_sexos_options: sorted_sexos.append('F')
-if 'INDEFINIDO' in all_sexos_options: sorted_sexos.append('INDEFINIDO')
-for s in sorted(list(all_sexos_options)):
-    if s not in ['M', 'F', 'INDEFINIDO']:
-        sorted_sexos.append(s)
-
-default_sex_selection = sorted_sexos if sorted_sexos else []
-
-selected_sexos = st.sidebar.multiselect(
-    "Filtrar por Sexo:",
-    options=sorted_sexos,
-    default=default_sex_selection,
-    key='global_sex_filter'
-)
-
-# --- Lógica para Coletar Opções de Unidade (Aninhado: Nível + Ano) ---
-# Cria DataFrames temporários combinados para obter as opções de unidade
-# que respeitam os filtros de nível de ensino e ano já selecionados.
-temp_df_for_unidade_options = pd.DataFrame()
-if not df_ingressantes.empty:
-    temp_df_for_unidade_options = pd.concat([temp_df_for_unidade_options, df_ingressantes], ignore_index=True)
-if not df_egressos.empty:
-    temp_df_for_unidade_options = pd.concat([temp_df_for_unidade_options, df_egressos], ignore_index=True)
-
-if not temp_df_for_unidade_options.empty:
-    # Aplica filtro de nível de ensino
-    if selected_niveis_ensino and 'nivel_ensino' in temp_df_for_unidade_options.columns:
-        temp_df_for_unidade_options = temp_df_for_unidade_options[
-            temp_df_for_unidade_options['nivel_ensino'].isin(selected_niveis_ensino)
-        ]
-    else: 
-        temp_df_for_unidade_options = pd.DataFrame() 
-
-    # Aplica filtro de ano
-    if selected_years and 'ano' in temp_df_for_unidade_options.columns and not temp_df_for_unidade_options.empty:
-        min_y_sel, max_y_sel = selected_years
-        temp_df_for_unidade_options = temp_df_for_unidade_options[
-            (temp_df_for_unidade_options['ano'] >= min_y_sel) & 
-            (temp_df_for_unidade_options['ano'] <= max_y_sel)
-        ]
-    elif not temp_df_for_unidade_options.empty and 'ano' not in temp_df_for_unidade_options.columns:
-        st.warning("Coluna 'ano' não encontrada nos dados para filtro de unidade. Opções de unidade podem ser imprecisas.")
-    
-all_unidades_options = set()
-if 'nome_unidade' in temp_df_for_unidade_options.columns and not temp_df_for_unidade_options.empty:
-    all_unidades_options.update(temp_df_for_unidade_options['nome_unidade'].unique())
-
-sorted_unidades = sorted(list(all_unidades_options))
-default_unidade_selection = sorted_unidades 
-
-selected_unidades = st.sidebar.multiselect(
-    "Filtrar por Unidade:",
-    options=sorted_unidades,
-    default=default_unidade_selection,
-    key='global_unidade_filter'
-)
-
-# --- Lógica para Coletar Opções de Curso (Aninhado: Nível + Ano + Unidade) ---
-# O DataFrame base para as opções de curso agora é o 'temp_df_for_unidade_options'
-# que já foi filtrado por Nível e Ano. Agora, filtramos por Unidade.
-temp_df_for_course_options = temp_df_for_unidade_options.copy() 
-
-# Aplica filtro de unidade ao DataFrame temporário
-if selected_unidades and 'nome_unidade' in temp_df_for_course_options.columns and not temp_df_for_course_options.empty:
-    temp_df_for_course_options = temp_df_for_course_options[
-        temp_df_for_course_options['nome_unidade'].isin(selected_unidades)
-    ]
-else: # Se nenhuma unidade selecionada ou coluna inexistente, não há cursos para exibir
-    temp_df_for_course_options = pd.DataFrame()
-
+# A montagem das opções (cascata nível > ano > unidade > curso) é medida como uma única etapa
+with stage('opcoes_sidebar', rows=len(df_ingressantes) + len(df_egressos)):
+    # As opções vêm de analytics.py; aqui só montamos os widgets
+    student_frames = [df_ingressantes, df_egressos]
+    sorted_niveis_ensino = analytics.nivel_ensino_options(student_frames)
+    selected_niveis_ensino = st.sidebar.multiselect(
+        "Filtrar por Nível de Ensino:",
+        options=sorted_niveis_ensino,
+        default=sorted_niveis_ensino,
+        key='global_nivel_ensino_filter'
+    )
 
-all_cursos_options = set()
-if 'nome_curso' in temp_df_for_course_options.columns and not temp_df_for_course_options.empty:
-    all_cursos_options.update(temp_df_for_course_options['nome_curso'].unique())
+    # Slider de Ano (2014-2024)
+    min_slider_year, max_slider_year, default_slider_value = analytics.year_bounds(student_frames)
+    selected_years = st.sidebar.slider(
+        'Intervalo de Anos:',
+        min_value=min_slider_year,
+        max_value=max_slider_year,
+        value=default_slider_value,
+        step=1,
+        key='global_years_filter'
+    )
 
-sorted_cursos = sorted(list(all_cursos_options))
-default_curso_selection = sorted_cursos
+    # Filtro por Sexo
+    sorted_sexos = analytics.sex_options(student_frames)
+    selected_sexos = st.sidebar.multiselect(
+        "Filtrar por Sexo:",
+        options=sorted_sexos,
+        default=sorted_sexos,
+        key='global_sex_filter'
+    )
 
-selected_cursos = st.sidebar.multiselect(
-    "Filtrar por Curso:",
-    options=sorted_cursos,
-    default=default_curso_selection,
-    key='global_course_filter'
-)
+    # Opções de Unidade (aninhadas: Nível + Ano)
+    sorted_unidades = analytics.unidade_options(student_frames, selected_niveis_ensino, selected_years)
+    selected_unidades = st.sidebar.multiselect(
+        "Filtrar por Unidade:",
+        options=sorted_unidades,
+        default=sorted_unidades,
+        key='global_unidade_filter'
+    )
 
+    # Opções de Curso (aninhadas: Nível + Ano + Unidade)
+    sorted_cursos = analytics.course_options(student_frames, selected_niveis_ensino, selected_years, selected_unidades)
+    selected_cursos = st.sidebar.multiselect(
+        "Filtrar por Curso:",
+        options=sorted_cursos,
+        default=sorted_cursos,
+        key='global_course_filter'
+    )
 
-# --- Função para aplicar os filtros da sidebar aos DataFrames ---
-def apply_sidebar_filters(df, years_range, sex_filter_list, course_filter_list, nivel_ensino_filter_list, unidade_filter_list):
-    """Aplica os filtros de ano, sexo, curso, nível de ensino e unidade a um DataFrame dado."""
-    df_filtered = df.copy()
+# --- Filtros, agregações e figuras ---
+# A aplicação dos filtros da sidebar (filters.py) e a construção das figuras (figures.py) são funções puras,
+# sem chamadas st.*, para serem reaproveitadas pelos benchmarks; aqui só exibimos os resultados.
+# Rótulos das quebras extras do Comparativo Geral (dimensões do cubo de contagens)
+COMPARATIVO_QUEBRAS_EXTRAS = {'nivel_ensino': 'Nível de Ensino', 'nome_unidade': 'Unidade'}
+
+# --- Tabela paginada (resolvida no servidor, ver analytics.paginate_dataframe) ---
+OPCOES_TAMANHO_PAGINA = [10, 25, 50, 100]
+# Ordens de linhas guardadas (cada uma com um inteiro por linha filtrada)
+TABLE_ORDER_CACHE_ENTRIES = int(os.environ.get("DASHBOARD_TABLE_ORDER_CACHE_ENTRIES", "16"))
+
+# 'data_key' identifica os dados filtrados (arquivos de dados e estado dos filtros); o DataFrame não entra no hash
+@metrics_export.cached('ordenacao_tabela', memory_profiling.tracked(
+    'ordenacao_tabela', st.cache_data(show_spinner=False, max_entries=TABLE_ORDER_CACHE_ENTRIES)))
+def cached_sort_order(data_key, sort_column, ascending, _df):
+    """Ordem das linhas da tabela, calculada uma vez por (dados filtrados, coluna, direção) e fatiada a cada página."""
+    return analytics.sort_order(_df, sort_column, ascending)
+
+def render_paginated_table(df, label, key_prefix, data_key):
+    """
+    Exibe um DataFrame com controles de tamanho de página, página e ordenação. 'data_key' identifica
+    os dados filtrados e indexa a ordem das linhas em cache: trocar de página não reordena a tabela.
+    """
+    sortable_columns = [col for col in df.columns if col not in COLUNAS_OCULTAS_TABELA]
+
+    col_tam, col_ord, col_dir, col_pag = st.columns(4)
+    with col_tam:
+        page_size = st.selectbox(f"Alunos por página ({label}):", options=OPCOES_TAMANHO_PAGINA,
+                                 key=f'{key_prefix}_page_size')
+    with col_ord:
+        sort_column = st.selectbox(f"Ordenar por ({label}):", options=['(sem ordenação)'] + sortable_columns,
+                                   key=f'{key_prefix}_sort_column')
+    with col_dir:
+        ascending = st.radio(f"Ordem ({label}):", options=['Crescente', 'Decrescente'],
+                             horizontal=True, key=f'{key_prefix}_sort_order') == 'Crescente'
+
+    total_pages = max(1, -(-len(df) // page_size))
+    # Se os filtros reduziram o número de páginas, volta para a última página válida
+    if st.session_state.get(f'{key_prefix}_page_number', 1) > total_pages:
+        st.session_state[f'{key_prefix}_page_number'] = total_pages
+    with col_pag:
+        page_number = st.number_input(f"Página ({label}):", min_value=1, max_value=total_pages,
+                                      value=1, step=1, key=f'{key_prefix}_page_number')
+
+    sort_column = None if sort_column == '(sem ordenação)' else sort_column
+    page_df, total_pages = analytics.paginate_dataframe(
+        df, page_size, int(page_number), sort_column=sort_column, ascending=ascending,
+        order=cached_sort_order(data_key, sort_column, ascending, df) if sort_column else None
+    )
+    st.dataframe(page_df)
+    st.write(f"Página {min(int(page_number), total_pages)} de {total_pages}. "
+             f"Total de registros de {label} filtrados: {len(df)}")
+
+# --- Modelos de Machine Learning: registro em disco ---
+# Pré-calcula, após o treino, uma tabela de predições para as combinações de entrada dos formulários
+PREDICTION_LOOKUP = os.environ.get("DASHBOARD_PREDICTION_LOOKUP", "1") == "1"
+MODEL_REGISTRY_FOLDER = os.environ.get("DASHBOARD_MODEL_REGISTRY", "model_registry")
+MODEL_REGISTRY_MAX_BYTES = int(os.environ.get("DASHBOARD_MODEL_REGISTRY_MAX_BYTES", str(1_000_000_000)))
+
+@st.cache_resource
+def get_model_registry():
+    """Registro de modelos compartilhado por todas as sessões do processo."""
+    return ModelRegistry(MODEL_REGISTRY_FOLDER, MODEL_REGISTRY_MAX_BYTES)
+
+# Usa os hiperparâmetros gravados no registro pela busca offline (python -m hyperparameter_search), se houver
+USE_TUNED_PARAMS = os.environ.get("DASHBOARD_USE_TUNED_PARAMS", "1") == "1"
+
+@st.cache_data(ttl=60)
+def get_tuned_params(backend):
+    """Hiperparâmetros vencedores da busca offline para o backend, ou None."""
+    result = get_model_registry().load_settings(tuned_params_key(backend))
+    return result['params'] if result is not None else None
+
+def backend_params(backends, backend):
+    """Hiperparâmetros de treino do backend: os da busca offline, se houver, senão os padrões."""
+    tuned = get_tuned_params(backend) if USE_TUNED_PARAMS else None
+    return tuned if tuned is not None else backends[backend]['params']
+
+# Nas funções abaixo, os parâmetros com '_' não são hasheados pelo Streamlit:
+# o cache em memória é indexado apenas pela chave do registro.
+@timed('modelo_classificacao', rows_arg=3)
+@metrics_export.cached('modelo_classificacao', memory_profiling.tracked(
+    'modelo_classificacao', st.cache_resource(show_spinner="Carregando ou treinando o modelo de classificação...")))
+def load_or_train_classification_model(registry_key, backend, _params, _X_train, _y_train, _encoders):
+    """Carrega do registro o pacote do classificador para 'registry_key' ou o treina e salva."""
+    registry = get_model_registry()
+    bundle = registry.load(registry_key)
+    if bundle is None:
+        cardinalities = [len(_encoders[col].classes_) if col in _encoders else None for col in _X_train.columns]
+        with observe_training('classificacao', backend, 'full'):
+            model = train_classifier(backend, _params, _X_train, _y_train, cardinalities)
+        bundle = {'model': model, 'encoders': _encoders, 'feature_columns': list(_X_train.columns), 'backend': backend}
+        if PREDICTION_LOOKUP:
+            # Tabela indexada pelos rótulos originais, com as probabilidades de cada combinação presente no treino
+            grid = enumerate_input_space(_X_train, list(_X_train.columns), [])
+            key_grid = pd.DataFrame({col: _encoders[col].classes_[grid[col]] if col in _encoders else grid[col]
+                                     for col in grid.columns})
+            bundle['lookup'] = build_prediction_lookup(model.predict_proba, grid, key_grid)
+        registry.save(registry_key, bundle)
+    return bundle
+
+# --- Treinamento em segundo plano (modelo de regressão) ---
+TRAINING_WORKERS = int(os.environ.get("DASHBOARD_TRAINING_WORKERS", "1"))
+# Modelos e relatórios de validação cruzada mantidos em memória (os mais recentes); os demais ficam no registro
+TRAINING_MAX_SLOTS = int(os.environ.get("DASHBOARD_TRAINING_MAX_SLOTS", "32"))
+
+@st.cache_resource
+def get_training_service():
+    """
+    Fila de treinamento compartilhada por todas as sessões do processo. Os modelos e relatórios mantidos
+    em memória entram na contabilidade de memória e podem ser descartados pelo orçamento.
+    """
+    def observer(slot, result, stored):
+        memory_profiling.track_value('treinos', 'TrainingService.last_good', slot, result,
+                                     clear=service.forget, stored=stored)
+
+    service = TrainingService(max_workers=TRAINING_WORKERS, max_slots=TRAINING_MAX_SLOTS,
+                              observer=observer if memory_profiling.ACCOUNTING_ENABLED else None)
+    return service
+
+# Atualiza incrementalmente o modelo de regressão quando só chegaram arquivos de anos novos
+INCREMENTAL_TRAINING = os.environ.get("DASHBOARD_INCREMENTAL_TRAINING", "1") == "1"
+
+def register_regression_bundle(registry, registry_key, bundle, X_train, metadata=None):
+    """Completa o pacote do regressor (tabela de predições) e o salva no registro."""
+    if PREDICTION_LOOKUP:
+        # Pré-calcula, em uma única chamada, as predições de todas as combinações válidas do formulário
+        categorical, numeric = split_feature_types(X_train, bundle['feature_columns'])
+        grid = enumerate_input_space(X_train, categorical, numeric)
+        bundle['lookup'] = build_prediction_lookup(
+            lambda batch: bundle['model'].predict(encode_for_model(bundle, batch)), grid
+        )
+    bundle['registry_key'] = registry_key
+    registry.save(registry_key, bundle, metadata)
+    return bundle
+
+def train_and_register_regression(registry, registry_key, backend, params, X_train, y_train, metadata=None):
+    """Treina o regressor do backend escolhido e salva o pacote no registro (executado pelo serviço de treinamento)."""
+    with observe_training('regressao', backend, 'full'):
+        bundle = train_regression_bundle(backend, params, X_train, y_train)
+    bundle['training_mode'] = 'full'
+    return register_regression_bundle(registry, registry_key, bundle, X_train, metadata)
+
+def plan_incremental_update(registry, backend, metadata, row_years):
+    """
+    Procura no registro um modelo da mesma linhagem (backend, hiperparâmetros, filtros, features e alvo)
+    treinado com um subconjunto dos arquivos atuais, em que os arquivos novos são de anos que ele não viu.
+    Retorna (chave do modelo base, máscara das linhas de treino vindas dos anos novos) ou None.
+    """
+    if backend not in INCREMENTAL_BACKENDS or metadata['source_files'] is None:
+        return None
+    current_files = {tuple(f) for f in metadata['source_files']}
+    for base_key, base_metadata in registry.find(lineage=metadata['lineage']):
+        base_files = {tuple(f) for f in base_metadata.get('source_files') or []}
+        if not base_files < current_files:
+            continue
+        base_years = {data_loading.extract_year_from_filename(name) for name, _, _ in base_files}
+        new_years = {data_loading.extract_year_from_filename(name) for name, _, _ in current_files - base_files}
+        if None in new_years or new_years & base_years:
+            continue
+        return base_key, row_years.isin(new_years).to_numpy()
+    return None
 
-    # Filtro por Nível de Ensino - PRIMEIRO
-    if 'nivel_ensino' in df_filtered.columns and nivel_ensino_filter_list:
-        df_filtered = df_filtered[df_filtered['nivel_ensino'].isin(nivel_ensino_filter_list)]
+def update_and_register_regression(registry, registry_key, backend, params, X_train, y_train, base_key, is_new, metadata):
+    """
+    Atualiza o modelo base com as linhas dos anos novos, se o teste de drift permitir;
+    caso contrário (ou se o modelo base sumiu do registro), faz o treino completo.
+    """
+    base = registry.load(base_key)
+    if base is None or 'profile' not in base:
+        return train_and_register_regression(registry, registry_key, backend, params, X_train, y_train, metadata)
+
+    X_new, y_new = X_train[is_new], y_train[is_new]
+    if X_new.empty:
+        # Os arquivos novos não trazem linhas para os filtros atuais: o modelo base continua válido
+        bundle = {**base, 'training_mode': 'reuse'}
+        return register_regression_bundle(registry, registry_key, bundle, X_train, metadata)
+
+    drift = check_drift(base['profile'], X_new, y_new)
+    if drift['retrain']:
+        logger.info("Drift detectado (%s): treino completo de %s.", "; ".join(drift['reasons']), registry_key)
+        with observe_training('regressao', backend, 'full'):
+            bundle = train_regression_bundle(backend, params, X_train, y_train)
+        bundle.update(training_mode='full', drift=drift)
+        return register_regression_bundle(registry, registry_key, bundle, X_train, metadata)
+
+    X_old, y_old = X_train[~is_new], y_train[~is_new]
+    n_replay = min(len(X_old), int(np.ceil(INCREMENTAL_REPLAY_RATIO * len(X_new))))
+    replay = X_old.sample(n=n_replay, random_state=42).index
+    with observe_training('regressao', backend, 'incremental'):
+        bundle = update_regression_bundle(base, X_new, y_new, X_old.loc[replay], y_old.loc[replay])
+    bundle.update(training_mode='incremental', drift=drift, new_rows=len(X_new))
+    return register_regression_bundle(registry, registry_key, bundle, X_train, metadata)
+
+@timed('modelo_regressao', rows_arg=3)
+def get_regression_model(registry_key, backend, params, X_train, y_train, metadata=None, row_years=None):
+    """
+    Retorna o pacote do regressor para 'registry_key' se ele já estiver treinado (em memória ou no registro).
+    Caso contrário, agenda o treino em segundo plano e retorna o último modelo bom do mesmo backend
+    (ou None) enquanto isso. Com 'metadata' (linhagem e arquivos de origem) e 'row_years' (ano do arquivo
+    de cada linha de treino), um modelo anterior da mesma linhagem pode ser atualizado em vez de retreinado.
+    """
+    service = get_training_service()
+    last_key, last_bundle = service.last_good(backend)
+    if last_key == registry_key:
+        metrics_export.record_cache('modelo_regressao', hit=True)
+        return last_bundle
+
+    registry = get_model_registry()
+    bundle = registry.load(registry_key)
+    metrics_export.record_cache('modelo_regressao', hit=bundle is not None)
+    if bundle is not None:
+        bundle['registry_key'] = registry_key
+        service.remember(backend, registry_key, bundle)
+        return bundle
+
+    plan = None
+    if INCREMENTAL_TRAINING and metadata is not None and row_years is not None:
+        plan = plan_incremental_update(registry, backend, metadata, row_years)
+    if plan is not None:
+        base_key, is_new = plan
+        train_fn = lambda: update_and_register_regression(registry, registry_key, backend, params, X_train, y_train,
+                                                          base_key, is_new, metadata)
     else:
-        return pd.DataFrame() 
-    
-    # Filtro por Ano - SEGUNDO
-    min_year_sel, max_year_sel = years_range
-    if 'ano' in df_filtered.columns:
-        df_filtered = df_filtered[
-            (df_filtered['ano'] >= min_year_sel) & 
-            (df_filtered['ano'] <= max_y_sel)
-        ]
+        train_fn = lambda: train_and_register_regression(registry, registry_key, backend, params, X_train, y_train,
+                                                         metadata)
+    service.submit(registry_key, train_fn, slot=backend)
+    return last_bundle
+
+@st.fragment(run_every=2)
+def wait_for_training(registry_key, description="o treinamento do modelo de regressão"):
+    """Acompanha um treino (ou avaliação) em segundo plano e recarrega a página quando ele termina."""
+    service = get_training_service()
+    status = service.status(registry_key)
+    if status == 'training':
+        st.caption(f"⏳ Executando {description} em segundo plano...")
+    elif status == 'failed':
+        st.error(f"Falha ao executar {description}: {service.error(registry_key)}")
     else:
-        st.warning(f"Coluna 'ano' não encontrada no DataFrame de {df.name if hasattr(df, 'name') else 'dados'} para filtro de ano.")
-
-    # Filtro por Unidade - TERCEIRO (Ordem alterada)
-    if 'nome_unidade' in df_filtered.columns and unidade_filter_list:
-        df_filtered = df_filtered[df_filtered['nome_unidade'].isin(unidade_filter_list)]
-    elif not unidade_filter_list and 'nome_unidade' in df_filtered.columns:
-        pass 
-
-    # Filtro por Nome do Curso - QUARTO (Ordem alterada)
-    if 'nome_curso' in df_filtered.columns and course_filter_list:
-        df_filtered = df_filtered[df_filtered['nome_curso'].isin(course_filter_list)]
-    elif not course_filter_list and 'nome_curso' in df_filtered.columns:
-        pass 
-
-    # Filtro por Sexo - QUINTO
-    if 'sexo' in df_filtered.columns and sex_filter_list:
-        df_filtered = df_filtered[df_filtered['sexo'].isin(sex_filter_list)]
-    elif not sex_filter_list and 'sexo' in df_filtered.columns:
-        pass 
+        st.rerun()
+
+# --- Validação cruzada (executada sob demanda e salva no registro) ---
+CV_FOLDS = int(os.environ.get("DASHBOARD_CV_FOLDS", str(model_evaluation.CV_FOLDS)))
+# Processos usados para treinar as dobras em paralelo (-1 = todos os núcleos)
+CV_WORKERS = int(os.environ.get("DASHBOARD_CV_WORKERS", "-1"))
+
+def get_evaluation_report(registry_key):
+    """Relatório de validação cruzada já calculado para 'registry_key' (em memória ou no registro), ou None."""
+    service = get_training_service()
+    _, report = service.last_good(registry_key)
+    if report is not None:
+        return report
+    report = get_model_registry().load(registry_key)
+    if report is not None:
+        service.remember(registry_key, registry_key, report)
+    return report
+
+def submit_evaluation(registry_key, evaluate):
+    """Agenda a validação cruzada no serviço de treinamento e salva o relatório no registro ao terminar."""
+    registry = get_model_registry()
+
+    def run():
+        report = evaluate()
+        registry.save(registry_key, report)
+        return report
+
+    get_training_service().submit(registry_key, run, slot=registry_key)
+
+def render_evaluation_report(report):
+    """Exibe as métricas por dobra, a média e o desvio padrão e, na classificação, a matriz de confusão total."""
+    fold_seconds = sum(fold['fit_seconds'] + fold['predict_seconds'] for fold in report['folds'])
+    st.caption(f"{report['n_splits']} dobras executadas em {report['wall_seconds']:.1f} s "
+               f"(soma dos tempos das dobras: {fold_seconds:.1f} s).")
+    st.dataframe(model_evaluation.folds_table(report).round(4), hide_index=True)
+    if report['task'] == 'classification':
+        st.text("Matriz de Confusão (soma das dobras):")
+        st.dataframe(model_evaluation.total_confusion_matrix(report))
+
+def evaluation_section(registry_key, evaluate, button_key):
+    """Mostra o relatório em cache ou oferece executar a validação cruzada em segundo plano."""
+    report = get_evaluation_report(registry_key)
+    if report is not None:
+        render_evaluation_report(report)
+        return
+
+    service = get_training_service()
+    status = service.status(registry_key)
+    if status == 'failed':
+        st.error(f"A última validação cruzada falhou: {service.error(registry_key)}")
+    if status == 'training' or st.button("Executar validação cruzada", key=button_key):
+        submit_evaluation(registry_key, evaluate)
+        wait_for_training(registry_key, "a validação cruzada")
+    else:
+        st.caption(f"A validação cruzada em {CV_FOLDS} dobras ainda não foi executada para esta configuração.")
 
+# --- Fingerprints de treino (chaves de cache baratas, sem hashear DataFrames) ---
+# Incrementar quando o pré-processamento ou o formato do pacote salvo mudar,
+# para invalidar modelos salvos com a versão anterior
+PREPROCESSING_VERSION = 3
 
-    return df_filtered
+def make_training_fingerprint(dataset_fp, filter_state, features, target_definition):
+    """Fingerprint de um treino a partir do estado dos filtros, das features e da definição do alvo."""
+    return fingerprint(PREPROCESSING_VERSION, dataset_fp, filter_state, list(features), target_definition)
 
 # Aplica os filtros da sidebar aos DataFrames de ingressantes e egressos
 df_ingressantes.name = "ingressantes" 
 df_egressos.name = "egressos"
 
-filtered_ingressantes = apply_sidebar_filters(
-    df_ingressantes, selected_years, selected_sexos, 
-    selected_cursos, selected_niveis_ensino, selected_unidades
-)
-filtered_egressos = apply_sidebar_filters(
-    df_egressos, selected_years, selected_sexos, 
-    selected_cursos, selected_niveis_ensino, selected_unidades
-)
+# Estado dos filtros (compõe as chaves de cache dos modelos e da ordem das tabelas)
+sidebar_filter_state = {
+    'anos': list(selected_years),
+    'sexos': sorted(selected_sexos),
+    'cursos': sorted(selected_cursos),
+    'niveis_ensino': sorted(selected_niveis_ensino),
+    'unidades': sorted(selected_unidades),
+}
+ingressantes_dataset_fp = fingerprint_source_files(data_loading.INGRESSANTES_FOLDER)
+egressos_dataset_fp = fingerprint_source_files(EGRESSOS_FOLDER)
+egressos_source_files = list_source_files(EGRESSOS_FOLDER)
+
+data_backend = None
+if sql_backend.SQL_BACKEND_ENABLED:
+    try:
+        data_backend = get_sql_backend(ingressantes_dataset_fp, egressos_dataset_fp,
+                                       {'ingressantes': df_ingressantes, 'egressos': df_egressos})
+    except Exception as e:
+        logger.exception("Falha ao iniciar o backend SQL")
+        st.warning(f"Backend SQL indisponível ({e}); os filtros e agregações usam o pandas.")
+
+if data_backend is not None:
+    filtered_ingressantes = data_backend.filter_rows('ingressantes', sidebar_filter_state)
+    filtered_egressos = data_backend.filter_rows('egressos', sidebar_filter_state)
+else:
+    filtered_ingressantes = analytics.filter_rows(df_ingressantes, sidebar_filter_state)
+    filtered_egressos = analytics.filter_rows(df_egressos, sidebar_filter_state)
+metrics_export.record_filtered_rows('ingressantes', len(filtered_ingressantes))
+metrics_export.record_filtered_rows('egressos', len(filtered_egressos))
+# Cópias dos dados mantidas por esta sessão durante o rerun (st.cache_data devolve uma cópia por chamada)
+memory_profiling.track(memory_rerun, 'ingressantes', df_ingressantes)
+memory_profiling.track(memory_rerun, 'egressos', df_egressos)
+memory_profiling.track(memory_rerun, 'ingressantes_filtrados', filtered_ingressantes)
+memory_profiling.track(memory_rerun, 'egressos_filtrados', filtered_egressos)
 
 # Apply sexo_rotulo mapping to filtered_egressos for consistent use in plots
 if 'sexo' in filtered_egressos.columns:
@@ -619,67 +682,68 @@ else:
     st.info("Coluna 'sexo' não disponível nos dados filtrados para rótulos de sexo. Usando 'Não Informado'.")
 
 
+# --- Pré-construção das figuras independentes das abas de Ingressantes e Egressos ---
+# Agregações e figuras que não dependem de widgets das abas são montadas de uma vez e exibidas
+# depois na ordem do layout.
+def chart_counts(dataset_key, df_source, dims):
+    """Contagens de entrada de uma figura pelo backend SQL; None faz a figura contar as linhas em pandas."""
+    if data_backend is None or df_source.empty or not all(dim in df_source.columns for dim in dims):
+        return None
+    return data_backend.count_rows(dataset_key, sidebar_filter_state, dims)
+
+page_figure_specs = {}
+for dataset_key, dataset_label, df_source, ano_label in [
+    ('ingressantes', 'Ingressantes', filtered_ingressantes, 'Ano de Ingresso'),
+    ('egressos', 'Egressos', filtered_egressos, 'Ano de Conclusão'),
+]:
+    for figure_key, path, figure_title in [
+        ('sunburst_unidade', ['nome_unidade', 'nivel_ensino', 'nome_curso'], 'por Unidade, Nível de Ensino e Curso'),
+        ('sunburst_sexo', ['sexo', 'nivel_ensino', 'nome_curso'], 'por Sexo, Nível de Ensino e Curso'),
+        ('sunburst_nivel', ['nivel_ensino', 'nome_curso'], 'por Nível de Ensino e Cursos'),
+    ]:
+        page_figure_specs[f'{dataset_key}_{figure_key}'] = (
+            build_sunburst_figure, df_source, path, f'{dataset_label} {figure_title}',
+            chart_counts(dataset_key, df_source, path)
+        )
+    page_figure_specs[f'{dataset_key}_por_ano'] = (
+        build_yearly_bar_figure, df_source,
+        'Número de Ingressantes por Ano' if dataset_key == 'ingressantes' else 'Número de Egressos por Ano de Conclusão',
+        ano_label, chart_counts(dataset_key, df_source, ['ano'])
+    )
+    page_figure_specs[f'{dataset_key}_sexo'] = (build_sex_pie_figure, df_source,
+                                                chart_counts(dataset_key, df_source, ['sexo']))
+
+with stage('figuras_da_pagina'):
+    page_figures = build_figures(page_figure_specs)
+
+
 # --- Geração e Exibição dos Gráficos com Plotly.express em ABAS ---
-tab_ingressantes_viz, tab_egressos_viz, tab_comparacao_viz, tab_ml_classificacao, tab_ml_regressao = st.tabs([
+# Com on_change='rerun', só o conteúdo da aba aberta das abas de predição é executado (tab.open): o
+# scikit-learn (importado sob demanda) e os modelos são carregados na primeira vez que uma delas é aberta.
+# Widgets que não são exibidos em um rerun perdem o estado; as escolhas dessas abas são regravadas no
+# session_state para sobreviverem à troca de aba (o limiar é guardado em 'classification_threshold')
+for widget_key in list(st.session_state):
+    if widget_key.startswith(('classification_backend', 'regression_backend', 'class_', 'reg_input_')) \
+            and isinstance(st.session_state[widget_key], str):
+        st.session_state[widget_key] = st.session_state[widget_key]
+
+tab_ingressantes_viz, tab_egressos_viz, tab_comparacao_viz, tab_ml_classificacao, tab_ml_regressao, tab_predicao_lote = st.tabs([
     "Análise de Ingressantes",
     "Análise de Egressos",
     "Comparativo Geral",
     "Predição de Desempenho (Classificação)", # Nova aba para o modelo de classificação
-    "Predição de Duração de Curso (Regressão)" # Nova aba para o modelo de regressão
-])
+    "Predição de Duração de Curso (Regressão)", # Nova aba para o modelo de regressão
+    "Predição em Lote" # Pontuação de arquivos com os modelos treinados nas abas anteriores
+], key='aba_ativa', on_change='rerun')
 
 # --- TAB 1: Análise de Ingressantes ---
-with tab_ingressantes_viz:
+with tab_ingressantes_viz, observe_tab('ingressantes'):
     st.header("Análise Detalhada de Alunos Ingressantes")
 
     # --- NOVO GRÁFICO 1: Rosca Aninhada - Unidade > Nível de Ensino > Curso ---
     st.subheader("Distribuição Hierárquica de Ingressantes: Unidade > Nível de Ensino > Curso")
-
-    required_cols_unidade_nivel_curso = ['nome_unidade', 'nivel_ensino', 'nome_curso']
-    if all(col in filtered_ingressantes.columns for col in required_cols_unidade_nivel_curso) and not filtered_ingressantes.empty:
-        # Criar dados para o Sunburst Chart
-        df_unidade_nivel_curso = filtered_ingressantes.groupby(required_cols_unidade_nivel_curso).size().reset_index(name='count')
-
-        # Para o Sunburst, precisamos de IDs únicos e pais
-        # Cada nó terá um ID (Unidade, Unidade_Nivel, Unidade_Nivel_Curso)
-        # O pai de Unidade_Nivel é Unidade, o pai de Unidade_Nivel_Curso é Unidade_Nivel
-
-        # Nível 1: Unidade
-        unidades = df_unidade_nivel_curso.groupby('nome_unidade')['count'].sum().reset_index()
-        unidades['ids'] = unidades['nome_unidade']
-        unidades['parents'] = ""
-        unidades['labels'] = unidades['nome_unidade']
-
-        # Nível 2: Nível de Ensino dentro de Unidade
-        unidade_nivel = df_unidade_nivel_curso.groupby(['nome_unidade', 'nivel_ensino'])['count'].sum().reset_index()
-        unidade_nivel['ids'] = unidade_nivel['nome_unidade'] + " - " + unidade_nivel['nivel_ensino']
-        unidade_nivel['parents'] = unidade_nivel['nome_unidade']
-        unidade_nivel['labels'] = unidade_nivel['nivel_ensino']
-
-        # Nível 3: Curso dentro de Nível de Ensino (dentro de Unidade)
-        cursos_completos = df_unidade_nivel_curso.copy()
-        cursos_completos['ids'] = cursos_completos['nome_unidade'] + " - " + cursos_completos['nivel_ensino'] + " - " + cursos_completos['nome_curso']
-        cursos_completos['parents'] = cursos_completos['nome_unidade'] + " - " + cursos_completos['nivel_ensino']
-        cursos_completos['labels'] = cursos_completos['nome_curso']
-
-        # Concatena todos os níveis para o Sunburst
-        sunburst_data_unidade = pd.concat([
-            unidades[['ids', 'parents', 'labels', 'count']],
-            unidade_nivel[['ids', 'parents', 'labels', 'count']],
-            cursos_completos[['ids', 'parents', 'labels', 'count']]
-        ])
-
-        fig_sunburst_unidade = go.Figure(go.Sunburst(
-            ids=sunburst_data_unidade['ids'],
-            labels=sunburst_data_unidade['labels'],
-            parents=sunburst_data_unidade['parents'],
-            values=sunburst_data_unidade['count'],
-            branchvalues="total",
-            hovertemplate='<b>%{label}</b><br>Alunos: %{value}<br>Percentual: %{percentParent}<extra></extra>'
-        ))
-        fig_sunburst_unidade.update_layout(margin = dict(t=0, l=0, r=0, b=0),
-                                            title_text='Ingressantes por Unidade, Nível de Ensino e Curso')
-        st.plotly_chart(fig_sunburst_unidade, use_container_width=True)
+    if page_figures['ingressantes_sunburst_unidade'] is not None:
+        st.plotly_chart(page_figures['ingressantes_sunburst_unidade'], use_container_width=True)
     else:
         st.info("Colunas 'nome_unidade', 'nivel_ensino' ou 'nome_curso' não disponíveis nos dados filtrados de ingressantes para este gráfico, ou DataFrame vazio.")
 
@@ -687,48 +751,8 @@ with tab_ingressantes_viz:
 
     # --- NOVO GRÁFICO 2: Rosca Aninhada - Sexo > Nível de Ensino > Curso ---
     st.subheader("Distribuição Hierárquica de Ingressantes: Sexo > Nível de Ensino > Curso")
-
-    required_cols_sexo_nivel_curso = ['sexo', 'nivel_ensino', 'nome_curso']
-    if all(col in filtered_ingressantes.columns for col in required_cols_sexo_nivel_curso) and not filtered_ingressantes.empty:
-        # Criar dados para o Sunburst Chart
-        df_sexo_nivel_curso = filtered_ingressantes.groupby(required_cols_sexo_nivel_curso).size().reset_index(name='count')
-
-        # Nível 1: Sexo
-        sexos = df_sexo_nivel_curso.groupby('sexo')['count'].sum().reset_index()
-        sexos['ids'] = sexos['sexo']
-        sexos['parents'] = ""
-        sexos['labels'] = sexos['sexo']
-
-        # Nível 2: Nível de Ensino dentro de Sexo
-        sexo_nivel = df_sexo_nivel_curso.groupby(['sexo', 'nivel_ensino'])['count'].sum().reset_index()
-        sexo_nivel['ids'] = sexo_nivel['sexo'] + " - " + sexo_nivel['nivel_ensino']
-        sexo_nivel['parents'] = sexo_nivel['sexo']
-        sexo_nivel['labels'] = sexo_nivel['nivel_ensino']
-
-        # Nível 3: Curso dentro de Nível de Ensino (dentro de Sexo)
-        cursos_completos_sexo = df_sexo_nivel_curso.copy()
-        cursos_completos_sexo['ids'] = cursos_completos_sexo['sexo'] + " - " + cursos_completos_sexo['nivel_ensino'] + " - " + cursos_completos_sexo['nome_curso']
-        cursos_completos_sexo['parents'] = cursos_completos_sexo['sexo'] + " - " + cursos_completos_sexo['nivel_ensino']
-        cursos_completos_sexo['labels'] = cursos_completos_sexo['nome_curso']
-
-        # Concatena todos os níveis para o Sunburst
-        sunburst_data_sexo = pd.concat([
-            sexos[['ids', 'parents', 'labels', 'count']],
-            sexo_nivel[['ids', 'parents', 'labels', 'count']],
-            cursos_completos_sexo[['ids', 'parents', 'labels', 'count']]
-        ])
-
-        fig_sunburst_sexo = go.Figure(go.Sunburst(
-            ids=sunburst_data_sexo['ids'],
-            labels=sunburst_data_sexo['labels'],
-            parents=sunburst_data_sexo['parents'],
-            values=sunburst_data_sexo['count'],
-            branchvalues="total",
-            hovertemplate='<b>%{label}</b><br>Alunos: %{value}<br>Percentual: %{percentParent}<extra></extra>'
-        ))
-        fig_sunburst_sexo.update_layout(margin = dict(t=0, l=0, r=0, b=0),
-                                         title_text='Ingressantes por Sexo, Nível de Ensino e Curso')
-        st.plotly_chart(fig_sunburst_sexo, use_container_width=True)
+    if page_figures['ingressantes_sunburst_sexo'] is not None:
+        st.plotly_chart(page_figures['ingressantes_sunburst_sexo'], use_container_width=True)
     else:
         st.info("Colunas 'sexo', 'nivel_ensino' ou 'nome_curso' não disponíveis nos dados filtrados de ingressantes para este gráfico, ou DataFrame vazio.")
 
@@ -737,43 +761,8 @@ with tab_ingressantes_viz:
 
     # --- GRÁFICO ANTERIOR: Rosca Aninhada - Nível de Ensino > Curso (primeira sugestão) ---
     st.subheader("Distribuição Hierárquica: Nível de Ensino e Cursos (Ingressantes)")
-
-    if 'nivel_ensino' in filtered_ingressantes.columns and 'nome_curso' in filtered_ingressantes.columns and not filtered_ingressantes.empty:
-        df_grouped_hierarchy = filtered_ingressantes.groupby(['nivel_ensino', 'nome_curso']).size().reset_index(name='count')
-        
-        # Para o Sunburst Chart (Hierarquia de Nível de Ensino -> Curso)
-        # Nível 1: Nível de Ensino
-        niveis = df_grouped_hierarchy.groupby('nivel_ensino')['count'].sum().reset_index()
-        niveis['ids'] = niveis['nivel_ensino']
-        niveis['parents'] = ""
-        niveis['labels'] = niveis['nivel_ensino']
-
-        # Nível 2: Curso dentro de Nível de Ensino
-        cursos_no_nivel = df_grouped_hierarchy.copy()
-        cursos_no_nivel['ids'] = cursos_no_nivel['nivel_ensino'] + " - " + cursos_no_nivel['nome_curso']
-        cursos_no_nivel['parents'] = cursos_no_nivel['nivel_ensino']
-        cursos_no_nivel['labels'] = cursos_no_nivel['nome_curso']
-
-        sunburst_data_nivel = pd.concat([
-            niveis[['ids', 'parents', 'labels', 'count']],
-            cursos_no_nivel[['ids', 'parents', 'labels', 'count']]
-        ])
-
-        fig_donut_aninhado = go.Figure(go.Sunburst(
-            ids=sunburst_data_nivel['ids'],
-            labels=sunburst_data_nivel['labels'],
-            parents=sunburst_data_nivel['parents'],
-            values=sunburst_data_nivel['count'],
-            branchvalues="total", 
-            hovertemplate='<b>%{label}</b><br>Alunos: %{value}<br>Percentual: %{percentParent}<extra></extra>'
-        ))
-        fig_donut_aninhado.update_layout(
-            margin = dict(t=0, l=0, r=0, b=0),
-            title_text='Ingressantes por Nível de Ensino e Cursos'
-        )
-
-        st.plotly_chart(fig_donut_aninhado, use_container_width=True)
-
+    if page_figures['ingressantes_sunburst_nivel'] is not None:
+        st.plotly_chart(page_figures['ingressantes_sunburst_nivel'], use_container_width=True)
     else:
         st.info("Colunas 'nivel_ensino' ou 'nome_curso' não disponíveis nos dados filtrados de ingressantes para o gráfico de rosca aninhado, ou DataFrame vazio.")
 
@@ -787,100 +776,33 @@ with tab_ingressantes_viz:
 
             with col_ing1:
                 st.subheader("Ingressantes por Ano")
-                if 'ano' in filtered_ingressantes.columns:
-                    ingressantes_por_ano = filtered_ingressantes.groupby('ano').size().reset_index(name='count')
-                    fig_ing_ano = px.bar(ingressantes_por_ano, x='ano', y='count',
-                                         title='Número de Ingressantes por Ano',
-                                         labels={'ano': 'Ano de Ingresso', 'count': 'Número de Alunos'})
-                    fig_ing_ano.update_xaxes(dtick=1, tickformat="%Y")
-                    st.plotly_chart(fig_ing_ano, use_container_width=True)
+                if page_figures['ingressantes_por_ano'] is not None:
+                    st.plotly_chart(page_figures['ingressantes_por_ano'], use_container_width=True)
                 else:
                     st.info("Coluna 'ano' não disponível nos dados de ingressantes para este gráfico.")
 
             with col_ing2:
                 st.subheader("Distribuição de Sexo")
-                if 'sexo' in filtered_ingressantes.columns:
-                    sexo_dist_ing = filtered_ingressantes['sexo'].value_counts(normalize=True).reset_index()
-                    sexo_dist_ing.columns = ['sexo', 'percentage']
-                    sexo_dist_ing['percentage'] = sexo_dist_ing['percentage'] * 100
-                    fig_ing_sexo = px.pie(sexo_dist_ing, names='sexo', values='percentage',
-                                          title='Distribuição Percentual de Sexo',
-                                          hole=0.3)
-                    st.plotly_chart(fig_ing_sexo, use_container_width=True)
+                if page_figures['ingressantes_sexo'] is not None:
+                    st.plotly_chart(page_figures['ingressantes_sexo'], use_container_width=True)
                 else:
                     st.info("Coluna 'sexo' não disponível nos dados de ingressantes para este gráfico.")
         
         st.subheader("Tabela de Dados Filtrados (Ingressantes)")
-        
-        # Adiciona o slider para controlar a quantidade de alunos
-        max_rows_ingressantes = len(filtered_ingressantes)
-        num_alunos_ingressantes = st.slider(
-            "Número de alunos a exibir (Ingressantes):",
-            min_value=1,
-            max_value=max_rows_ingressantes if max_rows_ingressantes > 0 else 1,
-            value=min(10, max_rows_ingressantes) if max_rows_ingressantes > 0 else 1,
-            step=1,
-            key='num_alunos_ingressantes_slider'
-        )
-
-        # Cria uma cópia para remover a coluna sem afetar o DataFrame original
-        df_display_ingressantes = filtered_ingressantes.copy()
-        if 'nome_discente' in df_display_ingressantes.columns:
-            df_display_ingressantes = df_display_ingressantes.drop(columns=['nome_discente'])
-
-        st.dataframe(df_display_ingressantes.head(num_alunos_ingressantes))
-        st.write(f"Total de registros de Ingressantes filtrados: {len(filtered_ingressantes)}")
+        render_paginated_table(filtered_ingressantes, 'Ingressantes', 'tabela_ingressantes',
+                               fingerprint(ingressantes_dataset_fp, sidebar_filter_state))
 
     else:
         st.info("Nenhum dado de ingressantes disponível com os filtros selecionados para análise.")
 
 # --- TAB 2: Análise de Egressos ---
-with tab_egressos_viz:
+with tab_egressos_viz, observe_tab('egressos'):
     st.header("Análise Detalhada de Alunos Egressos")
 
     # --- NOVO GRÁFICO 1: Rosca Aninhada - Unidade > Nível de Ensino > Curso (EGRESSOS) ---
     st.subheader("Distribuição Hierárquica de Egressos: Unidade > Nível de Ensino > Curso")
-
-    required_cols_unidade_nivel_curso_egressos = ['nome_unidade', 'nivel_ensino', 'nome_curso']
-    if all(col in filtered_egressos.columns for col in required_cols_unidade_nivel_curso_egressos) and not filtered_egressos.empty:
-        df_unidade_nivel_curso_egressos = filtered_egressos.groupby(required_cols_unidade_nivel_curso_egressos).size().reset_index(name='count')
-
-        # Nível 1: Unidade
-        unidades_egressos = df_unidade_nivel_curso_egressos.groupby('nome_unidade')['count'].sum().reset_index()
-        unidades_egressos['ids'] = unidades_egressos['nome_unidade']
-        unidades_egressos['parents'] = ""
-        unidades_egressos['labels'] = unidades_egressos['nome_unidade']
-
-        # Nível 2: Nível de Ensino dentro de Unidade
-        unidade_nivel_egressos = df_unidade_nivel_curso_egressos.groupby(['nome_unidade', 'nivel_ensino'])['count'].sum().reset_index()
-        unidade_nivel_egressos['ids'] = unidade_nivel_egressos['nome_unidade'] + " - " + unidade_nivel_egressos['nivel_ensino']
-        unidade_nivel_egressos['parents'] = unidade_nivel_egressos['nome_unidade']
-        unidade_nivel_egressos['labels'] = unidade_nivel_egressos['nivel_ensino']
-
-        # Nível 3: Curso dentro de Nível de Ensino (dentro de Unidade)
-        cursos_completos_egressos = df_unidade_nivel_curso_egressos.copy()
-        cursos_completos_egressos['ids'] = cursos_completos_egressos['nome_unidade'] + " - " + cursos_completos_egressos['nivel_ensino'] + " - " + cursos_completos_egressos['nome_curso']
-        cursos_completos_egressos['parents'] = cursos_completos_egressos['nome_unidade'] + " - " + cursos_completos_egressos['nivel_ensino']
-        cursos_completos_egressos['labels'] = cursos_completos_egressos['nome_curso']
-
-        # Concatena todos os níveis para o Sunburst
-        sunburst_data_unidade_egressos = pd.concat([
-            unidades_egressos[['ids', 'parents', 'labels', 'count']],
-            unidade_nivel_egressos[['ids', 'parents', 'labels', 'count']],
-            cursos_completos_egressos[['ids', 'parents', 'labels', 'count']]
-        ])
-
-        fig_sunburst_unidade_egressos = go.Figure(go.Sunburst(
-            ids=sunburst_data_unidade_egressos['ids'],
-            labels=sunburst_data_unidade_egressos['labels'],
-            parents=sunburst_data_unidade_egressos['parents'],
-            values=sunburst_data_unidade_egressos['count'],
-            branchvalues="total",
-            hovertemplate='<b>%{label}</b><br>Alunos: %{value}<br>Percentual: %{percentParent}<extra></extra>'
-        ))
-        fig_sunburst_unidade_egressos.update_layout(margin = dict(t=0, l=0, r=0, b=0),
-                                                    title_text='Egressos por Unidade, Nível de Ensino e Curso')
-        st.plotly_chart(fig_sunburst_unidade_egressos, use_container_width=True)
+    if page_figures['egressos_sunburst_unidade'] is not None:
+        st.plotly_chart(page_figures['egressos_sunburst_unidade'], use_container_width=True)
     else:
         st.info("Colunas 'nome_unidade', 'nivel_ensino' ou 'nome_curso' não disponíveis nos dados filtrados de egressos para este gráfico, ou DataFrame vazio.")
 
@@ -888,47 +810,8 @@ with tab_egressos_viz:
 
     # --- NOVO GRÁFICO 2: Rosca Aninhada - Sexo > Nível de Ensino > Curso (EGRESSOS) ---
     st.subheader("Distribuição Hierárquica de Egressos: Sexo > Nível de Ensino > Curso")
-
-    required_cols_sexo_nivel_curso_egressos = ['sexo', 'nivel_ensino', 'nome_curso']
-    if all(col in filtered_egressos.columns for col in required_cols_sexo_nivel_curso_egressos) and not filtered_egressos.empty:
-        df_sexo_nivel_curso_egressos = filtered_egressos.groupby(required_cols_sexo_nivel_curso_egressos).size().reset_index(name='count')
-
-        # Nível 1: Sexo
-        sexos_egressos = df_sexo_nivel_curso_egressos.groupby('sexo')['count'].sum().reset_index()
-        sexos_egressos['ids'] = sexos_egressos['sexo']
-        sexos_egressos['parents'] = ""
-        sexos_egressos['labels'] = sexos_egressos['sexo']
-
-        # Nível 2: Nível de Ensino dentro de Sexo
-        sexo_nivel_egressos = df_sexo_nivel_curso_egressos.groupby(['sexo', 'nivel_ensino'])['count'].sum().reset_index()
-        sexo_nivel_egressos['ids'] = sexo_nivel_egressos['sexo'] + " - " + sexo_nivel_egressos['nivel_ensino']
-        sexo_nivel_egressos['parents'] = sexo_nivel_egressos['sexo']
-        sexo_nivel_egressos['labels'] = sexo_nivel_egressos['nivel_ensino']
-
-        # Nível 3: Curso dentro de Nível de Ensino (dentro de Sexo)
-        cursos_completos_sexo_egressos = df_sexo_nivel_curso_egressos.copy()
-        cursos_completos_sexo_egressos['ids'] = cursos_completos_sexo_egressos['sexo'] + " - " + cursos_completos_sexo_egressos['nivel_ensino'] + " - " + cursos_completos_sexo_egressos['nome_curso']
-        cursos_completos_sexo_egressos['parents'] = cursos_completos_sexo_egressos['sexo'] + " - " + cursos_completos_sexo_egressos['nivel_ensino']
-        cursos_completos_sexo_egressos['labels'] = cursos_completos_sexo_egressos['nome_curso']
-
-        # Concatena todos os níveis para o Sunburst
-        sunburst_data_sexo_egressos = pd.concat([
-            sexos_egressos[['ids', 'parents', 'labels', 'count']],
-            sexo_nivel_egressos[['ids', 'parents', 'labels', 'count']],
-            cursos_completos_sexo_egressos[['ids', 'parents', 'labels', 'count']]
-        ])
-
-        fig_sunburst_sexo_egressos = go.Figure(go.Sunburst(
-            ids=sunburst_data_sexo_egressos['ids'],
-            labels=sunburst_data_sexo_egressos['labels'],
-            parents=sunburst_data_sexo_egressos['parents'],
-            values=sunburst_data_sexo_egressos['count'],
-            branchvalues="total",
-            hovertemplate='<b>%{label}</b><br>Alunos: %{value}<br>Percentual: %{percentParent}<extra></extra>'
-        ))
-        fig_sunburst_sexo_egressos.update_layout(margin = dict(t=0, l=0, r=0, b=0),
-                                                 title_text='Egressos por Sexo, Nível de Ensino e Curso')
-        st.plotly_chart(fig_sunburst_sexo_egressos, use_container_width=True)
+    if page_figures['egressos_sunburst_sexo'] is not None:
+        st.plotly_chart(page_figures['egressos_sunburst_sexo'], use_container_width=True)
     else:
         st.info("Colunas 'sexo', 'nivel_ensino' ou 'nome_curso' não disponíveis nos dados filtrados de egressos para este gráfico, ou DataFrame vazio.")
 
@@ -936,43 +819,8 @@ with tab_egressos_viz:
 
     # --- GRÁFICO: Rosca Aninhada - Nível de Ensino > Curso (EGRESSOS) ---
     st.subheader("Distribuição Hierárquica: Nível de Ensino e Cursos (Egressos)")
-
-    if 'nivel_ensino' in filtered_egressos.columns and 'nome_curso' in filtered_egressos.columns and not filtered_egressos.empty:
-        df_grouped_hierarchy_egressos = filtered_egressos.groupby(['nivel_ensino', 'nome_curso']).size().reset_index(name='count')
-        
-        # Para o Sunburst Chart (Hierarquia de Nível de Ensino -> Curso)
-        # Nível 1: Nível de Ensino
-        niveis_egressos = df_grouped_hierarchy_egressos.groupby('nivel_ensino')['count'].sum().reset_index()
-        niveis_egressos['ids'] = niveis_egressos['nivel_ensino']
-        niveis_egressos['parents'] = ""
-        niveis_egressos['labels'] = niveis_egressos['nivel_ensino']
-
-        # Nível 2: Curso dentro de Nível de Ensino
-        cursos_no_nivel_egressos = df_grouped_hierarchy_egressos.copy()
-        cursos_no_nivel_egressos['ids'] = cursos_no_nivel_egressos['nivel_ensino'] + " - " + cursos_no_nivel_egressos['nome_curso']
-        cursos_no_nivel_egressos['parents'] = cursos_no_nivel_egressos['nivel_ensino']
-        cursos_no_nivel_egressos['labels'] = cursos_no_nivel_egressos['nome_curso']
-
-        sunburst_data_nivel_egressos = pd.concat([
-            niveis_egressos[['ids', 'parents', 'labels', 'count']],
-            cursos_no_nivel_egressos[['ids', 'parents', 'labels', 'count']]
-        ])
-
-        fig_donut_aninhado_egressos = go.Figure(go.Sunburst(
-            ids=sunburst_data_nivel_egressos['ids'],
-            labels=sunburst_data_nivel_egressos['labels'],
-            parents=sunburst_data_nivel_egressos['parents'],
-            values=sunburst_data_nivel_egressos['count'],
-            branchvalues="total", 
-            hovertemplate='<b>%{label}</b><br>Alunos: %{value}<br>Percentual: %{percentParent}<extra></extra>'
-        ))
-        fig_donut_aninhado_egressos.update_layout(
-            margin = dict(t=0, l=0, r=0, b=0),
-            title_text='Egressos por Nível de Ensino e Cursos'
-        )
-
-        st.plotly_chart(fig_donut_aninhado_egressos, use_container_width=True)
-
+    if page_figures['egressos_sunburst_nivel'] is not None:
+        st.plotly_chart(page_figures['egressos_sunburst_nivel'], use_container_width=True)
     else:
         st.info("Colunas 'nivel_ensino' ou 'nome_curso' não disponíveis nos dados filtrados de egressos para o gráfico de rosca aninhado, ou DataFrame vazio.")
 
@@ -986,49 +834,21 @@ with tab_egressos_viz:
 
             with col_eg1:
                 st.subheader("Egressos por Ano de Conclusão")
-                if 'ano' in filtered_egressos.columns:
-                    egressos_por_ano = filtered_egressos.groupby('ano').size().reset_index(name='count')
-                    fig_eg_ano = px.bar(egressos_por_ano, x='ano', y='count',
-                                        title='Número de Egressos por Ano de Conclusão',
-                                        labels={'ano': 'Ano de Conclusão', 'count': 'Número de Alunos'})
-                    fig_eg_ano.update_xaxes(dtick=1, tickformat="%Y")
-                    st.plotly_chart(fig_eg_ano, use_container_width=True)
+                if page_figures['egressos_por_ano'] is not None:
+                    st.plotly_chart(page_figures['egressos_por_ano'], use_container_width=True)
                 else:
                     st.info("Coluna 'ano' não disponível nos dados de egressos para este gráfico.")
 
             with col_eg2:
                 st.subheader("Distribuição de Sexo")
-                if 'sexo' in filtered_egressos.columns:
-                    sexo_dist_eg = filtered_egressos['sexo'].value_counts(normalize=True).reset_index()
-                    sexo_dist_eg.columns = ['sexo', 'percentage']
-                    sexo_dist_eg['percentage'] = sexo_dist_eg['percentage'] * 100
-                    fig_eg_sexo = px.pie(sexo_dist_eg, names='sexo', values='percentage',
-                                         title='Distribuição Percentual de Sexo',
-                                         hole=0.3)
-                    st.plotly_chart(fig_eg_sexo, use_container_width=True)
+                if page_figures['egressos_sexo'] is not None:
+                    st.plotly_chart(page_figures['egressos_sexo'], use_container_width=True)
                 else:
                     st.info("Coluna 'sexo' não disponível nos dados de egressos para este gráfico.")
         
         st.subheader("Tabela de Dados Filtrados (Egressos)")
-
-        # Adiciona o slider para controlar a quantidade de alunos
-        max_rows_egressos = len(filtered_egressos)
-        num_alunos_egressos = st.slider(
-            "Número de alunos a exibir (Egressos):",
-            min_value=1,
-            max_value=max_rows_egressos if max_rows_egressos > 0 else 1,
-            value=min(10, max_rows_egressos) if max_rows_egressos > 0 else 1,
-            step=1,
-            key='num_alunos_egressos_slider'
-        )
-
-        # Cria uma cópia para remover a coluna sem afetar o DataFrame original
-        df_display_egressos = filtered_egressos.copy()
-        if 'nome_discente' in df_display_egressos.columns:
-            df_display_egressos = df_display_egressos.drop(columns=['nome_discente'])
-
-        st.dataframe(df_display_egressos.head(num_alunos_egressos))
-        st.write(f"Total de registros de Egressos filtrados: {len(filtered_egressos)}")
+        render_paginated_table(filtered_egressos, 'Egressos', 'tabela_egressos',
+                               fingerprint(egressos_dataset_fp, sidebar_filter_state))
 
         st.markdown("---") # Separador para o próximo gráfico
 
@@ -1072,20 +892,10 @@ with tab_egressos_viz:
            'total_periodos' in df_egressos_plot_for_violin.columns and \
            'sexo_rotulo' in df_egressos_plot_for_violin.columns:
             
-            fig_violin = px.violin(
-                df_egressos_plot_for_violin,
-                x='nome_unidade',
-                y='total_periodos',
-                color='sexo_rotulo',
-                box=True,
-                points="outliers",
-                title=f'Distribuição do Total de Semestres Concluídos por Unidade e Sexo (Máx {LIMITE_MAX_PERIODOS} Semestres)',
-                labels={'nome_unidade': 'Unidade', 'total_periodos': 'Total de Semestres Concluídos', 'sexo_rotulo': 'Gênero'},
-                hover_data={'total_periodos': True, 'nome_curso': True, 'ano': True},
-                height=600,
-                color_discrete_sequence=px.colors.qualitative.Plotly
+            fig_violin = fit_figure_to_budget(
+                'violino_semestres',
+                lambda compact: build_violin_figure(df_egressos_plot_for_violin, LIMITE_MAX_PERIODOS, compact)
             )
-            fig_violin.update_xaxes(tickangle=45) 
             st.plotly_chart(fig_violin, use_container_width=True)
         else:
             st.info("Nenhum dado disponível para o gráfico de violino com os filtros selecionados.")
@@ -1139,18 +949,10 @@ with tab_egressos_viz:
             if 'total_periodos' in df_egressos_filtered_by_course.columns and \
                'sexo_rotulo' in df_egressos_filtered_by_course.columns:
                 
-                fig_hist_plot = px.histogram(
-                    df_egressos_filtered_by_course,
-                    x='total_periodos',
-                    color='sexo_rotulo',
-                    marginal="box", # Adiciona um box plot marginal para visualização da distribuição
-                    nbins=LIMITE_MAX_PERIODOS, # Controla o número de bins, inspirado no 'bins' do seaborn
-                    title=f'Distribuição de Frequência do Total de Períodos nos Cursos Selecionados (Máx {LIMITE_MAX_PERIODOS}) por Gênero',
-                    labels={'total_periodos': 'Total de Semestres', 'sexo_rotulo': 'Gênero'},
-                    color_discrete_sequence=px.colors.sequential.Cividis, # Paleta de cores 'cividis'
-                    height=500
+                fig_hist_plot = fit_figure_to_budget(
+                    'histograma_periodos',
+                    lambda compact: build_period_histogram_figure(df_egressos_filtered_by_course, LIMITE_MAX_PERIODOS, compact)
                 )
-                fig_hist_plot.update_layout(yaxis_title='Frequência')
                 st.plotly_chart(fig_hist_plot, use_container_width=True)
             else:
                 st.info("Colunas 'total_periodos' ou 'sexo_rotulo' não disponíveis nos dados filtrados para este gráfico.")
@@ -1165,24 +967,27 @@ with tab_egressos_viz:
 
 
 # --- TAB 3: Comparativo Geral ---
-with tab_comparacao_viz:
+with tab_comparacao_viz, observe_tab('comparativo'):
     st.header("Comparativo Geral entre Ingressantes e Egressos")
 
     if not filtered_ingressantes.empty and not filtered_egressos.empty and \
        'ano' in filtered_ingressantes.columns and 'ano' in filtered_egressos.columns:
 
+        # Cubo de contagens (Tipo de Aluno, ano, sexo, nível, unidade) calculado uma única vez;
+        # todos os gráficos desta aba são derivados dele
+        with stage('cubo_comparativo', rows=len(filtered_ingressantes) + len(filtered_egressos)):
+            if data_backend is not None:
+                comparative_cube = data_backend.count_cube({'Ingressantes': 'ingressantes', 'Egressos': 'egressos'},
+                                                           sidebar_filter_state)
+            else:
+                comparative_cube = build_count_cube({'Ingressantes': filtered_ingressantes, 'Egressos': filtered_egressos})
+
         with st.container():
             col_comp1, col_comp2 = st.columns(2)
 
             with col_comp1:
                 st.subheader("Total de Ingressantes vs Egressos por Ano")
-                ingressantes_count = filtered_ingressantes.groupby('ano').size().reset_index(name='Contagem')
-                ingressantes_count['Tipo de Aluno'] = 'Ingressantes'
-
-                egressos_count = filtered_egressos.groupby('ano').size().reset_index(name='Contagem')
-                egressos_count['Tipo de Aluno'] = 'Egressos'
-
-                combined_annual_data = pd.concat([ingressantes_count, egressos_count], ignore_index=True)
+                combined_annual_data = rollup_count_cube(comparative_cube, ['ano'])
 
                 fig_comp_ano = px.line(combined_annual_data, x='ano', y='Contagem', color='Tipo de Aluno',
                                        title='Total de Ingressantes vs Egressos por Ano',
@@ -1192,14 +997,10 @@ with tab_comparacao_viz:
 
             with col_comp2:
                 st.subheader("Ingressantes e Egressos por Sexo ao Longo do Tempo")
-                if 'sexo' in filtered_ingressantes.columns and 'sexo' in filtered_egressos.columns:
-                    sex_ing_anual = filtered_ingressantes.groupby(['ano', 'sexo']).size().reset_index(name='count')
-                    sex_ing_anual['Tipo'] = 'Ingressantes'
-
-                    sex_eg_anual = filtered_egressos.groupby(['ano', 'sexo']).size().reset_index(name='count')
-                    sex_eg_anual['Tipo'] = 'Egressos'
-
-                    combined_sex_anual_data = pd.concat([sex_ing_anual, sex_eg_anual], ignore_index=True)
+                if 'sexo' in comparative_cube.columns:
+                    combined_sex_anual_data = rollup_count_cube(comparative_cube, ['ano', 'sexo']).rename(
+                        columns={'Tipo de Aluno': 'Tipo', 'Contagem': 'count'}
+                    )
 
                     fig_comp_sex_time = px.bar(combined_sex_anual_data, x='ano', y='count', color='sexo',
                                                facet_col='Tipo', barmode='group',
@@ -1210,6 +1011,24 @@ with tab_comparacao_viz:
                 else:
                     st.info("Coluna 'sexo' não disponível em um ou ambos os DataFrames para gráficos comparativos por sexo.")
 
+        # --- Quebras adicionais derivadas do mesmo cubo (sem nova passada pelas linhas) ---
+        extra_dims = {dim: rotulo for dim, rotulo in COMPARATIVO_QUEBRAS_EXTRAS.items() if dim in comparative_cube.columns}
+        if extra_dims:
+            st.subheader("Ingressantes vs Egressos por Dimensão")
+            selected_extra_dim = st.selectbox(
+                "Detalhar por:",
+                options=list(extra_dims),
+                format_func=lambda dim: extra_dims[dim],
+                key='comparativo_extra_dim'
+            )
+            combined_extra_data = rollup_count_cube(comparative_cube, [selected_extra_dim])
+            fig_comp_extra = px.bar(combined_extra_data, x=selected_extra_dim, y='Contagem', color='Tipo de Aluno',
+                                    barmode='group',
+                                    title=f'Ingressantes vs Egressos por {extra_dims[selected_extra_dim]}',
+                                    labels={selected_extra_dim: extra_dims[selected_extra_dim], 'Contagem': 'Número de Alunos'})
+            fig_comp_extra.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_comp_extra, use_container_width=True)
+
     else:
         st.info("Dados incompletos ou insuficientes para a aba de comparação. Verifique os filtros selecionados e se há dados para ambos os grupos.")
 
@@ -1358,14 +1177,45 @@ with tab_comparacao_viz:
 #                         st.error(f"Ocorreu um erro ao fazer a predição: {e}")
 
 # --- NOVA TAB PARA O MODELO DE CLASSIFICAÇÃO ---
-with tab_ml_classificacao:
+def classification_threshold(median_periods):
+    """
+    Limiar de classificação escolhido na aba de classificação, ou a mediana dos dados filtrados. O limiar é
+    guardado junto com a mediana em que foi escolhido: quando os filtros mudam a mediana, volta à mediana.
+    """
+    saved_median, saved_threshold = st.session_state.get('classification_threshold', (None, None))
+    return saved_threshold if saved_median == int(median_periods) else int(median_periods)
+
+def classification_data(threshold):
+    """
+    Features codificadas, alvo, encoders e divisão treino/teste da classificação com o limiar informado.
+    Levanta KeyError quando falta alguma feature nos dados filtrados.
+    """
+    X_encoded_df, y, encoders = analytics.classification_dataset(filtered_egressos, threshold, FEATURES_CLASSIFICACAO)
+    X_train, X_test, y_train, y_test = model_selection.train_test_split(X_encoded_df, y, stratify=y, **CLASSIFICATION_SPLIT)
+    return X_encoded_df, y, encoders, (X_train, X_test, y_train, y_test)
+
+def classification_model(threshold, backend, params, X_train, y_train, encoders):
+    """Modelo de classificação dos filtros atuais (reaproveita o registro em disco se a configuração já foi vista)."""
+    classification_key = ModelRegistry.make_key(
+        backend, params,
+        make_training_fingerprint(egressos_dataset_fp, sidebar_filter_state, FEATURES_CLASSIFICACAO,
+                                  {'target': TARGET_CLASSIFICACAO, 'split': CLASSIFICATION_SPLIT}),
+        threshold
+    )
+    return load_or_train_classification_model(classification_key, backend, params, X_train, y_train, encoders)
+
+def render_classification_tab():
+    """
+    Conteúdo da aba de classificação. Retorna o pacote do modelo treinado, ou None quando não há dados
+    para treiná-lo (retornando mais cedo em vez de st.stop, para que o restante da página seja executado).
+    """
     st.header("🎯 Predição de Desempenho (Classificação)")
     st.write("Preveja se um aluno terá um tempo de graduação 'Curto' ou 'Longo' baseado em suas características. Este modelo usa a coluna `total_periodos` para classificar os egressos.")
 
     # --- Verificação de dados para o modelo de classificação ---
     if filtered_egressos.empty or 'total_periodos' not in filtered_egressos.columns:
         st.warning("Não há dados de egressos com 'total_periodos' para treinar o modelo de classificação com os filtros atuais. Ajuste os filtros ou verifique seus dados de egressos.")
-        st.stop()
+        return None
 
     # Definição do limiar para "Curto" vs "Longo"
     st.subheader("Definição do Limiar e Preparação dos Dados")
@@ -1376,66 +1226,71 @@ with tab_ml_classificacao:
     median_periods = filtered_egressos['total_periodos'].median() if not filtered_egressos['total_periodos'].empty else 8 # Valor padrão razoável
     threshold = st.slider(
         "Defina o limiar para 'Curto' (em períodos, menor ou igual a este valor)",
-        min_value=1, max_value=24, value=int(median_periods), step=1
+        min_value=1, max_value=24, value=classification_threshold(median_periods), step=1
     )
+    st.session_state['classification_threshold'] = (int(median_periods), threshold)
     st.write(f"Alunos com tempo de graduação <= {threshold} períodos serão classificados como 'Curto'.")
 
-    # Criação da variável alvo
-    df_model = filtered_egressos.copy()
-    df_model['desempenho'] = df_model['total_periodos'].apply(lambda x: 'Curto' if x <= threshold else 'Longo')
+    # Variável alvo e codificação das features (LabelEncoder por coluna) ficam em analytics.py
+    # Ajuste as features (analytics.FEATURES_CLASSIFICACAO) com base na relevância do seu dataset
+    features_classificacao = FEATURES_CLASSIFICACAO
+    target_classificacao = TARGET_CLASSIFICACAO
+    try:
+        X_encoded_df, y, encoders, (X_train, X_test, y_train, y_test) = classification_data(threshold)
+    except KeyError as e:
+        st.error(f"{e.args[0]}. Ajuste a seleção de features ou verifique seus dados.")
+        return None
+    X = filtered_egressos[features_classificacao]
 
     # Contagem das classes
-    class_counts = df_model['desempenho'].value_counts()
+    class_counts = y.value_counts()
     st.info(f"Distribuição das classes: Curto = {class_counts.get('Curto', 0)}, Longo = {class_counts.get('Longo', 0)}")
 
-    # Seleção de Features para o modelo de Classificação
-    # Ajuste essas features com base na relevância do seu dataset
-    features_classificacao = ['nivel_ensino', 'sexo', 'nome_curso', 'nome_unidade']
-    target_classificacao = 'desempenho'
-
-    # Verifica se as colunas selecionadas existem no DataFrame
-    missing_features = [f for f in features_classificacao if f not in df_model.columns]
-    if missing_features:
-        st.error(f"As seguintes features estão faltando no DataFrame de egressos: {', '.join(missing_features)}. Ajuste a seleção de features ou verifique seus dados.")
-        st.stop()
-
-    X = df_model[features_classificacao]
-    y = df_model[target_classificacao]
-
-    # Codificação de variáveis categóricas
-    # Usaremos LabelEncoder para cada coluna individualmente e armazenaremos os encoders
-    encoders = {}
-    X_encoded_df = pd.DataFrame()
-    for col in X.columns:
-        if X[col].dtype == 'object':
-            le = LabelEncoder()
-            X_encoded_df[col] = le.fit_transform(X[col])
-            encoders[col] = le
-        else:
-            X_encoded_df[col] = X[col]
-
-    # Divisão em conjuntos de treino e teste
-    X_train, X_test, y_train, y_test = train_test_split(X_encoded_df, y, test_size=0.2, random_state=42, stratify=y)
-
-    # Treinamento do Modelo de Classificação
-    @st.cache_resource
-    def train_classification_model(X_train, y_train):
-        model = DecisionTreeClassifier(random_state=42)
-        model.fit(X_train, y_train)
-        return model
+    # Escolha do algoritmo: o Gradient Boosting consome diretamente os códigos inteiros das categorias
+    classification_backend = st.selectbox(
+        "Algoritmo de classificação:",
+        options=list(CLASSIFICATION_BACKENDS),
+        format_func=lambda backend: CLASSIFICATION_BACKENDS[backend]['label'],
+        key='classification_backend'
+    )
+    classification_params = backend_params(CLASSIFICATION_BACKENDS, classification_backend)
+    if classification_params is not CLASSIFICATION_BACKENDS[classification_backend]['params']:
+        st.caption(f"Hiperparâmetros ajustados pela busca offline: {classification_params}")
 
-    model = train_classification_model(X_train, y_train)
+    # Treinamento do Modelo de Classificação (divisão em treino e teste feita em classification_data)
+    classification_bundle = classification_model(threshold, classification_backend, classification_params,
+                                                 X_train, y_train, encoders)
+    model = classification_bundle['model']
 
     # Avaliação do Modelo
     y_pred = model.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
+    accuracy = sklearn_metrics.accuracy_score(y_test, y_pred)
 
     st.success(f"Modelo de Classificação treinado com sucesso! 🎉")
     st.info(f"Acurácia no conjunto de teste: **{accuracy:.2f}**")
     st.text("Relatório de Classificação:")
-    st.code(classification_report(y_test, y_pred))
+    st.code(sklearn_metrics.classification_report(y_test, y_pred))
     st.text("Matriz de Confusão:")
-    st.dataframe(pd.DataFrame(confusion_matrix(y_test, y_pred), index=model.classes_, columns=model.classes_))
+    st.dataframe(pd.DataFrame(sklearn_metrics.confusion_matrix(y_test, y_pred), index=model.classes_, columns=model.classes_))
+
+    st.subheader("Validação Cruzada")
+    st.write(f"Avaliação em {CV_FOLDS} dobras estratificadas sobre todos os dados filtrados, "
+             "mais estável que a avaliação em um único conjunto de teste.")
+    classification_cv_key = ModelRegistry.make_key(
+        f"cv_{classification_backend}", classification_params,
+        make_training_fingerprint(egressos_dataset_fp, sidebar_filter_state, features_classificacao,
+                                  {'target': target_classificacao, 'folds': CV_FOLDS}),
+        threshold
+    )
+    classification_cardinalities = [len(encoders[col].classes_) if col in encoders else None for col in X_encoded_df.columns]
+    evaluation_section(
+        classification_cv_key,
+        lambda: model_evaluation.cross_validate_classifier(
+            classification_backend, classification_params,
+            X_encoded_df, y, classification_cardinalities, n_splits=CV_FOLDS, n_jobs=CV_WORKERS
+        ),
+        button_key='classification_cv_run'
+    )
 
     st.markdown("---")
     st.subheader("Simulação de Predição de Desempenho")
@@ -1452,31 +1307,37 @@ with tab_ml_classificacao:
 
     if st.button("Prever Desempenho"):
         try:
-            # Criar DataFrame com os inputs do usuário para classificação
-            input_data_class = pd.DataFrame([input_values_class])
-
-            # Codificar a entrada do usuário usando os encoders treinados
-            input_encoded_dict = {}
-            for col in X.columns:
-                if col in encoders:
-                    # Usar .transform para garantir que novas categorias causem erro e não NaN
-                    # Adicionado erro handling para categorias desconhecidas
-                    try:
-                        input_encoded_dict[col] = encoders[col].transform(input_data_class[col])
-                    except ValueError as ve:
-                        st.error(f"Erro ao codificar a feature '{col}': A opção '{input_data_class[col].iloc[0]}' não foi vista durante o treinamento do modelo. Por favor, selecione uma opção válida.")
-                        st.stop()
-                else:
-                    input_encoded_dict[col] = input_data_class[col] # Para colunas numéricas, se houver
-
-            input_data_encoded = pd.DataFrame(input_encoded_dict, index=[0])
-
-            # Garantir que as colunas e a ordem sejam as mesmas usadas no treinamento
-            input_data_aligned = input_data_encoded.reindex(columns=X_train.columns, fill_value=0)
-
-            # Fazer a predição
-            prediction = model.predict(input_data_aligned)[0]
-            prediction_proba = model.predict_proba(input_data_aligned)[0]
+            # Consulta a tabela de predições pré-calculadas; só chama o modelo se a combinação não estiver nela
+            classification_lookup = classification_bundle.get('lookup') or {}
+            prediction_proba = classification_lookup.get(tuple(input_values_class[col] for col in X.columns))
+
+            if prediction_proba is None:
+                # Criar DataFrame com os inputs do usuário para classificação
+                input_data_class = pd.DataFrame([input_values_class])
+
+                # Codificar a entrada do usuário usando os encoders treinados
+                input_encoded_dict = {}
+                for col in X.columns:
+                    if col in encoders:
+                        # Usar .transform para garantir que novas categorias causem erro e não NaN
+                        # Adicionado erro handling para categorias desconhecidas
+                        try:
+                            input_encoded_dict[col] = encoders[col].transform(input_data_class[col])
+                        except ValueError as ve:
+                            st.error(f"Erro ao codificar a feature '{col}': A opção '{input_data_class[col].iloc[0]}' não foi vista durante o treinamento do modelo. Por favor, selecione uma opção válida.")
+                            return classification_bundle
+                    else:
+                        input_encoded_dict[col] = input_data_class[col] # Para colunas numéricas, se houver
+
+                input_data_encoded = pd.DataFrame(input_encoded_dict, index=[0])
+
+                # Garantir que as colunas e a ordem sejam as mesmas usadas no treinamento
+                input_data_aligned = input_data_encoded.reindex(columns=X_train.columns, fill_value=0)
+
+                # Fazer a predição
+                prediction_proba = model.predict_proba(input_data_aligned)[0]
+
+            prediction = model.classes_[np.argmax(prediction_proba)]
 
             st.success(f"A predição para este aluno é: **{prediction}**")
             # Garantir que a ordem das classes seja consistente
@@ -1490,9 +1351,42 @@ with tab_ml_classificacao:
             st.error(f"Ocorreu um erro ao fazer a predição: {e}")
             st.write("Detalhes do erro:", e)
 
+    return classification_bundle
+
+with tab_ml_classificacao, observe_tab('classificacao'):
+    if tab_ml_classificacao.open:
+        render_classification_tab()
+
 
 # --- NOVA TAB PARA O MODELO DE REGRESSÃO ---
-with tab_ml_regressao:
+def regression_model(backend, params, X_train_reg, y_train_reg):
+    """
+    Modelo de regressão dos filtros atuais, treinado em segundo plano e reaproveitando o registro em disco.
+    Retorna (pacote, chave): o pacote é None enquanto não há modelo, e pode ser o último modelo treinado
+    (de outra chave) enquanto o modelo da chave atual é treinado.
+    """
+    regression_key = ModelRegistry.make_key(
+        backend, params,
+        make_training_fingerprint(egressos_dataset_fp, sidebar_filter_state, FEATURES_REGRESSAO,
+                                  {'target': TARGET_REGRESSAO, 'split': REGRESSION_SPLIT})
+    )
+    # Linhagem: tudo o que define o modelo, exceto os arquivos de dados. Modelos da mesma linhagem
+    # treinados com menos arquivos (anos anteriores) podem ser atualizados incrementalmente
+    regression_metadata = {
+        'lineage': fingerprint(PREPROCESSING_VERSION, backend, params,
+                               sidebar_filter_state, FEATURES_REGRESSAO, {'target': TARGET_REGRESSAO, 'split': REGRESSION_SPLIT}),
+        'source_files': egressos_source_files,
+    }
+    regression_bundle = get_regression_model(regression_key, backend, params, X_train_reg, y_train_reg,
+                                             regression_metadata, filtered_egressos.loc[X_train_reg.index, 'ano'])
+    return regression_bundle, regression_key
+
+def render_regression_tab():
+    """
+    Conteúdo da aba de regressão. Retorna o pacote do modelo exibido, ou None quando não há dados ou o
+    modelo ainda está em treinamento (retornando mais cedo em vez de st.stop, para que o restante da
+    página continue sendo executado).
+    """
     st.header("⏳ Predição do Tempo de Graduação (Regressão)")
     st.write("Utilize este modelo para estimar o número de períodos necessários para a graduação de um aluno, com base em suas características.")
 
@@ -1500,51 +1394,64 @@ with tab_ml_regressao:
     # O modelo de regressão precisa de 'total_periodos' que está em egressos
     if filtered_egressos.empty or 'total_periodos' not in filtered_egressos.columns or filtered_egressos['total_periodos'].isnull().all():
         st.warning("Não há dados de egressos com 'total_periodos' válidos para treinar o modelo de regressão com os filtros atuais. Ajuste os filtros ou verifique seus dados de egressos.")
-        st.stop()
+        return None
 
     # --- Preparação dos dados para o Modelo de Regressão ---
     st.subheader("Configuração e Treinamento do Modelo")
 
-    # Features para o modelo de regressão (ajuste conforme a relevância do seu dataset)
-    features_regressao = ['nivel_ensino', 'sexo', 'nome_curso', 'nome_unidade', 'ano_ingresso']
-    target_regressao = 'total_periodos'
-
-    # Filtrar o DataFrame de egressos para incluir apenas as colunas relevantes e remover NaNs no target
-    df_regressao = filtered_egressos[features_regressao + [target_regressao]].dropna(subset=[target_regressao]).copy()
+    # Features para o modelo de regressão (ajuste analytics.FEATURES_REGRESSAO conforme a relevância do seu dataset)
+    features_regressao = FEATURES_REGRESSAO
+    target_regressao = TARGET_REGRESSAO
 
-    if df_regressao.empty:
+    # Colunas relevantes, sem alvo ausente e com 'ano_ingresso' numérico (analytics.regression_dataset)
+    X_reg, y_reg = analytics.regression_dataset(filtered_egressos, features_regressao, target_regressao)
+    if X_reg.empty:
         st.warning("Após a seleção de features e remoção de valores ausentes, o DataFrame de regressão está vazio. O modelo não pode ser treinado.")
-        st.stop()
-
-    # Certificar-se de que 'ano_ingresso' é numérica
-    if 'ano_ingresso' in df_regressao.columns:
-        df_regressao['ano_ingresso'] = pd.to_numeric(df_regressao['ano_ingresso'], errors='coerce').fillna(df_regressao['ano_ingresso'].mean())
-
-    # Separação de features (X) e target (y)
-    X_reg = df_regressao[features_regressao]
-    y_reg = df_regressao[target_regressao]
-
-    # Codificação de variáveis categóricas para o modelo de regressão
-    # Usar pd.get_dummies é mais robusto para novas categorias em inferência
-    X_reg_encoded = pd.get_dummies(X_reg, columns=[col for col in features_regressao if X_reg[col].dtype == 'object'])
-
-    # Divisão em conjuntos de treino e teste
-    X_train_reg, X_test_reg, y_train_reg, y_test_reg = train_test_split(X_reg_encoded, y_reg, test_size=0.2, random_state=42)
-
-    # Treinamento do Modelo de Regressão (RandomForestRegressor como exemplo)
-    @st.cache_resource
-    def train_regression_model(X_train, y_train):
-        model_reg = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1) # n_jobs=-1 para usar todos os cores
-        model_reg.fit(X_train, y_train)
-        return model_reg
-
-    model_reg = train_regression_model(X_train_reg, y_train_reg)
-
-    # Avaliação do Modelo
-    y_pred_reg = model_reg.predict(X_test_reg)
-    mse = mean_squared_error(y_test_reg, y_pred_reg)
+        return None
+
+    # Divisão em conjuntos de treino e teste, estável por matrícula (analytics.regression_split): com os
+    # arquivos de um ano novo, as linhas antigas continuam do mesmo lado e o modelo base atualizado
+    # incrementalmente não é avaliado em linhas do seu próprio treino
+    # A codificação one-hot (esparsa) é ajustada junto com o modelo e fica salva no pacote do registro
+    X_train_reg, X_test_reg, y_train_reg, y_test_reg = analytics.regression_split(filtered_egressos, X_reg, y_reg)
+
+    # Escolha do algoritmo: Random Forest sobre one-hot esparso ou Gradient Boosting com categorias nativas
+    regression_backend = st.selectbox(
+        "Algoritmo de regressão:",
+        options=list(REGRESSION_BACKENDS),
+        format_func=lambda backend: REGRESSION_BACKENDS[backend]['label'],
+        key='regression_backend'
+    )
+    regression_params = backend_params(REGRESSION_BACKENDS, regression_backend)
+    if regression_params is not REGRESSION_BACKENDS[regression_backend]['params']:
+        st.caption(f"Hiperparâmetros ajustados pela busca offline: {regression_params}")
+
+    # Treinamento do Modelo de Regressão (em segundo plano, reaproveitando o registro em disco)
+    regression_bundle, regression_key = regression_model(regression_backend, regression_params, X_train_reg, y_train_reg)
+
+    if regression_bundle is None:
+        st.info("O modelo de regressão para os filtros atuais está sendo treinado em segundo plano. "
+                "A página será atualizada automaticamente quando ele estiver pronto.")
+        wait_for_training(regression_key)
+        return None
+    elif regression_bundle['registry_key'] != regression_key:
+        st.info("Exibindo o último modelo de regressão treinado enquanto o modelo para os filtros atuais é treinado.")
+        wait_for_training(regression_key)
+
+    model_reg = regression_bundle['model']
+    if regression_bundle.get('training_mode') == 'incremental':
+        st.caption(f"Modelo atualizado incrementalmente: {regression_bundle['added_estimators']} árvores "
+                   f"acrescentadas com {regression_bundle['new_rows']} linhas dos anos novos "
+                   "(sem drift relevante em relação ao treino anterior).")
+    elif regression_bundle.get('drift'):
+        st.caption("Modelo treinado do zero: o teste de drift dos anos novos indicou "
+                   f"{'; '.join(regression_bundle['drift']['reasons'])}.")
+
+    # Avaliação do Modelo (com o encoder salvo junto com o modelo exibido)
+    y_pred_reg = model_reg.predict(encode_for_model(regression_bundle, X_test_reg))
+    mse = sklearn_metrics.mean_squared_error(y_test_reg, y_pred_reg)
     rmse = np.sqrt(mse) # Root Mean Squared Error
-    r2 = r2_score(y_test_reg, y_pred_reg)
+    r2 = sklearn_metrics.r2_score(y_test_reg, y_pred_reg)
 
     st.success(f"Modelo de Regressão treinado com sucesso! 🎉")
     st.info(f"Métricas de Avaliação no conjunto de teste:")
@@ -1553,6 +1460,23 @@ with tab_ml_regressao:
     st.markdown(f"- Coeficiente de Determinação (R² Score): **{r2:.2f}**")
     st.markdown("Um R² mais próximo de 1 indica um modelo que explica melhor a variância dos dados.")
 
+    st.subheader("Validação Cruzada")
+    st.write(f"Avaliação em {CV_FOLDS} dobras sobre todos os dados filtrados, "
+             "mais estável que a avaliação em um único conjunto de teste.")
+    regression_cv_key = ModelRegistry.make_key(
+        f"cv_{regression_backend}", regression_params,
+        make_training_fingerprint(egressos_dataset_fp, sidebar_filter_state, features_regressao,
+                                  {'target': target_regressao, 'folds': CV_FOLDS})
+    )
+    evaluation_section(
+        regression_cv_key,
+        lambda: model_evaluation.cross_validate_regressor(
+            regression_backend, regression_params,
+            X_reg, y_reg, n_splits=CV_FOLDS, n_jobs=CV_WORKERS
+        ),
+        button_key='regression_cv_run'
+    )
+
     st.markdown("---")
     st.subheader("Simulação de Predição de Períodos")
     st.write("Insira as características de um aluno para prever o número de períodos até a graduação.")
@@ -1583,24 +1507,18 @@ with tab_ml_regressao:
             # Criar DataFrame com os inputs do usuário
             input_data_reg = pd.DataFrame([input_reg_values])
 
-            # Codificar variáveis categóricas do input, garantindo que as colunas sejam as mesmas do treino
-            input_data_reg_encoded = pd.get_dummies(input_data_reg, columns=[col for col in features_regressao if input_data_reg[col].dtype == 'object'])
-
-            # Alinhar colunas do input com as colunas usadas no treinamento do modelo (importante para get_dummies)
-            # Adicionar colunas ausentes e preencher com 0
-            missing_cols_input = set(X_train_reg.columns) - set(input_data_reg_encoded.columns)
-            for c in missing_cols_input:
-                input_data_reg_encoded[c] = 0
-
-            # Remover colunas extras do input que não foram vistas no treino
-            extra_cols_input = set(input_data_reg_encoded.columns) - set(X_train_reg.columns)
-            input_data_reg_encoded = input_data_reg_encoded.drop(columns=list(extra_cols_input), errors='ignore')
+            # Consulta a tabela de predições pré-calculadas; só chama o modelo se a combinação não estiver nela
+            regression_lookup = regression_bundle.get('lookup') or {}
+            predicted_periods = regression_lookup.get(
+                tuple(input_reg_values[col] for col in regression_bundle['feature_columns'])
+            )
 
-            # Reordenar colunas para que correspondam à ordem de treino
-            input_data_reg_encoded = input_data_reg_encoded[X_train_reg.columns]
+            if predicted_periods is None:
+                # Codificar o input com o encoder do modelo (uma linha, sem alinhamento de colunas)
+                input_data_reg_encoded = encode_for_model(regression_bundle, input_data_reg)
 
-            # Fazer a predição
-            predicted_periods = model_reg.predict(input_data_reg_encoded)[0]
+                # Fazer a predição
+                predicted_periods = model_reg.predict(input_data_reg_encoded)[0]
 
             st.success(f"A duração estimada da graduação é de aproximadamente **{predicted_periods:.1f} períodos**.")
             st.info(f"Isso equivale a cerca de **{predicted_periods / 2:.1f} anos**.")
@@ -1609,10 +1527,122 @@ with tab_ml_regressao:
             st.error(f"Ocorreu um erro ao fazer a predição: {e}. Verifique se todos os campos foram preenchidos corretamente.")
             st.write("Detalhes do erro:", e)
 
+    return regression_bundle
+
+with tab_ml_regressao, observe_tab('regressao'):
+    if tab_ml_regressao.open:
+        render_regression_tab()
+
+
+# --- TAB DE PREDIÇÃO EM LOTE ---
+def batch_scoring_models():
+    """
+    Modelos usados na predição em lote, com as escolhas feitas nas abas de classificação e de regressão
+    (limiar e algoritmos), ou os padrões dessas abas. Retorna {rótulo da coluna: pacote ou None}; um pacote
+    é None quando não há dados para os filtros atuais ou o modelo de regressão ainda está em treinamento.
+    """
+    models = {'desempenho previsto (classificação)': None, 'períodos estimados (regressão)': None}
+    if (filtered_egressos.empty or 'total_periodos' not in filtered_egressos.columns
+            or filtered_egressos['total_periodos'].isnull().all()):
+        return models
+
+    threshold = classification_threshold(filtered_egressos['total_periodos'].median())
+    backend = st.session_state.get('classification_backend', next(iter(CLASSIFICATION_BACKENDS)))
+    try:
+        _, _, encoders, (X_train, _, y_train, _) = classification_data(threshold)
+    except KeyError:
+        pass
+    else:
+        models['desempenho previsto (classificação)'] = classification_model(
+            threshold, backend, backend_params(CLASSIFICATION_BACKENDS, backend), X_train, y_train, encoders)
+
+    X_reg, y_reg = analytics.regression_dataset(filtered_egressos, FEATURES_REGRESSAO, TARGET_REGRESSAO)
+    if not X_reg.empty:
+        backend = st.session_state.get('regression_backend', next(iter(REGRESSION_BACKENDS)))
+        X_train_reg, _, y_train_reg, _ = analytics.regression_split(filtered_egressos, X_reg, y_reg)
+        regression_bundle, regression_key = regression_model(backend, backend_params(REGRESSION_BACKENDS, backend),
+                                                             X_train_reg, y_train_reg)
+        if regression_bundle is None or regression_bundle['registry_key'] != regression_key:
+            st.info("O modelo de regressão para os filtros atuais está sendo treinado em segundo plano. "
+                    "A página será atualizada automaticamente quando ele estiver pronto.")
+            wait_for_training(regression_key)
+        else:
+            models['períodos estimados (regressão)'] = regression_bundle
+    return models
+
+def render_batch_tab():
+    """Conteúdo da aba de predição em lote."""
+    st.header("📄 Predição em Lote")
+    st.write("Envie um arquivo CSV no mesmo formato dos arquivos de ingressantes (separado por ';') para obter, "
+             "para cada aluno, as predições dos modelos treinados nas abas de classificação e de regressão.")
+
+    batch_models = batch_scoring_models()
+    classification_bundle = batch_models['desempenho previsto (classificação)']
+    regression_bundle = batch_models['períodos estimados (regressão)']
+    available_models = [label for label, bundle in batch_models.items() if bundle is not None]
+    if not available_models:
+        st.warning("Nenhum modelo está disponível para os filtros atuais. Verifique as abas de classificação e "
+                   "de regressão: os modelos podem estar sem dados ou ainda em treinamento.")
+        return
+
+    st.caption(f"Colunas acrescentadas ao arquivo: {', '.join(available_models)}.")
+    if len(available_models) < len(batch_models):
+        st.info("Apenas parte dos modelos está disponível; o arquivo pontuado trará somente as predições acima.")
+
+    batch_file = st.file_uploader("Arquivo CSV de ingressantes", type='csv', key='batch_scoring_file')
+    if batch_file is not None:
+        # O arquivo é pontuado em blocos só quando o download é solicitado, fora do rerun da página.
+        # O st.download_button guarda o arquivo pontuado inteiro em memória para servi-lo (ver score_csv)
+        st.download_button(
+            "Baixar predições",
+            data=lambda: score_csv(batch_file, classification_bundle, regression_bundle),
+            file_name=f"predicoes-{os.path.splitext(batch_file.name)[0]}.csv",
+            mime='text/csv',
+            on_click='ignore',
+            key='batch_scoring_download'
+        )
+
+with tab_predicao_lote, observe_tab('predicao_lote'):
+    if tab_predicao_lote.open:
+        render_batch_tab()
+
 
 st.sidebar.markdown("---")
 st.sidebar.info(
     "Este dashboard interativo permite explorar dados de ingressantes e egressos, "
     "analisando tendências e distribuições por ano, nível de ensino, sexo, curso e unidade."
     "\nCriado por: Robson Carneiro"
-)
\ No newline at end of file
+)
+
+metrics_export.end_rerun(rerun_metrics)
+memory_profiling.end_rerun(memory_rerun, st.session_state)
+
+# --- Painel de desempenho (apenas com DASHBOARD_PROFILING=1) ---
+if rerun_profile is not None:
+    perf_timing.end_rerun(rerun_profile)
+    with st.sidebar.expander("⏱️ Desempenho do rerun (admin)"):
+        st.caption(f"Tempo total: {rerun_profile.wall_seconds:.2f} s de parede, "
+                   f"{rerun_profile.cpu_seconds:.2f} s de CPU (thread do script). "
+                   f"Log: {perf_timing.PROFILING_LOG}")
+        st.dataframe(pd.DataFrame(perf_timing.summarize_stages(rerun_profile)).round(4), hide_index=True)
+
+# --- Painel de memória (apenas com DASHBOARD_MEMORY_PROFILING=1) ---
+if memory_profiling.PROFILING_ENABLED:
+    with st.sidebar.expander("🧠 Memória (admin)"):
+        caches_bytes, sessions_bytes = memory_profiling.LEDGER.total_bytes()
+        summary = [f"Caches: {caches_bytes / 2 ** 20:.1f} MB", f"retido pelas sessões: {sessions_bytes / 2 ** 20:.1f} MB"]
+        if memory_profiling.MEMORY_BUDGET_MB > 0:
+            summary.append(f"orçamento: {memory_profiling.MEMORY_BUDGET_MB:.0f} MB")
+        if memory_rerun.traced_peak is not None:
+            summary.append(f"pico rastreado no rerun: {memory_rerun.traced_peak / 2 ** 20:.1f} MB")
+        rss = metrics_export.resident_memory_bytes()
+        if rss is not None:
+            summary.append(f"memória residente do processo: {rss / 2 ** 20:.0f} MB")
+        st.caption("; ".join(summary))
+        st.markdown("**Maiores objetos contabilizados**")
+        largest = pd.DataFrame(memory_profiling.largest_objects())
+        if not largest.empty:
+            largest['ultimo_acesso'] = pd.to_datetime(largest['ultimo_acesso'], unit='s')
+            st.dataframe(largest.round(2), hide_index=True)
+        if st.button("Capturar snapshot do tracemalloc", key='memory_snapshot'):
+            st.dataframe(pd.DataFrame(memory_profiling.top_allocations()).round(2), hide_index=True)
@@ -0,0 +1,226 @@
+import os
+import re
+
+import pandas as pd
+
+# --- Caminhos para as pastas dos CSVs ---
+# DASHBOARD_DATASET permite apontar para outro conjunto com a mesma estrutura (ex.: gerado por synthetic_data.py)
+DATASET_FOLDER = os.environ.get("DASHBOARD_DATASET", "dataset")
+INGRESSANTES_FOLDER = os.path.join(DATASET_FOLDER, "ingressantes")
+EGRESSOS_FOLDER = os.path.join(DATASET_FOLDER, "egressos")
+
+# Função auxiliar para extrair o ano do nome do arquivo
+def extract_year_from_filename(filename):
+    """Tenta extrair um ano (quatro dígitos) de uma string de nome de arquivo."""
+    match = re.search(r'(\d{4})', filename)
+    if match:
+        return int(match.group(0))
+    return None
+
+def standardize_student_columns(df, dataset_label):
+    """
+    Padroniza, no próprio DataFrame, as colunas 'nivel_ensino', 'sexo', 'nome_curso' e 'nome_unidade'
+    (maiúsculas, sem espaços nas bordas, sexo como 'M'/'F'/'INDEFINIDO', criando as colunas ausentes).
+    Usada pelos carregadores e pela predição em lote, para que os arquivos enviados sigam as mesmas regras.
+    Retorna a lista de mensagens (avisos) gerada.
+    """
+    messages = []
+
+    # Padroniza a coluna 'nivel_ensino'
+    if 'nivel_ensino' in df.columns:
+        df['nivel_ensino'] = df['nivel_ensino'].astype(str).str.strip().str.upper()
+        df['nivel_ensino'].fillna('DESCONHECIDO', inplace=True)
+    else:
+        df['nivel_ensino'] = 'DESCONHECIDO'
+        messages.append({"type": "warning", "text": f"Coluna 'nivel_ensino' não encontrada nos dados de {dataset_label}. Criando coluna 'nivel_ensino' com 'DESCONHECIDO'."})
+
+    # Padroniza a coluna 'sexo'
+    sexo_cols = [col for col in df.columns if 'sexo' in col]
+    if sexo_cols:
+        df['sexo'] = df[sexo_cols[0]].astype(str).str.strip().str.upper()
+        df['sexo'] = df['sexo'].replace({
+            'MASCULINO': 'M', 'FEMININO': 'F', 'HOMEM': 'M', 'MULHER': 'F',
+            'MALE': 'M', 'FEMALE': 'F'
+        })
+        df['sexo'].fillna('INDEFINIDO', inplace=True)
+        df.loc[~df['sexo'].isin(['M', 'F']), 'sexo'] = 'INDEFINIDO'
+    else:
+        df['sexo'] = 'INDEFINIDO'
+        messages.append({"type": "warning", "text": f"Coluna de sexo não encontrada nos dados de {dataset_label}. Criando coluna 'sexo' com 'INDEFINIDO'."})
+
+    # Padroniza a coluna 'nome_curso'
+    if 'nome_curso' in df.columns:
+        df['nome_curso'] = df['nome_curso'].astype(str).str.strip().str.upper()
+        df['nome_curso'].fillna('DESCONHECIDO', inplace=True)
+    else:
+        df['nome_curso'] = 'DESCONHECIDO'
+        messages.append({"type": "warning", "text": f"Coluna 'nome_curso' não encontrada nos dados de {dataset_label}. Criando coluna 'nome_curso' com 'DESCONHECIDO'."})
+
+    # Padroniza a coluna 'nome_unidade' (Substitui 'nome_unidade_gestora')
+    if 'nome_unidade' in df.columns:
+        df['nome_unidade'] = df['nome_unidade'].astype(str).str.strip().str.upper()
+        df['nome_unidade'].fillna('DESCONHECIDA', inplace=True)
+    elif 'nome_unidade_gestora' in df.columns: # Se existir a antiga, renomeia e padroniza
+        df['nome_unidade'] = df['nome_unidade_gestora'].astype(str).str.strip().str.upper()
+        df['nome_unidade'].fillna('DESCONHECIDA', inplace=True)
+        df.drop(columns=['nome_unidade_gestora'], errors='ignore', inplace=True)
+        messages.append({"type": "info", "text": f"Coluna 'nome_unidade_gestora' renomeada para 'nome_unidade' nos dados de {dataset_label}."})
+    else:
+        df['nome_unidade'] = 'DESCONHECIDA'
+        messages.append({"type": "warning", "text": f"Coluna 'nome_unidade' (ou 'nome_unidade_gestora') não encontrada nos dados de {dataset_label}. Criando coluna 'nome_unidade' com 'DESCONHECIDA'."})
+
+    return messages
+
+def load_and_preprocess_ingressantes_data(ingressantes_folder=INGRESSANTES_FOLDER):
+    """
+    Carrega todos os arquivos CSV de ingressantes, os concatena,
+    adiciona a coluna 'ano' e padroniza as colunas 'nivel_ensino', 'sexo', 'nome_curso',
+    'nome_unidade'.
+    Retorna o DataFrame processado e uma lista de mensagens (sucesso/erro/aviso).
+    """
+    all_ingressantes_dfs = []
+    messages = []
+
+    if not os.path.exists(ingressantes_folder):
+        messages.append({"type": "error", "text": f"Erro: A pasta de ingressantes '{ingressantes_folder}' não foi encontrada. "
+                                                  "Certifique-se de que a estrutura é 'seu_app/dataset/ingressantes'."})
+        return pd.DataFrame(), messages
+
+    ingressantes_files = [f for f in os.listdir(ingressantes_folder) if f.endswith('.csv')]
+    
+    if not ingressantes_files:
+        messages.append({"type": "warning", "text": f"Nenhum arquivo CSV encontrado na pasta '{ingressantes_folder}'."})
+        return pd.DataFrame(), messages
+
+    for file_name in ingressantes_files:
+        file_path = os.path.join(ingressantes_folder, file_name)
+        year = extract_year_from_filename(file_name)
+        
+        try:
+            df = pd.read_csv(file_path, sep=';')
+            df.columns = df.columns.str.lower() # Converte todos os nomes de colunas para minúsculas
+
+            if year:
+                df['ano'] = year
+            else:
+                messages.append({"type": "warning", "text": f"Não foi possível extrair o ano de '{file_name}'. O arquivo pode não ser incluído em filtros por ano."})
+
+            all_ingressantes_dfs.append(df)
+            messages.append({"type": "toast", "text": f"Carregado: {file_name}"})
+        except Exception as e:
+            messages.append({"type": "error", "text": f"Erro ao carregar o arquivo de ingressantes '{file_name}': {e}. Verifique o formato do CSV e a codificação."})
+            continue
+
+    if not all_ingressantes_dfs:
+        messages.append({"type": "error", "text": "Nenhum dado de ingressantes pôde ser carregado. Retornando DataFrame vazio."})
+        return pd.DataFrame(), messages
+
+    df_ingressantes_combined = pd.concat(all_ingressantes_dfs, ignore_index=True)
+
+    # --- Pré-processamento FINAIS para INGRESSANTES ---
+    messages.extend(standardize_student_columns(df_ingressantes_combined, 'ingressantes'))
+
+    # 'total_periodos' não é aplicável para ingressantes, removendo qualquer referência
+    if 'total_periodos' in df_ingressantes_combined.columns:
+        df_ingressantes_combined.drop(columns=['total_periodos'], errors='ignore', inplace=True)
+
+
+    df_ingressantes_combined.drop_duplicates(inplace=True)
+
+    if 'ano' in df_ingressantes_combined.columns:
+        df_ingressantes_combined['ano'] = pd.to_numeric(df_ingressantes_combined['ano'], errors='coerce').fillna(0).astype(int)
+    else:
+        messages.append({"type": "error", "text": "Coluna 'ano' não disponível nos dados de ingressantes para filtros. Verifique o nome dos arquivos."})
+        
+    messages.append({"type": "success", "text": "Dados de Ingressantes carregados e pré-processados!"})
+    return df_ingressantes_combined, messages
+
+def load_and_preprocess_egressos_data(egressos_folder=EGRESSOS_FOLDER):
+    """
+    Carrega todos os arquivos CSV de egressos, os concatena,
+    adiciona a coluna 'ano' e padroniza as colunas 'nivel_ensino', 'sexo', 'nome_curso',
+    'nome_unidade' e CALCULA 'total_periodos'.
+    Retorna o DataFrame processado e uma lista de mensagens.
+    """
+    all_egressos_dfs = []
+    messages = []
+
+    if not os.path.exists(egressos_folder):
+        messages.append({"type": "error", "text": f"Erro: A pasta de egressos '{egressos_folder}' não foi encontrada. "
+                                                 "Certifique-se de que a estrutura é 'seu_app/dataset/egressos'."})
+        return pd.DataFrame(), messages
+
+    egressos_files = [f for f in os.listdir(egressos_folder) if f.endswith('.csv')]
+
+    if not egressos_files:
+        messages.append({"type": "warning", "text": f"Nenhum arquivo CSV encontrado na pasta '{egressos_folder}'."})
+        return pd.DataFrame(), messages
+
+    for file_name in egressos_files:
+        file_path = os.path.join(egressos_folder, file_name)
+        year = extract_year_from_filename(file_name)
+
+        try:
+            df = pd.read_csv(file_path, sep=';')
+            df.columns = df.columns.str.lower()
+
+            if year:
+                df['ano'] = year
+            else:
+                messages.append({"type": "warning", "text": f"Não foi possível extrair o ano de '{file_name}'. O arquivo pode não ser incluído em filtros por ano."})
+            
+            all_egressos_dfs.append(df)
+            messages.append({"type": "toast", "text": f"Carregado: {file_name}"})
+        except Exception as e:
+            messages.append({"type": "error", "text": f"Erro ao carregar o arquivo de egressos '{file_name}': {e}. Verifique o formato do CSV e a codificação."})
+            continue
+
+    if not all_egressos_dfs:
+        messages.append({"type": "error", "text": "Nenhum dado de egressos pôde ser carregado. Retornando DataFrame vazio."})
+        return pd.DataFrame(), messages
+
+    df_egressos_combined = pd.concat(all_egressos_dfs, ignore_index=True)
+
+    # --- Pré-processamento FINAIS para EGRESSOS ---
+    messages.extend(standardize_student_columns(df_egressos_combined, 'egressos'))
+
+    # --- CALCULA total_periodos para EGRESSOS ---
+    required_cols_for_periods = ['ano_conclusao', 'periodo_conclusao', 'ano_ingresso', 'periodo_ingresso']
+    # Verifica se todas as colunas necessárias estão presentes no DataFrame antes de tentar o cálculo
+    if all(col in df_egressos_combined.columns for col in required_cols_for_periods):
+        try:
+            # Converte para numérico e preenche NaN com 0 antes do cálculo
+            for col in required_cols_for_periods:
+                df_egressos_combined[col] = pd.to_numeric(df_egressos_combined[col], errors='coerce').fillna(0)
+            
+            # Garante que os períodos sejam inteiros para o cálculo
+            df_egressos_combined['periodo_conclusao'] = df_egressos_combined['periodo_conclusao'].astype(int)
+            df_egressos_combined['periodo_ingresso'] = df_egressos_combined['periodo_ingresso'].astype(int)
+            df_egressos_combined['ano_conclusao'] = df_egressos_combined['ano_conclusao'].astype(int)
+            df_egressos_combined['ano_ingresso'] = df_egressos_combined['ano_ingresso'].astype(int)
+
+            # Cálculo do total de períodos
+            df_egressos_combined['total_periodos'] = (
+                (df_egressos_combined['ano_conclusao'] - df_egressos_combined['ano_ingresso']) * 2 +
+                (df_egressos_combined['periodo_conclusao'] - df_egressos_combined['periodo_ingresso'])
+            )
+            # Garante que total_periodos não seja negativo (caso haja dados inconsistentes)
+            df_egressos_combined['total_periodos'] = df_egressos_combined['total_periodos'].apply(lambda x: max(0, x))
+            messages.append({"type": "success", "text": "Coluna 'total_periodos' calculada para egressos."})
+        except Exception as e:
+            df_egressos_combined['total_periodos'] = 0
+            messages.append({"type": "warning", "text": f"Erro ao calcular 'total_periodos' para egressos: {e}. Coluna criada com 0."})
+    else:
+        df_egressos_combined['total_periodos'] = 0
+        messages.append({"type": "warning", "text": f"Colunas ({', '.join(required_cols_for_periods)}) necessárias para calcular 'total_periodos' não encontradas nos dados de egressos. Coluna criada com 0."})
+
+
+    df_egressos_combined.drop_duplicates(inplace=True)
+
+    if 'ano' in df_egressos_combined.columns:
+        df_egressos_combined['ano'] = pd.to_numeric(df_egressos_combined['ano'], errors='coerce').fillna(0).astype(int)
+    else:
+        messages.append({"type": "error", "text": "Coluna 'ano' não disponível nos dados de egressos para filtros. Verifique o nome dos arquivos."})
+
+    messages.append({"type": "success", "text": "Dados de Egressos carregados e pré-processados!"})
+    return df_egressos_combined, messages
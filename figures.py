@@ -0,0 +1,279 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from lazy_imports import lazy_import
+from perf_timing import timed
+
+# plotly só é carregado quando a primeira figura é montada (ver lazy_imports)
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+
+logger = logging.getLogger(__name__)
+
+# --- Cubo de contagens para o Comparativo Geral ---
+COMPARATIVO_DIMENSOES = ['ano', 'sexo', 'nivel_ensino', 'nome_unidade']
+
+def build_count_cube(frames, dims=COMPARATIVO_DIMENSOES):
+    """
+    Calcula, em um único groupby, as contagens por ('Tipo de Aluno', *dims) para vários DataFrames.
+    Só as colunas de dimensão presentes em todos os DataFrames são copiadas; as visões do
+    comparativo são derivadas do cubo com rollup_count_cube.
+    """
+    dims = [d for d in dims if all(d in df.columns for df in frames.values())]
+    tipos = list(frames)
+    combined = pd.concat(
+        [df[dims].assign(**{'Tipo de Aluno': tipo}) for tipo, df in frames.items()],
+        ignore_index=True
+    )
+    # Categórico ordenado preserva a ordem dos tipos (e as cores) nos gráficos
+    combined['Tipo de Aluno'] = pd.Categorical(combined['Tipo de Aluno'], categories=tipos, ordered=True)
+    return combined.groupby(['Tipo de Aluno'] + dims, observed=True).size().reset_index(name='Contagem')
+
+def rollup_count_cube(cube, dims):
+    """Agrega o cubo de contagens para ('Tipo de Aluno', *dims), somando as demais dimensões."""
+    return cube.groupby(['Tipo de Aluno'] + dims, observed=True)['Contagem'].sum().reset_index()
+
+def count_rows(df, dims):
+    """
+    Contagem de linhas por combinação de 'dims' (colunas dims + 'count', ordenadas pelas dims).
+    É a agregação de entrada das figuras abaixo; com o backend SQL, vem de sql_backend.count_rows.
+    """
+    return df.groupby(dims).size().reset_index(name='count')
+
+# --- Construção de figuras (funções puras, sem chamadas st.*) ---
+# Orçamento de payload por figura (bytes do JSON enviado ao navegador); 0 desliga o controle
+FIGURE_MAX_BYTES = int(os.environ.get("DASHBOARD_FIGURE_MAX_BYTES", str(2_000_000)))
+# Limites usados pelas versões compactas das figuras que excedem o orçamento (nível 1); cada nível
+# seguinte, até MAX_COMPACT_LEVEL, reduz esses limites pela metade
+SUNBURST_MAX_CATEGORIES = 15
+FIGURE_SAMPLE_ROWS = 5000
+MAX_COMPACT_LEVEL = 4
+# Estimativa do payload: propriedades dos traces com um valor por ponto, bytes fixos da figura
+# (layout e template) e valores de texto amostrados para estimar o tamanho médio
+POINT_PROPERTIES = ('x', 'y', 'z', 'values', 'labels', 'ids', 'parents', 'text', 'hovertext', 'customdata')
+FIGURE_BASE_BYTES = 7_000
+PAYLOAD_SAMPLE = 1000
+
+def figure_payload_bytes(fig):
+    """Tamanho, em bytes, do JSON da figura que seria enviado ao navegador (serializa a figura)."""
+    return len(fig.to_json().encode('utf-8'))
+
+def estimate_payload_bytes(fig):
+    """
+    Estimativa barata de figure_payload_bytes a partir do número de pontos de cada trace, sem serializar:
+    arrays numéricos vão em base64 (4/3 do buffer; inteiros no menor tipo que comporta os valores, como faz
+    o plotly) e textos pelo tamanho médio de uma amostra dos valores.
+    """
+    total = FIGURE_BASE_BYTES
+    for trace in fig.data:
+        for prop in POINT_PROPERTIES:
+            values = trace[prop] if prop in trace else None
+            if values is None or isinstance(values, str):
+                continue
+            array = np.asarray(values)
+            if array.dtype.kind in 'biu' and array.size:
+                itemsize = max(np.min_scalar_type(array.min()).itemsize, np.min_scalar_type(array.max()).itemsize)
+                total += array.size * itemsize * 4 // 3
+            elif array.dtype.kind in 'biuf':
+                total += array.nbytes * 4 // 3
+            else:
+                flat = array.ravel()
+                sample = flat[:PAYLOAD_SAMPLE]
+                # Valor em UTF-8 mais aspas e vírgula
+                mean_bytes = sum(len(str(value).encode('utf-8')) + 3 for value in sample) / max(1, len(sample))
+                total += int(mean_bytes * len(flat))
+    return total
+
+def compact_limit(base, level):
+    """Limite (categorias, linhas da amostra) do nível de compactação 'level' (>= 1)."""
+    return max(1, base >> (int(level) - 1))
+
+# Figuras que já geraram o aviso de orçamento excedido na versão mais compacta (um aviso por figura)
+_over_budget_warned = set()
+
+def fit_figure_to_budget(name, builder):
+    """
+    Aplica o orçamento de payload FIGURE_MAX_BYTES a uma figura.
+    'builder(compact)' constrói a figura completa (compact=0) ou versões cada vez mais agregadas ou
+    amostradas (compact=1, 2, ... até MAX_COMPACT_LEVEL). O tamanho de cada versão é estimado com
+    estimate_payload_bytes; retorna a primeira que cabe no orçamento (ou a mais compacta).
+    A compactação é o caminho normal das figuras grandes e é registrada em nível info; só a figura que
+    não cabe nem na versão mais compacta gera um aviso, uma vez por figura.
+    """
+    fig = builder(0)
+    if fig is None or FIGURE_MAX_BYTES <= 0:
+        return fig
+
+    full_size = estimate_payload_bytes(fig)
+    if full_size <= FIGURE_MAX_BYTES:
+        return fig
+
+    for level in range(1, MAX_COMPACT_LEVEL + 1):
+        fig = builder(level)
+        size = estimate_payload_bytes(fig)
+        if size <= FIGURE_MAX_BYTES:
+            logger.info("Figura '%s' compactada para o orçamento de payload (%d bytes): ~%d bytes na versão "
+                        "completa, ~%d bytes no nível %d.", name, FIGURE_MAX_BYTES, full_size, size, level)
+            return fig
+    log = logger.info if name in _over_budget_warned else logger.warning
+    _over_budget_warned.add(name)
+    log("Figura '%s' excede o orçamento de payload (~%d bytes > %d bytes) mesmo na versão mais "
+        "compacta (nível %d): ~%d bytes.", name, full_size, FIGURE_MAX_BYTES, MAX_COMPACT_LEVEL, size)
+    return fig
+
+def sunburst_nodes(df, path, max_categories=None, counts=None):
+    """
+    Monta os nós (ids, parents, labels, count) de um Sunburst para a hierarquia 'path'.
+    Os ids de cada nível são os valores do caminho unidos por " - ", e o pai de cada nó é o id do nível anterior.
+    Com 'max_categories', cada pai mantém apenas as maiores folhas; as demais são somadas em "Outros".
+    'counts' (count_rows de 'path') evita recalcular a contagem a partir das linhas de 'df'.
+    """
+    df_grouped = count_rows(df, path) if counts is None else counts.copy()
+
+    if max_categories:
+        leaf_col, parent_cols = path[-1], path[:-1]
+        counts = df_grouped.groupby(parent_cols)['count'] if parent_cols else df_grouped['count']
+        rank = counts.rank(method='first', ascending=False)
+        df_grouped[leaf_col] = df_grouped[leaf_col].where(rank <= max_categories, 'Outros')
+        df_grouped = df_grouped.groupby(path, as_index=False)['count'].sum()
+
+    levels = []
+    for depth in range(1, len(path) + 1):
+        level_cols = path[:depth]
+        if depth < len(path):
+            level = df_grouped.groupby(level_cols)['count'].sum().reset_index()
+        else:
+            level = df_grouped.copy()
+
+        parents = ""
+        ids = level[level_cols[0]]
+        for col in level_cols[1:]:
+            parents = ids
+            ids = ids + " - " + level[col]
+        level['ids'] = ids
+        level['parents'] = parents
+        level['labels'] = level[level_cols[-1]]
+        levels.append(level[['ids', 'parents', 'labels', 'count']])
+
+    return pd.concat(levels)
+
+@timed('sunburst', rows_arg=0)
+def build_sunburst_figure(df, path, title, counts=None):
+    """Retorna o Sunburst da hierarquia 'path', ou None se faltarem colunas ou não houver dados."""
+    if df.empty or not all(col in df.columns for col in path):
+        return None
+
+    def builder(compact):
+        max_categories = compact_limit(SUNBURST_MAX_CATEGORIES, compact) if compact else None
+        sunburst_data = sunburst_nodes(df, path, max_categories=max_categories, counts=counts)
+        fig = go.Figure(go.Sunburst(
+            ids=sunburst_data['ids'],
+            labels=sunburst_data['labels'],
+            parents=sunburst_data['parents'],
+            values=sunburst_data['count'],
+            branchvalues="total",
+            hovertemplate='<b>%{label}</b><br>Alunos: %{value}<br>Percentual: %{percentParent}<extra></extra>'
+        ))
+        fig.update_layout(margin = dict(t=0, l=0, r=0, b=0), title_text=title)
+        return fig
+
+    return fit_figure_to_budget(title, builder)
+
+@timed('barras_por_ano', rows_arg=0)
+def build_yearly_bar_figure(df, title, ano_label, counts=None):
+    """Retorna o gráfico de barras de alunos por ano, ou None se a coluna 'ano' não existir."""
+    if df.empty or 'ano' not in df.columns:
+        return None
+
+    por_ano = count_rows(df, ['ano']) if counts is None else counts
+    fig = px.bar(por_ano, x='ano', y='count',
+                 title=title,
+                 labels={'ano': ano_label, 'count': 'Número de Alunos'})
+    fig.update_xaxes(dtick=1, tickformat="%Y")
+    return fig
+
+@timed('pizza_sexo', rows_arg=0)
+def build_sex_pie_figure(df, counts=None):
+    """Retorna a pizza da distribuição percentual de sexo, ou None se a coluna 'sexo' não existir."""
+    if df.empty or 'sexo' not in df.columns:
+        return None
+
+    sexo_dist = count_rows(df, ['sexo']) if counts is None else counts
+    # Mais frequentes primeiro; empates na ordem das categorias
+    sexo_dist = sexo_dist.sort_values('count', ascending=False, kind='stable')
+    sexo_dist = pd.DataFrame({'sexo': sexo_dist['sexo'], 'percentage': sexo_dist['count'] / sexo_dist['count'].sum() * 100})
+    return px.pie(sexo_dist, names='sexo', values='percentage',
+                  title='Distribuição Percentual de Sexo',
+                  hole=0.3)
+
+@timed('violino', rows_arg=0)
+def build_violin_figure(df, limite_periodos, compact=False):
+    """
+    Violino do total de semestres por unidade e sexo. As versões compactas usam uma amostra
+    determinística (FIGURE_SAMPLE_ROWS linhas no nível 1, metade a cada nível seguinte),
+    sem pontos de outliers nem dados extras de hover.
+    """
+    titulo = f'Distribuição do Total de Semestres Concluídos por Unidade e Sexo (Máx {limite_periodos} Semestres)'
+    if compact:
+        sample_rows = compact_limit(FIGURE_SAMPLE_ROWS, compact)
+        if len(df) > sample_rows:
+            df = df.sample(n=sample_rows, random_state=42)
+        titulo += f' (amostra de {len(df)} alunos)'
+
+    fig = px.violin(
+        df,
+        x='nome_unidade',
+        y='total_periodos',
+        color='sexo_rotulo',
+        box=True,
+        points=False if compact else "outliers",
+        title=titulo,
+        labels={'nome_unidade': 'Unidade', 'total_periodos': 'Total de Semestres Concluídos', 'sexo_rotulo': 'Gênero'},
+        hover_data=None if compact else {'total_periodos': True, 'nome_curso': True, 'ano': True},
+        height=600,
+        color_discrete_sequence=px.colors.qualitative.Plotly
+    )
+    fig.update_xaxes(tickangle=45)
+    return fig
+
+@timed('histograma_periodos', rows_arg=0)
+def build_period_histogram_figure(df, nbins, compact=False):
+    """
+    Histograma do total de períodos por gênero. A versão compacta envia as contagens já agrupadas
+    por período (barras pré-calculadas) em vez das linhas brutas, sem o box plot marginal.
+    """
+    titulo = f'Distribuição de Frequência do Total de Períodos nos Cursos Selecionados (Máx {nbins}) por Gênero'
+    labels = {'total_periodos': 'Total de Semestres', 'sexo_rotulo': 'Gênero'}
+    if compact:
+        freq = df.groupby(['total_periodos', 'sexo_rotulo']).size().reset_index(name='Frequência')
+        fig = px.bar(freq, x='total_periodos', y='Frequência', color='sexo_rotulo',
+                     title=titulo, labels=labels,
+                     color_discrete_sequence=px.colors.sequential.Cividis,
+                     height=500)
+        fig.update_layout(bargap=0)
+    else:
+        fig = px.histogram(
+            df,
+            x='total_periodos',
+            color='sexo_rotulo',
+            marginal="box", # Adiciona um box plot marginal para visualização da distribuição
+            nbins=nbins, # Controla o número de bins, inspirado no 'bins' do seaborn
+            title=titulo,
+            labels=labels,
+            color_discrete_sequence=px.colors.sequential.Cividis, # Paleta de cores 'cividis'
+            height=500
+        )
+    fig.update_layout(yaxis_title='Frequência')
+    return fig
+
+def build_figures(specs):
+    """
+    Constrói um conjunto de figuras independentes, em sequência.
+    'specs' mapeia um nome para (função, *argumentos); o resultado mapeia o mesmo nome para a figura,
+    na ordem de 'specs'. Um pool de threads não reduz o tempo total: a montagem das figuras é limitada
+    pelo GIL (ver 'figuras_da_pagina/*' em benchmarks.pipeline).
+    """
+    return {name: func(*args) for name, (func, *args) in specs.items()}
@@ -0,0 +1,49 @@
+import logging
+
+import pandas as pd
+
+from perf_timing import timed
+
+logger = logging.getLogger(__name__)
+
+@timed('filtros_sidebar', rows_arg=0)
+def apply_sidebar_filters(df, years_range, sex_filter_list, course_filter_list, nivel_ensino_filter_list, unidade_filter_list):
+    """Aplica os filtros de ano, sexo, curso, nível de ensino e unidade a um DataFrame dado."""
+    df_filtered = df.copy()
+
+    # Filtro por Nível de Ensino - PRIMEIRO
+    if 'nivel_ensino' in df_filtered.columns and nivel_ensino_filter_list:
+        df_filtered = df_filtered[df_filtered['nivel_ensino'].isin(nivel_ensino_filter_list)]
+    else:
+        return pd.DataFrame() 
+    
+    # Filtro por Ano - SEGUNDO
+    min_year_sel, max_year_sel = years_range
+    if 'ano' in df_filtered.columns:
+        df_filtered = df_filtered[
+            (df_filtered['ano'] >= min_year_sel) & 
+            (df_filtered['ano'] <= max_year_sel)
+        ]
+    else:
+        logger.warning(f"Coluna 'ano' não encontrada no DataFrame de {df.name if hasattr(df, 'name') else 'dados'} para filtro de ano.")
+
+    # Filtro por Unidade - TERCEIRO (Ordem alterada)
+    if 'nome_unidade' in df_filtered.columns and unidade_filter_list:
+        df_filtered = df_filtered[df_filtered['nome_unidade'].isin(unidade_filter_list)]
+    elif not unidade_filter_list and 'nome_unidade' in df_filtered.columns:
+        pass 
+
+    # Filtro por Nome do Curso - QUARTO (Ordem alterada)
+    if 'nome_curso' in df_filtered.columns and course_filter_list:
+        df_filtered = df_filtered[df_filtered['nome_curso'].isin(course_filter_list)]
+    elif not course_filter_list and 'nome_curso' in df_filtered.columns:
+        pass 
+
+    # Filtro por Sexo - QUINTO
+    if 'sexo' in df_filtered.columns and sex_filter_list:
+        df_filtered = df_filtered[df_filtered['sexo'].isin(sex_filter_list)]
+    elif not sex_filter_list and 'sexo' in df_filtered.columns:
+        pass 
+
+
+    return df_filtered
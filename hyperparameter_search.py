@@ -0,0 +1,230 @@
+"""
+Busca offline de hiperparâmetros dos modelos de predição (successive halving).
+
+Para cada backend de classificação e de regressão, avalia uma grade de profundidade máxima,
+tamanho mínimo das folhas e número de árvores/iterações com HalvingGridSearchCV: todas as
+combinações começam com poucas linhas, e só o terço melhor de cada rodada segue para a próxima,
+com o triplo de linhas. As dobras e combinações rodam em paralelo.
+
+O objetivo combina qualidade, latência e tamanho do modelo:
+    objetivo = qualidade - peso_latencia * log10(1 + ms por 1000 predições)
+                         - peso_tamanho * log10(1 + MB do modelo serializado)
+(qualidade = acurácia na classificação e R² na regressão).
+
+O vencedor de cada backend é salvo no registro de modelos do dashboard ('tuned_<backend>.settings.json',
+fora da evicção dos modelos); o dashboard passa a treinar com esses hiperparâmetros no lugar dos padrões
+de ml_pipeline.
+
+Uso (a partir da raiz do repositório):
+    python -m hyperparameter_search [--backend BACKEND ...] [--json resultados.json]
+"""
+import argparse
+import json
+import math
+import os
+import pickle
+import time
+
+import pandas as pd
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (habilita HalvingGridSearchCV)
+from sklearn.ensemble import (HistGradientBoostingClassifier, HistGradientBoostingRegressor,
+                              RandomForestRegressor)
+from sklearn.metrics import accuracy_score, r2_score
+from sklearn.model_selection import HalvingGridSearchCV, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+
+import analytics
+from analytics import CLASSIFICATION_SPLIT, FEATURES_CLASSIFICACAO, FEATURES_REGRESSAO
+from data_loading import EGRESSOS_FOLDER, load_and_preprocess_egressos_data
+from ml_pipeline import (CLASSIFICATION_BACKENDS, REGRESSION_BACKENDS, build_ordinal_encoder,
+                         build_sparse_encoder, native_categorical_mask, split_feature_types,
+                         tuned_params_key)
+from model_registry import ModelRegistry
+
+# Mesmo registro (e variáveis de ambiente) usado pelo dashboard
+MODEL_REGISTRY_FOLDER = os.environ.get("DASHBOARD_MODEL_REGISTRY", "model_registry")
+MODEL_REGISTRY_MAX_BYTES = int(os.environ.get("DASHBOARD_MODEL_REGISTRY_MAX_BYTES", str(1_000_000_000)))
+
+# Pesos padrão das penalidades de latência e tamanho no objetivo
+LATENCY_WEIGHT = 0.01
+SIZE_WEIGHT = 0.01
+
+# Grade de busca de cada backend (nomes dos hiperparâmetros do estimador)
+SEARCH_SPACES = {
+    'decision_tree_classifier': {
+        'max_depth': [None, 8, 12, 16, 24],
+        'min_samples_leaf': [1, 5, 20, 50],
+    },
+    'hist_gradient_boosting_classifier': {
+        'max_iter': [50, 100, 200, 400],
+        'max_depth': [None, 6, 10],
+        'min_samples_leaf': [5, 20, 50],
+    },
+    'random_forest_regressor': {
+        'n_estimators': [25, 50, 100, 200],
+        'max_depth': [None, 12, 20],
+        'min_samples_leaf': [1, 5, 20],
+    },
+    'hist_gradient_boosting_regressor': {
+        'max_iter': [50, 100, 200, 400],
+        'max_depth': [None, 6, 10],
+        'min_samples_leaf': [5, 20, 50],
+    },
+}
+
+
+def model_size_bytes(model):
+    """Tamanho do modelo serializado com pickle."""
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def measure(estimator, X, y, quality_fn):
+    """Qualidade, latência (ms por 1000 predições) e tamanho (MB) do estimador ajustado."""
+    start = time.perf_counter()
+    y_pred = estimator.predict(X)
+    latency_ms = (time.perf_counter() - start) * 1000 * 1000 / max(len(X), 1)
+    return {
+        'qualidade': float(quality_fn(y, y_pred)),
+        'latencia_ms_1000': latency_ms,
+        'tamanho_mb': model_size_bytes(estimator) / 1e6,
+    }
+
+
+def joint_objective(metrics, latency_weight=LATENCY_WEIGHT, size_weight=SIZE_WEIGHT):
+    """Objetivo único a maximizar: qualidade penalizada pela latência e pelo tamanho."""
+    return (metrics['qualidade']
+            - latency_weight * math.log10(1 + metrics['latencia_ms_1000'])
+            - size_weight * math.log10(1 + metrics['tamanho_mb']))
+
+
+def make_scorer(quality_fn, latency_weight, size_weight):
+    """Scorer do scikit-learn que mede o objetivo conjunto no conjunto de validação de cada dobra."""
+    def scorer(estimator, X, y):
+        return joint_objective(measure(estimator, X, y, quality_fn), latency_weight, size_weight)
+    return scorer
+
+
+def make_estimator(backend, X, params):
+    """
+    Pipeline (encoder + modelo) equivalente ao treino do dashboard, para ser ajustado diretamente
+    pela busca. Na classificação, X já chega com os códigos do LabelEncoder.
+    """
+    if backend == 'decision_tree_classifier':
+        return Pipeline([('encoder', 'passthrough'), ('model', DecisionTreeClassifier(**params))])
+    if backend == 'hist_gradient_boosting_classifier':
+        mask = native_categorical_mask([int(X[col].max()) + 1 for col in X.columns])
+        return Pipeline([('encoder', 'passthrough'),
+                         ('model', HistGradientBoostingClassifier(categorical_features=mask, **params))])
+
+    categorical, numeric = split_feature_types(X, list(X.columns))
+    if backend == 'hist_gradient_boosting_regressor':
+        mask = native_categorical_mask([X[col].nunique() for col in categorical], len(numeric))
+        return Pipeline([('encoder', build_ordinal_encoder(categorical, numeric)),
+                         ('model', HistGradientBoostingRegressor(categorical_features=mask, **params))])
+    return Pipeline([('encoder', build_sparse_encoder(categorical, numeric)),
+                     ('model', RandomForestRegressor(**params))])
+
+
+def search_backend(backend, default_params, X, split, quality_fn, latency_weight, size_weight, n_jobs=-1):
+    """
+    Successive halving sobre o espaço de busca do backend, seguido da comparação, no conjunto de teste,
+    entre os hiperparâmetros padrão e os vencedores. 'split' é a divisão (X_train, X_test, y_train, y_test)
+    de 'X' usada pelo dashboard. Retorna o resumo da busca.
+    """
+    X_train, X_test, y_train, y_test = split
+
+    # Durante a busca os modelos rodam em um núcleo: o paralelismo fica entre combinações e dobras
+    base_params = {**default_params, **({'n_jobs': 1} if 'n_jobs' in default_params else {})}
+    search = HalvingGridSearchCV(
+        make_estimator(backend, X, base_params),
+        {f"model__{name}": values for name, values in SEARCH_SPACES[backend].items()},
+        factor=3, resource='n_samples', min_resources='exhaust', cv=3,
+        scoring=make_scorer(quality_fn, latency_weight, size_weight),
+        refit=False, n_jobs=n_jobs, random_state=42,
+    )
+    start = time.perf_counter()
+    search.fit(X_train, y_train)
+    search_seconds = time.perf_counter() - start
+
+    best_params = {**default_params, **{name[len('model__'):]: value for name, value in search.best_params_.items()}}
+    comparison = {}
+    for label, params in (('padrao', default_params), ('vencedor', best_params)):
+        estimator = make_estimator(backend, X, params).fit(X_train, y_train)
+        metrics = measure(estimator, X_test, y_test, quality_fn)
+        metrics['objetivo'] = joint_objective(metrics, latency_weight, size_weight)
+        comparison[label] = metrics
+
+    return {
+        'backend': backend,
+        'params': best_params,
+        'candidatos': len(search.cv_results_['params']),
+        'rodadas': int(search.n_iterations_),
+        'tempo_busca_s': round(search_seconds, 1),
+        'teste': comparison,
+        'pesos': {'latencia': latency_weight, 'tamanho': size_weight},
+    }
+
+
+def classification_data(df_egressos):
+    """
+    Features (códigos do LabelEncoder) e alvo 'Curto'/'Longo' com o limiar na mediana, preparados e divididos
+    como na aba de classificação do dashboard. Retorna (X, divisão treino/teste).
+    """
+    threshold = int(df_egressos['total_periodos'].median())
+    X, y, _ = analytics.classification_dataset(df_egressos, threshold, FEATURES_CLASSIFICACAO)
+    y = y.to_numpy()
+    return X, train_test_split(X, y, stratify=y, **CLASSIFICATION_SPLIT)
+
+
+def regression_data(df_egressos):
+    """
+    Features e total de períodos preparados e divididos (por matrícula) como na aba de regressão do dashboard.
+    Retorna (X, divisão treino/teste).
+    """
+    X, y = analytics.regression_dataset(df_egressos, FEATURES_REGRESSAO)
+    return X, analytics.regression_split(df_egressos, X, y)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--egressos', default=EGRESSOS_FOLDER, help="Pasta com os CSVs de egressos.")
+    parser.add_argument('--backend', action='append', choices=list(SEARCH_SPACES),
+                        help="Backend a ajustar (pode ser repetido; padrão: todos).")
+    parser.add_argument('--peso-latencia', type=float, default=LATENCY_WEIGHT)
+    parser.add_argument('--peso-tamanho', type=float, default=SIZE_WEIGHT)
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Processos usados pela busca.")
+    parser.add_argument('--registry', default=MODEL_REGISTRY_FOLDER, help="Pasta do registro de modelos.")
+    parser.add_argument('--dry-run', action='store_true', help="Não grava os vencedores no registro.")
+    parser.add_argument('--json', help="Arquivo onde salvar os resultados em JSON.")
+    args = parser.parse_args()
+
+    df_egressos, _ = load_and_preprocess_egressos_data(args.egressos)
+    tasks = [
+        (CLASSIFICATION_BACKENDS, classification_data(df_egressos), accuracy_score),
+        (REGRESSION_BACKENDS, regression_data(df_egressos), r2_score),
+    ]
+    registry = ModelRegistry(args.registry, MODEL_REGISTRY_MAX_BYTES)
+
+    results = []
+    for backends, (X, split), quality_fn in tasks:
+        for backend, config in backends.items():
+            if args.backend and backend not in args.backend:
+                continue
+            result = search_backend(backend, config['params'], X, split, quality_fn,
+                                    args.peso_latencia, args.peso_tamanho, args.n_jobs)
+            results.append(result)
+            print(f"\n{backend}: {result['candidatos']} candidatos em {result['rodadas']} rodadas "
+                  f"({result['tempo_busca_s']} s)")
+            print(f"  vencedor: {result['params']}")
+            print(pd.DataFrame(result['teste']).T.round(4).to_string())
+            if not args.dry_run:
+                registry.save_settings(tuned_params_key(backend), result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+
+
+if __name__ == '__main__':
+    main()
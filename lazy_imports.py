@@ -0,0 +1,60 @@
+import importlib
+import logging
+import os
+import threading
+import time
+import types
+
+from perf_timing import stage
+
+logger = logging.getLogger(__name__)
+
+# Importação sob demanda dos módulos pesados (sklearn, scipy, plotly): cada módulo só é carregado no
+# primeiro acesso a um atributo, e não na inicialização do processo. Com "0", lazy_import importa na hora.
+LAZY_IMPORTS_ENABLED = os.environ.get("DASHBOARD_LAZY_IMPORTS", "1") == "1"
+
+# Segundos gastos na primeira importação de cada módulo carregado sob demanda
+IMPORT_SECONDS = {}
+
+
+class LazyModule(types.ModuleType):
+    """
+    Substituto de um módulo que o importa no primeiro acesso a um atributo (ex.: px.bar).
+    A importação é medida como a etapa 'importacao:<módulo>' do rerun em que acontece.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._lazy_lock = threading.Lock()
+        self._lazy_module = None
+
+    def _load(self):
+        with self._lazy_lock:
+            if self._lazy_module is None:
+                start = time.perf_counter()
+                with stage(f"importacao:{self.__name__}"):
+                    module = importlib.import_module(self.__name__)
+                IMPORT_SECONDS[self.__name__] = time.perf_counter() - start
+                logger.debug("Módulo %s importado sob demanda em %.3f s", self.__name__, IMPORT_SECONDS[self.__name__])
+                self._lazy_module = module
+        return self._lazy_module
+
+    def __getattr__(self, attr):
+        # Só é chamado para atributos que o próprio substituto não tem
+        if attr.startswith('_lazy_'):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'carregado' if self._lazy_module is not None else 'não carregado'
+        return f"<módulo sob demanda {self.__name__!r} ({state})>"
+
+
+def lazy_import(name):
+    """Módulo 'name' carregado no primeiro uso (ou importado na hora, com DASHBOARD_LAZY_IMPORTS=0)."""
+    if not LAZY_IMPORTS_ENABLED:
+        return importlib.import_module(name)
+    return LazyModule(name)
@@ -0,0 +1,303 @@
+import contextvars
+import functools
+import gc
+import inspect
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Perfil de memória (tracemalloc): alocações por etapa do rerun (com DASHBOARD_PROFILING=1), pico do
+# rerun e maiores pontos de alocação sob demanda. O tracemalloc deixa o processo bem mais lento e
+# é global ao processo: com várias sessões ao mesmo tempo, as alocações de uma entram nas medidas da outra.
+PROFILING_ENABLED = os.environ.get("DASHBOARD_MEMORY_PROFILING", "0") == "1"
+# Quadros de pilha guardados por alocação (mais quadros = snapshots mais úteis e mais memória)
+TRACE_FRAMES = int(os.environ.get("DASHBOARD_MEMORY_TRACE_FRAMES", "1"))
+# Orçamento (MB) para os caches somados aos objetos retidos pelas sessões; 0 desliga.
+# Acima dele, as entradas de cache usadas há mais tempo são descartadas no fim do rerun.
+MEMORY_BUDGET_MB = float(os.environ.get("DASHBOARD_MEMORY_BUDGET_MB", "0"))
+# A contabilidade dos caches e das sessões é feita com o perfil ou com o orçamento ligados
+ACCOUNTING_ENABLED = PROFILING_ENABLED or MEMORY_BUDGET_MB > 0
+# Sessões sem rerun há mais tempo que isto (s) saem da contabilidade
+SESSION_TTL = 1800
+TOP_OBJECTS = 10
+
+if PROFILING_ENABLED and not tracemalloc.is_tracing():
+    tracemalloc.start(TRACE_FRAMES)
+
+
+def object_bytes(obj, _seen=None):
+    """
+    Estimativa do tamanho em memória de 'obj' (bytes): DataFrames e Series com memory_usage(deep=True),
+    arrays pelo buffer, contêineres somando os itens e demais objetos (ex.: modelos) pelo tamanho do pickle.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(object_bytes(k, seen) + object_bytes(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(object_bytes(item, seen) for item in obj)
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(obj)
+
+
+class MemoryLedger:
+    """
+    Contabilidade dos bytes atribuídos às entradas dos caches e às sessões, compartilhada pelo processo.
+    Cada entrada de cache guarda o tamanho do valor, o último acesso e os argumentos (args, kwargs) que a
+    identificam, como recebidos pela função (os parâmetros com '_' no início, que o Streamlit não usa na
+    chave, ficam como None), para que possa ser descartada individualmente com 'clear(*args, **kwargs)'.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._caches = {}    # (cache, função, argumentos) -> entrada
+        self._sessions = {}  # sessão -> {'atualizado': ts, 'retido': {nome: bytes}, 'rerun': {nome: bytes}}
+
+    def touch(self, cache, function, arguments, clear, size=None):
+        """Registra um acesso à entrada do cache; 'size' (bytes) é informado quando o valor foi calculado."""
+        key = (cache, function, repr(arguments))
+        with self._lock:
+            entry = self._caches.get(key)
+            if entry is None or size is not None:
+                entry = self._caches[key] = {'cache': cache, 'funcao': function, 'argumentos': arguments,
+                                             'bytes': size, 'acessos': 0, 'clear': clear}
+            entry['acessos'] += 1
+            entry['ultimo_acesso'] = time.time()
+            return entry['bytes'] is None
+
+    def set_size(self, cache, function, arguments, size):
+        key = (cache, function, repr(arguments))
+        with self._lock:
+            if key in self._caches:
+                self._caches[key]['bytes'] = size
+
+    def forget(self, cache, function, arguments):
+        """Retira a entrada da contabilidade (o valor foi descartado por quem o guardava)."""
+        with self._lock:
+            self._caches.pop((cache, function, repr(arguments)), None)
+
+    def track_session(self, session_id, retained, rerun):
+        """Atualiza os objetos retidos (session_state) e os temporários do último rerun da sessão."""
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = {'atualizado': now, 'retido': retained, 'rerun': rerun}
+            for stale in [s for s, info in self._sessions.items() if now - info['atualizado'] > SESSION_TTL]:
+                del self._sessions[stale]
+
+    def cache_entries(self):
+        with self._lock:
+            return [dict(entry) for entry in self._caches.values()]
+
+    def sessions(self):
+        with self._lock:
+            return {session_id: dict(info) for session_id, info in self._sessions.items()}
+
+    def total_bytes(self):
+        """(bytes dos caches, bytes retidos pelas sessões)."""
+        with self._lock:
+            caches = sum(entry['bytes'] or 0 for entry in self._caches.values())
+            sessions = sum(sum(info['retido'].values()) for info in self._sessions.values())
+        return caches, sessions
+
+    def evict(self, budget_bytes, protected_since):
+        """
+        Descarta as entradas de cache usadas há mais tempo até que caches + sessões caibam no orçamento.
+        Entradas acessadas a partir de 'protected_since' (o rerun atual) são mantidas.
+        Retorna a lista de entradas descartadas.
+        """
+        caches, sessions = self.total_bytes()
+        excess = caches + sessions - budget_bytes
+        if excess <= 0:
+            return []
+        with self._lock:
+            candidates = sorted(((key, entry) for key, entry in self._caches.items()
+                                 if entry['ultimo_acesso'] < protected_since and entry['bytes']),
+                                key=lambda item: item[1]['ultimo_acesso'])
+            evicted = []
+            for key, entry in candidates:
+                if excess <= 0:
+                    break
+                del self._caches[key]
+                evicted.append(entry)
+                excess -= entry['bytes']
+        for entry in evicted:
+            args, kwargs = entry['argumentos']
+            entry['clear'](*args, **kwargs)
+        if evicted:
+            gc.collect()
+        if excess > 0:
+            logger.warning("Orçamento de memória (%.0f MB) excedido em %.0f MB mesmo após descartar os caches "
+                           "fora de uso.", budget_bytes / 2 ** 20, excess / 2 ** 20)
+        return evicted
+
+
+LEDGER = MemoryLedger()
+
+# Tamanho do valor calculado na chamada atual da função cacheada (None enquanto não calculado)
+_computed_size = contextvars.ContextVar('memory_computed_size', default=None)
+
+
+def _key_arguments(signature, args, kwargs):
+    # Exatamente os argumentos recebidos: a chave do Streamlit não inclui os valores padrão omitidos, e
+    # clear() com eles (ou com um parâmetro passado pelo nome em vez da posição) não acharia a entrada
+    names = list(signature.parameters)
+    args = tuple(None if i < len(names) and names[i].startswith('_') else value for i, value in enumerate(args))
+    kwargs = {name: None if name.startswith('_') else value for name, value in kwargs.items()}
+    return args, kwargs
+
+
+def tracked(cache, cache_decorator):
+    """
+    Aplica o decorator de cache do Streamlit (st.cache_data/st.cache_resource) registrando no LEDGER
+    o tamanho de cada valor calculado e o último acesso a cada entrada. Com a contabilidade desligada,
+    equivale a aplicar 'cache_decorator' diretamente.
+    """
+    def decorator(func):
+        if not ACCOUNTING_ENABLED:
+            return cache_decorator(func)
+        signature = inspect.signature(func)
+        function = func.__qualname__
+
+        # functools.wraps mantém o código-fonte e a assinatura usados pelo Streamlit na chave do cache
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            result = func(*args, **kwargs)
+            slot = _computed_size.get()
+            if slot is not None:
+                slot.append(object_bytes(result))
+            return result
+
+        cached_func = cache_decorator(body)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            slot = []
+            token = _computed_size.set(slot)
+            try:
+                result = cached_func(*args, **kwargs)
+            finally:
+                _computed_size.reset(token)
+            arguments = _key_arguments(signature, args, kwargs)
+            unknown = LEDGER.touch(cache, function, arguments, cached_func.clear, slot[0] if slot else None)
+            if unknown:
+                # Entrada calculada antes de ser registrada (ex.: descartada do LEDGER, mas não do Streamlit)
+                LEDGER.set_size(cache, function, arguments, object_bytes(result))
+            return result
+        wrapper.clear = cached_func.clear
+        return wrapper
+    return decorator
+
+
+def track_value(cache, function, key, value, clear, stored=False):
+    """
+    Atribui ao LEDGER um valor guardado fora dos caches do Streamlit (ex.: os últimos modelos bons do
+    serviço de treinamento), identificado por 'key' e descartável pelo orçamento com 'clear(key)'.
+    'stored' indica um valor novo (o tamanho é recalculado); sem ele, registra só o acesso.
+    'value' None retira a entrada da contabilidade.
+    """
+    if not ACCOUNTING_ENABLED:
+        return
+    arguments = ((key,), {})
+    if value is None:
+        LEDGER.forget(cache, function, arguments)
+    elif LEDGER.touch(cache, function, arguments, clear, object_bytes(value) if stored else None):
+        LEDGER.set_size(cache, function, arguments, object_bytes(value))
+
+
+class MemoryRerun:
+    """Objetos temporários de um rerun da sessão e o pico de memória rastreada (tracemalloc) do rerun."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.objects = {}
+        self.traced_peak = None
+        self.finished = False
+
+
+def begin_rerun(session_id, previous=None, session_state=None):
+    """
+    Inicia a contabilidade do rerun (None com o perfil e o orçamento desligados).
+    'previous' é o rerun anterior da sessão: se ele foi interrompido (st.stop) antes de end_rerun,
+    é encerrado agora com 'session_state', aplicando o orçamento de memória que ficou pendente.
+    """
+    if not ACCOUNTING_ENABLED:
+        return None
+    if previous is not None and not previous.finished and session_state is not None:
+        end_rerun(previous, session_state)
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    return MemoryRerun(session_id)
+
+
+def track(rerun, name, obj):
+    """Atribui 'obj' (ex.: uma cópia filtrada dos dados) ao rerun da sessão."""
+    if rerun is not None:
+        rerun.objects[name] = object_bytes(obj)
+
+
+def end_rerun(rerun, session_state):
+    """
+    Registra os objetos retidos pela sessão (valores do session_state) e os temporários do rerun
+    e, com o orçamento ligado, descarta entradas de cache até que a memória contabilizada caiba nele.
+    """
+    if rerun is None or rerun.finished:
+        return []
+    rerun.finished = True
+    retained = {str(name): object_bytes(session_state[name]) for name in list(session_state.keys())}
+    LEDGER.track_session(rerun.session_id, retained, rerun.objects)
+    if tracemalloc.is_tracing():
+        rerun.traced_peak = tracemalloc.get_traced_memory()[1]
+    if MEMORY_BUDGET_MB <= 0:
+        return []
+    evicted = LEDGER.evict(MEMORY_BUDGET_MB * 2 ** 20, protected_since=rerun.started_at)
+    for entry in evicted:
+        logger.info("Cache '%s' descartado pelo orçamento de memória: %s(%s), %.1f MB", entry['cache'],
+                    entry['funcao'], entry['argumentos'], entry['bytes'] / 2 ** 20)
+    return evicted
+
+
+def largest_objects(top=TOP_OBJECTS):
+    """Maiores objetos contabilizados (entradas de cache, retidos e temporários das sessões), em MB."""
+    rows = [{'origem': f"cache:{entry['cache']}", 'objeto': entry['funcao'],
+             'mb': (entry['bytes'] or 0) / 2 ** 20, 'ultimo_acesso': entry['ultimo_acesso']}
+            for entry in LEDGER.cache_entries()]
+    for session_id, info in LEDGER.sessions().items():
+        for kind in ('retido', 'rerun'):
+            rows.extend({'origem': f"sessao:{session_id}:{kind}", 'objeto': name, 'mb': size / 2 ** 20,
+                         'ultimo_acesso': info['atualizado']} for name, size in info[kind].items())
+    return sorted(rows, key=lambda row: row['mb'], reverse=True)[:top]
+
+
+def top_allocations(top=TOP_OBJECTS):
+    """Pontos do código com mais memória alocada e ainda viva, segundo um snapshot do tracemalloc."""
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ])
+    return [{'local': str(stat.traceback), 'mb': stat.size / 2 ** 20, 'blocos': stat.count}
+            for stat in snapshot.statistics('lineno')[:top]]
@@ -0,0 +1,322 @@
+import contextvars
+import functools
+import http.server
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Métricas no formato de texto do Prometheus (latência dos reruns por aba, acertos e faltas dos caches,
+# duração dos treinos, linhas filtradas e memória residente do processo).
+# Desligadas por padrão: nesse caso os registros são ignorados e 'cached' devolve a função com o cache puro.
+METRICS_ENABLED = os.environ.get("DASHBOARD_METRICS", "0") == "1"
+# Arquivo para o coletor textfile do node_exporter (regravado a cada intervalo); vazio desliga
+METRICS_TEXTFILE = os.environ.get("DASHBOARD_METRICS_TEXTFILE", "")
+METRICS_TEXTFILE_INTERVAL = float(os.environ.get("DASHBOARD_METRICS_TEXTFILE_INTERVAL", "15"))
+# Endpoint HTTP '/metrics' para scraping; 0 desliga. Por padrão só escuta na interface de loopback
+METRICS_PORT = int(os.environ.get("DASHBOARD_METRICS_PORT", "0"))
+METRICS_HOST = os.environ.get("DASHBOARD_METRICS_HOST", "127.0.0.1")
+
+# Limites dos buckets dos histogramas
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TRAINING_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+ROWS_BUCKETS = (0, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Série de valores indexada pelos rótulos (tupla de pares nome/valor), protegida por lock."""
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Gauge com valor atribuído ou calculado no momento da exportação ('callback')."""
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        super().__init__(name, help_text, labelnames)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        if self.callback is not None:
+            value = self.callback()
+            if value is None:
+                return []
+            self.set(value)
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=SECONDS_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def _render_series(self, key, value):
+        counts, total = value
+        lines = [f"{self.name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {count}"
+                 for bound, count in zip(self.buckets, counts)]
+        lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(key)} {counts[-1]}")
+        return lines
+
+
+def resident_memory_bytes():
+    """Memória residente (RSS) atual do processo, lida de /proc (None fora do Linux)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+RERUN_SECONDS = Histogram('dashboard_rerun_duration_seconds',
+                          "Duração dos reruns do script, completos ou interrompidos (st.stop).", ['status'])
+TAB_SECONDS = Histogram('dashboard_tab_duration_seconds', "Tempo de execução de cada aba em um rerun.", ['tab'])
+CACHE_REQUESTS = Counter('dashboard_cache_requests_total', "Consultas aos caches por resultado (hit ou miss).",
+                         ['cache', 'result'])
+TRAINING_SECONDS = Histogram('dashboard_model_training_seconds', "Duração dos treinos de modelos.",
+                             ['task', 'backend', 'mode'], buckets=TRAINING_BUCKETS)
+FILTERED_ROWS = Histogram('dashboard_filtered_rows', "Linhas restantes após os filtros da barra lateral.",
+                          ['dataset'], buckets=ROWS_BUCKETS)
+RESIDENT_MEMORY = Gauge('process_resident_memory_bytes', "Memória residente do processo em bytes.",
+                        callback=resident_memory_bytes)
+ALL_METRICS = [RERUN_SECONDS, TAB_SECONDS, CACHE_REQUESTS, TRAINING_SECONDS, FILTERED_ROWS, RESIDENT_MEMORY]
+
+
+def render():
+    """Todas as métricas no formato de texto de exposição do Prometheus."""
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path=None):
+    """Grava as métricas no arquivo de forma atômica (o coletor nunca lê um arquivo pela metade)."""
+    path = path or METRICS_TEXTFILE
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def start_exporters():
+    """Inicia, uma única vez por processo, o endpoint HTTP e a gravação periódica do arquivo configurados."""
+    if METRICS_PORT:
+        try:
+            server = http.server.ThreadingHTTPServer((METRICS_HOST, METRICS_PORT), _MetricsHandler)
+        except OSError as e:
+            logger.warning("Endpoint de métricas não iniciado em %s:%d: %s", METRICS_HOST, METRICS_PORT, e)
+        else:
+            threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+
+    if METRICS_TEXTFILE:
+        def write_periodically():
+            while True:
+                try:
+                    write_textfile()
+                except OSError as e:
+                    logger.warning("Falha ao gravar as métricas em %s: %s", METRICS_TEXTFILE, e)
+                time.sleep(METRICS_TEXTFILE_INTERVAL)
+        threading.Thread(target=write_periodically, name='metrics-textfile', daemon=True).start()
+
+
+# Início do rerun em andamento ([perf_counter, encerrado?])
+_current_rerun = contextvars.ContextVar('metrics_rerun', default=None)
+
+
+def begin_rerun():
+    """Marca o início de um rerun (None com as métricas desligadas) e inicia os exportadores na primeira vez."""
+    if not METRICS_ENABLED:
+        return None
+    start_exporters()
+    rerun = [time.perf_counter(), False]
+    _current_rerun.set(rerun)
+    return rerun
+
+
+def end_rerun(rerun, status='completo'):
+    """Registra a duração do rerun, uma única vez."""
+    if rerun is None or rerun[1]:
+        return
+    rerun[1] = True
+    RERUN_SECONDS.observe(time.perf_counter() - rerun[0], status=status)
+
+
+class _Timer:
+    def __init__(self, histogram, labels, on_error=None):
+        self.histogram = histogram
+        self.labels = labels
+        self.on_error = on_error
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self._start, **self.labels)
+        if exc_type is not None and self.on_error is not None:
+            self.on_error()
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def observe_tab(tab):
+    """
+    Context manager que mede a execução de uma aba. Se a aba for interrompida (st.stop levanta
+    uma exceção que atravessa o bloco), o rerun é registrado como 'interrompido' nesse ponto.
+    """
+    if not METRICS_ENABLED:
+        return _NULL_TIMER
+    return _Timer(TAB_SECONDS, {'tab': tab},
+                  on_error=lambda: end_rerun(_current_rerun.get(), status='interrompido'))
+
+
+def observe_training(task, backend, mode):
+    """Context manager que mede um treino ('mode': full, incremental...)."""
+    if not METRICS_ENABLED:
+        return _NULL_TIMER
+    return _Timer(TRAINING_SECONDS, {'task': task, 'backend': backend, 'mode': mode})
+
+
+def record_cache(cache, hit):
+    """Conta uma consulta ao cache 'cache'."""
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def record_filtered_rows(dataset, rows):
+    """Registra o número de linhas de 'dataset' após os filtros."""
+    if METRICS_ENABLED:
+        FILTERED_ROWS.observe(rows, dataset=dataset)
+
+
+# Marca, no contexto da chamada, se o corpo da função cacheada chegou a ser executado
+_cache_miss = contextvars.ContextVar('metrics_cache_miss', default=None)
+
+
+def cached(cache, cache_decorator):
+    """
+    Aplica o decorator de cache do Streamlit (st.cache_data/st.cache_resource) contando acertos e faltas:
+    uma chamada é falta quando o corpo da função é executado. Com as métricas desligadas,
+    equivale a aplicar 'cache_decorator' diretamente.
+    """
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return cache_decorator(func)
+
+        # functools.wraps mantém o nome, o código-fonte (inspect.unwrap) e a assinatura usados
+        # pelo Streamlit para montar a chave do cache
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            flag = _cache_miss.get()
+            if flag is not None:
+                flag[0] = True
+            return func(*args, **kwargs)
+
+        cached_func = cache_decorator(body)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            flag = [False]
+            token = _cache_miss.set(flag)
+            try:
+                return cached_func(*args, **kwargs)
+            finally:
+                _cache_miss.reset(token)
+                record_cache(cache, hit=not flag[0])
+        wrapper.clear = getattr(cached_func, 'clear', None)
+        return wrapper
+    return decorator
@@ -0,0 +1,137 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from lazy_imports import lazy_import
+from ml_pipeline import encode_for_model, train_classifier, train_regression_bundle
+
+# joblib e sklearn só são carregados na primeira validação cruzada (ver lazy_imports)
+joblib = lazy_import('joblib')
+metrics = lazy_import('sklearn.metrics')
+model_selection = lazy_import('sklearn.model_selection')
+
+# Número padrão de dobras da validação cruzada
+CV_FOLDS = 5
+
+
+def _fold_params(params):
+    """
+    Hiperparâmetros usados dentro de uma dobra: as dobras já rodam em paralelo,
+    então modelos que paralelizam internamente (n_jobs) passam a usar um único núcleo.
+    """
+    return {**params, 'n_jobs': 1} if 'n_jobs' in params else params
+
+
+def _classification_fold(fold, backend, params, X_codes, y, cardinalities, labels, train_idx, test_idx):
+    start = time.perf_counter()
+    model = train_classifier(backend, _fold_params(params), X_codes.iloc[train_idx], y[train_idx], cardinalities)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_codes.iloc[test_idx])
+    predict_seconds = time.perf_counter() - start
+
+    return {
+        'fold': fold,
+        'n_train': len(train_idx),
+        'n_test': len(test_idx),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds,
+        'metrics': {
+            'accuracy': metrics.accuracy_score(y[test_idx], y_pred),
+            'f1_macro': metrics.f1_score(y[test_idx], y_pred, average='macro'),
+        },
+        'confusion_matrix': metrics.confusion_matrix(y[test_idx], y_pred, labels=labels).tolist(),
+    }
+
+
+def _regression_fold(fold, backend, params, X, y, train_idx, test_idx):
+    start = time.perf_counter()
+    bundle = train_regression_bundle(backend, _fold_params(params), X.iloc[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = bundle['model'].predict(encode_for_model(bundle, X.iloc[test_idx]))
+    predict_seconds = time.perf_counter() - start
+
+    mse = metrics.mean_squared_error(y[test_idx], y_pred)
+    return {
+        'fold': fold,
+        'n_train': len(train_idx),
+        'n_test': len(test_idx),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds,
+        'metrics': {
+            'mse': mse,
+            'rmse': float(np.sqrt(mse)),
+            'mae': metrics.mean_absolute_error(y[test_idx], y_pred),
+            'r2': metrics.r2_score(y[test_idx], y_pred),
+        },
+    }
+
+
+def cross_validate_classifier(backend, params, X_codes, y, cardinalities, n_splits=CV_FOLDS, n_jobs=-1,
+                              random_state=42):
+    """
+    Validação cruzada estratificada em 'n_splits' dobras, treinadas em paralelo ('n_jobs' processos).
+    Retorna o relatório com métricas, matriz de confusão e tempos de cada dobra.
+    """
+    y = np.asarray(y)
+    labels = np.unique(y)
+    splitter = model_selection.StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+
+    start = time.perf_counter()
+    folds = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(_classification_fold)(fold, backend, params, X_codes, y, cardinalities, labels, train_idx, test_idx)
+        for fold, (train_idx, test_idx) in enumerate(splitter.split(X_codes, y), start=1)
+    )
+    return {
+        'task': 'classification',
+        'backend': backend,
+        'n_splits': n_splits,
+        'labels': labels.tolist(),
+        'folds': folds,
+        'wall_seconds': time.perf_counter() - start,
+    }
+
+
+def cross_validate_regressor(backend, params, X, y, n_splits=CV_FOLDS, n_jobs=-1, random_state=42):
+    """
+    Validação cruzada em 'n_splits' dobras, treinadas em paralelo ('n_jobs' processos).
+    O encoder é ajustado dentro de cada dobra, apenas com os dados de treino dela.
+    """
+    y = np.asarray(y)
+    splitter = model_selection.KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+
+    start = time.perf_counter()
+    folds = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(_regression_fold)(fold, backend, params, X, y, train_idx, test_idx)
+        for fold, (train_idx, test_idx) in enumerate(splitter.split(X), start=1)
+    )
+    return {
+        'task': 'regression',
+        'backend': backend,
+        'n_splits': n_splits,
+        'folds': folds,
+        'wall_seconds': time.perf_counter() - start,
+    }
+
+
+def folds_table(report):
+    """Tabela com uma linha por dobra (tamanhos, tempos e métricas), seguida da média e do desvio padrão."""
+    table = pd.DataFrame([
+        {'dobra': str(fold['fold']), 'n_treino': fold['n_train'], 'n_teste': fold['n_test'],
+         'treino (s)': fold['fit_seconds'], 'predição (s)': fold['predict_seconds'], **fold['metrics']}
+        for fold in report['folds']
+    ])
+    numeric = table.drop(columns='dobra')
+    summary = pd.DataFrame([numeric.mean(), numeric.std()])
+    summary.insert(0, 'dobra', ['média', 'desvio padrão'])
+    return pd.concat([table, summary], ignore_index=True)
+
+
+def total_confusion_matrix(report):
+    """Soma das matrizes de confusão das dobras (cada exemplo aparece em exatamente um conjunto de teste)."""
+    matrix = np.sum([fold['confusion_matrix'] for fold in report['folds']], axis=0)
+    return pd.DataFrame(matrix, index=report['labels'], columns=report['labels'])
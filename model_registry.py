@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import time
+
+import joblib
+
+
+def fingerprint(*parts):
+    """Hash estável de valores serializáveis em JSON (listas, tuplas, dicionários, textos e números)."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def list_source_files(folder, extension='.csv'):
+    """Lista [nome, tamanho, data de modificação] dos arquivos de dados da pasta (None se ela não existir)."""
+    if not os.path.exists(folder):
+        return None
+    files = []
+    for file_name in sorted(os.listdir(folder)):
+        if file_name.endswith(extension):
+            stat = os.stat(os.path.join(folder, file_name))
+            files.append([file_name, stat.st_size, stat.st_mtime_ns])
+    return files
+
+
+def fingerprint_source_files(folder, extension='.csv'):
+    """
+    Fingerprint barato de uma pasta de dados: nome, tamanho e data de modificação de cada arquivo.
+    Muda sempre que um arquivo é adicionado, removido ou reescrito, sem ler o conteúdo.
+    """
+    return fingerprint(folder, list_source_files(folder, extension))
+
+
+class ModelRegistry:
+    """
+    Registro em disco de modelos treinados.
+    Cada entrada é um pacote (modelo, encoders, colunas de features e metadados) salvo com joblib,
+    identificado por uma chave derivada de (tipo de modelo, hiperparâmetros, fingerprint dos dados, limiar).
+    Quando o tamanho total ultrapassa 'max_bytes', as entradas usadas há mais tempo são removidas (LRU).
+    Metadados opcionais de cada entrada ficam em um arquivo JSON ao lado do pacote, para que
+    entradas possam ser procuradas (find) sem carregar os modelos. Configurações pequenas que não podem
+    ser perdidas (ex.: hiperparâmetros da busca offline) ficam em arquivos '.settings.json', fora da evicção.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def make_key(model_type, params, data_fingerprint, threshold=None):
+        """Chave determinística de uma configuração de treino."""
+        payload = json.dumps(
+            {'model_type': model_type, 'params': params, 'data': data_fingerprint, 'threshold': threshold},
+            sort_keys=True, default=str
+        )
+        return f"{model_type}-{hashlib.sha256(payload.encode()).hexdigest()[:24]}"
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.joblib")
+
+    def _metadata_path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def _settings_path(self, name):
+        return os.path.join(self.root, f"{name}.settings.json")
+
+    def load(self, key):
+        """Carrega o pacote salvo para 'key', ou retorna None se não existir (ou estiver corrompido)."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            bundle = joblib.load(path)
+        except FileNotFoundError:
+            # Removida pela evicção de outro processo entre a verificação e a leitura
+            return None
+        except Exception:
+            # Entrada corrompida (ex.: processo interrompido durante a escrita): descarta e treina de novo
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        # Atualiza o horário de acesso usado pela política LRU; se a entrada acabou de ser removida por
+        # outro processo, trata como ausente (o próximo acesso treina ou lê de novo)
+        try:
+            os.utime(path, None)
+        except OSError:
+            return None
+        return bundle
+
+    def save(self, key, bundle, metadata=None):
+        """Salva o pacote (e os metadados, se houver) de forma atômica e aplica a política de evicção."""
+        bundle = dict(bundle)
+        bundle.setdefault('saved_at', time.time())
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(bundle, tmp_path)
+        os.replace(tmp_path, path)
+        if metadata is not None:
+            metadata_path = self._metadata_path(key)
+            tmp_path = f"{metadata_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, default=str)
+            os.replace(tmp_path, metadata_path)
+        self.evict(keep=key)
+
+    def load_settings(self, name):
+        """Configuração salva com save_settings, ou None se não existir (ou estiver corrompida)."""
+        try:
+            with open(self._settings_path(name), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_settings(self, name, value):
+        """Salva uma configuração serializável em JSON de forma atômica; ela não entra na evicção."""
+        path = self._settings_path(name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f, default=str)
+        os.replace(tmp_path, path)
+
+    def find(self, **criteria):
+        """
+        Entradas cujos metadados têm todos os valores de 'criteria', da mais recente para a mais antiga.
+        Retorna uma lista de (chave, metadados) lendo apenas os arquivos JSON.
+        """
+        matches = []
+        for file_name in os.listdir(self.root):
+            if not file_name.endswith('.json') or file_name.endswith('.settings.json'):
+                continue
+            key = file_name[:-len('.json')]
+            metadata_path = self._metadata_path(key)
+            try:
+                with open(metadata_path, encoding='utf-8') as f:
+                    metadata = json.load(f)
+                saved_at = os.stat(self._path(key)).st_mtime
+            except (OSError, ValueError):
+                # Pacote removido pela evicção ou metadados incompletos
+                continue
+            if all(metadata.get(name) == value for name, value in criteria.items()):
+                matches.append((saved_at, key, metadata))
+        return [(key, metadata) for _, key, metadata in sorted(matches, key=lambda match: match[0], reverse=True)]
+
+    def entries(self):
+        """Lista (caminho, tamanho em bytes, último acesso) das entradas, da mais antiga para a mais recente."""
+        entries = []
+        for file_name in os.listdir(self.root):
+            if not file_name.endswith('.joblib'):
+                continue
+            path = os.path.join(self.root, file_name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self, keep=None):
+        """Remove as entradas usadas há mais tempo até o registro caber em 'max_bytes'."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        keep_path = self._path(keep) if keep else None
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep_path:
+                continue
+            for stale_path in (path, f"{path[:-len('.joblib')]}.json"):
+                try:
+                    os.remove(stale_path)
+                except FileNotFoundError:
+                    pass
+            total -= size
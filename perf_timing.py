@@ -0,0 +1,196 @@
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import tracemalloc
+
+# Instrumentação por etapa (tempo de parede, tempo de CPU e linhas processadas em cada rerun).
+# Desligada por padrão: nesse caso 'timed' devolve a própria função e 'stage' um contexto vazio.
+PROFILING_ENABLED = os.environ.get("DASHBOARD_PROFILING", "0") == "1"
+# Log JSON-lines com um registro por rerun, rotacionado por tamanho
+PROFILING_LOG = os.environ.get("DASHBOARD_PROFILING_LOG", os.path.join("logs", "perf.jsonl"))
+PROFILING_LOG_MAX_BYTES = int(os.environ.get("DASHBOARD_PROFILING_LOG_MAX_BYTES", str(5_000_000)))
+PROFILING_LOG_BACKUPS = int(os.environ.get("DASHBOARD_PROFILING_LOG_BACKUPS", "5"))
+
+# Perfil do rerun em andamento (cada sessão executa o script na sua própria thread)
+_current_profile = contextvars.ContextVar('rerun_profile', default=None)
+
+
+class RerunProfile:
+    """Etapas medidas durante um rerun do script."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.stages = []
+        self.finished = False
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self._last_stage_end = self._wall_start
+        self._lock = threading.Lock()
+
+    def add(self, name, wall_seconds, cpu_seconds, rows, memory_bytes=None):
+        entry = {
+            'etapa': name,
+            'inicio_s': round(time.perf_counter() - wall_seconds - self._wall_start, 4),
+            'parede_s': round(wall_seconds, 4),
+            'cpu_s': round(cpu_seconds, 4),
+            'linhas': rows,
+        }
+        # Memória alocada e ainda viva no fim da etapa (apenas com o tracemalloc ligado, ver memory_profiling)
+        if memory_bytes is not None:
+            entry['memoria_mb'] = round(memory_bytes / 2 ** 20, 3)
+        with self._lock:
+            self.stages.append(entry)
+            self._last_stage_end = max(self._last_stage_end, time.perf_counter())
+
+    def finish(self, interrupted=False):
+        """
+        Encerra o perfil. Um rerun interrompido (st.stop, exceção) é encerrado no rerun seguinte,
+        com o tempo total contado até o fim da última etapa medida.
+        """
+        end = self._last_stage_end if interrupted else time.perf_counter()
+        self.wall_seconds = end - self._wall_start
+        # O tempo de CPU da thread do script só é conhecido quando o rerun termina normalmente
+        self.cpu_seconds = None if interrupted else time.thread_time() - self._cpu_start
+        self.finished = True
+        return {
+            'ts': self.started_at,
+            'sessao': self.session_id,
+            'interrompido': interrupted,
+            'parede_s': round(self.wall_seconds, 4),
+            'cpu_s': None if self.cpu_seconds is None else round(self.cpu_seconds, 4),
+            'etapas': self.stages,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def _perf_logger():
+    """Logger dedicado que grava uma linha JSON por rerun no arquivo rotacionado."""
+    log_dir = os.path.dirname(PROFILING_LOG)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        PROFILING_LOG, maxBytes=PROFILING_LOG_MAX_BYTES, backupCount=PROFILING_LOG_BACKUPS, encoding='utf-8'
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger = logging.getLogger('dashboard.perf')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def begin_rerun(session_id, previous=None):
+    """
+    Inicia o perfil do rerun atual (None com a instrumentação desligada).
+    'previous' é o perfil do rerun anterior da sessão: se ele não foi encerrado, é gravado agora.
+    """
+    if not PROFILING_ENABLED:
+        return None
+    if previous is not None and not previous.finished:
+        end_rerun(previous, interrupted=True)
+    profile = RerunProfile(session_id)
+    _current_profile.set(profile)
+    return profile
+
+
+def end_rerun(profile, interrupted=False):
+    """Encerra o perfil e o grava no log JSON-lines."""
+    if profile is None or profile.finished:
+        return
+    _perf_logger().info(json.dumps(profile.finish(interrupted), ensure_ascii=False))
+
+
+class _Stage:
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self._profile = _current_profile.get()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self._memory_start = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._profile is not None:
+            memory = None
+            if self._memory_start is not None and tracemalloc.is_tracing():
+                memory = tracemalloc.get_traced_memory()[0] - self._memory_start
+            self._profile.add(self.name, time.perf_counter() - self._wall_start,
+                              time.thread_time() - self._cpu_start, self.rows, memory)
+        return False
+
+
+class _NullStage:
+    """Contexto vazio usado com a instrumentação desligada (atribuições a 'rows' são ignoradas)."""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, rows=None):
+    """
+    Context manager que mede uma etapa do rerun atual. As linhas processadas podem ser
+    informadas na criação ou atribuídas depois em 'rows' (ex.: with stage('x') as s: ...; s.rows = len(df)).
+    """
+    return _Stage(name, rows) if PROFILING_ENABLED else _NULL_STAGE
+
+
+def timed(name, rows=None, rows_arg=None):
+    """
+    Decorator que mede cada chamada da função como uma etapa. As linhas processadas vêm de
+    'rows(resultado)' ou do tamanho do argumento posicional de índice 'rows_arg'.
+    Com a instrumentação desligada, devolve a própria função (sem custo por chamada).
+    """
+    def decorator(func):
+        if not PROFILING_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Stage(name) as measured:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    measured.rows = rows(result)
+                elif rows_arg is not None and rows_arg < len(args):
+                    measured.rows = len(args[rows_arg])
+            return result
+        return wrapper
+    return decorator
+
+
+def summarize_stages(profile):
+    """
+    Etapas agregadas por nome: chamadas, tempo de parede e de CPU somados, linhas processadas
+    e, com o tracemalloc ligado, a memória alocada e retida.
+    """
+    summary = {}
+    for entry in profile.stages:
+        item = summary.setdefault(entry['etapa'], {'etapa': entry['etapa'], 'chamadas': 0, 'parede_s': 0.0,
+                                                   'cpu_s': 0.0, 'linhas': 0})
+        item['chamadas'] += 1
+        item['parede_s'] += entry['parede_s']
+        item['cpu_s'] += entry['cpu_s']
+        item['linhas'] += entry['linhas'] or 0
+        if 'memoria_mb' in entry:
+            item['memoria_mb'] = item.get('memoria_mb', 0.0) + entry['memoria_mb']
+    return sorted(summary.values(), key=lambda item: item['parede_s'], reverse=True)
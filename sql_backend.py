@@ -0,0 +1,192 @@
+"""
+Backend SQL opcional (DuckDB sobre Parquet) para os filtros globais e as agregações dos gráficos.
+
+Com DASHBOARD_DATA_BACKEND=duckdb, os DataFrames já padronizados pelo carregamento (analytics.load_dataset)
+são gravados uma vez em Parquet, ordenados por ano, nível de ensino e unidade, em grupos de linhas pequenos.
+Os filtros da sidebar e as contagens dos gráficos passam a ser consultas SQL sobre esses arquivos: o DuckDB
+descarta os grupos de linhas fora do intervalo de anos ou das listas de dimensões (estatísticas min/max do
+Parquet), executa em várias threads e devolve tabelas Arrow pequenas, convertidas para pandas no fim.
+
+Os resultados são os mesmos do caminho em pandas (analytics.filter_rows, figures.count_rows e
+figures.build_count_cube): mesmas linhas, ordem, índice e tipos das colunas. Requer o pacote opcional
+duckdb (pip install duckdb); sem ele, o dashboard avisa e continua com o pandas.
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from figures import COMPARATIVO_DIMENSOES, build_count_cube
+from lazy_imports import lazy_import
+from perf_timing import timed
+
+logger = logging.getLogger(__name__)
+
+duckdb = lazy_import('duckdb')
+pa = lazy_import('pyarrow')
+pq = lazy_import('pyarrow.parquet')
+
+# 'pandas' (padrão) ou 'duckdb'
+DATA_BACKEND = os.environ.get("DASHBOARD_DATA_BACKEND", "pandas")
+SQL_BACKEND_ENABLED = DATA_BACKEND == "duckdb"
+# Pasta dos arquivos Parquet (um por conjunto de dados e conteúdo; arquivos antigos podem ser apagados)
+PARQUET_FOLDER = os.environ.get("DASHBOARD_PARQUET_FOLDER", "parquet")
+# Threads do DuckDB; 0 usa todas as CPUs
+SQL_THREADS = int(os.environ.get("DASHBOARD_SQL_THREADS", "0"))
+# Grupos de linhas menores permitem descartar mais linhas pelos filtros, com mais metadados por arquivo
+ROW_GROUP_SIZE = 16_384
+# Ordem das linhas no Parquet: agrupa os valores das colunas mais filtradas em poucos grupos de linhas
+SORT_COLUMNS = ['ano', 'nivel_ensino', 'nome_unidade']
+# Posição original de cada linha, usada para devolver os resultados na ordem (e com o índice) do pandas
+ROW_COLUMN = '_linha'
+# Filtros de lista: chave do estado dos filtros -> coluna
+LIST_FILTERS = {'unidades': 'nome_unidade', 'cursos': 'nome_curso', 'sexos': 'sexo'}
+
+
+def available():
+    """Indica se o pacote opcional duckdb está instalado."""
+    return importlib.util.find_spec('duckdb') is not None
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def content_fingerprint(df):
+    """Hash do conteúdo, das colunas e do índice de 'df' (identifica o arquivo Parquet correspondente)."""
+    digest = hashlib.sha256()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def write_snapshot(df, path):
+    """Grava 'df' em Parquet, ordenado por SORT_COLUMNS, com a posição original de cada linha em ROW_COLUMN."""
+    sort_columns = [col for col in SORT_COLUMNS if col in df.columns]
+    snapshot = df.reset_index(drop=True).assign(**{ROW_COLUMN: np.arange(len(df), dtype='int64')})
+    if sort_columns:
+        snapshot = snapshot.sort_values(sort_columns + [ROW_COLUMN], kind='stable')
+    table = pa.Table.from_pandas(snapshot, preserve_index=False)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+class DuckDBBackend:
+    """
+    Filtros e contagens em SQL sobre os arquivos Parquet dos DataFrames informados ({nome: DataFrame},
+    ex.: {'ingressantes': ..., 'egressos': ...}); cada nome vira uma view. Os arquivos já gravados para
+    o mesmo conteúdo são reaproveitados. Seguro para uso por várias threads (um cursor por consulta).
+    """
+
+    def __init__(self, frames, parquet_folder=PARQUET_FOLDER, threads=SQL_THREADS):
+        if not available():
+            raise ImportError("O backend 'duckdb' requer o pacote duckdb (pip install duckdb).")
+        os.makedirs(parquet_folder, exist_ok=True)
+        self._connection = duckdb.connect(':memory:')
+        if threads > 0:
+            self._connection.execute(f"SET threads = {int(threads)}")
+        self._columns, self._dtypes, self._index = {}, {}, {}
+        for name, df in frames.items():
+            path = os.path.join(parquet_folder, f"{name}-{content_fingerprint(df)[:16]}.parquet")
+            if not os.path.exists(path):
+                logger.info("Gravando %d linhas de '%s' em %s", len(df), name, path)
+                write_snapshot(df, path)
+            literal = "'" + os.path.abspath(path).replace("'", "''") + "'"
+            self._connection.execute(f"CREATE VIEW {_quote(name)} AS SELECT * FROM read_parquet({literal})")
+            self._columns[name] = list(df.columns)
+            self._dtypes[name] = df.dtypes
+            self._index[name] = df.index
+
+    def _where(self, name, filter_state):
+        """
+        Cláusula WHERE e parâmetros equivalentes a analytics.filter_rows, ou None quando o resultado é
+        vazio sem colunas (sem níveis de ensino selecionados, como na sidebar).
+        """
+        columns = self._columns[name]
+        niveis_ensino = filter_state.get('niveis_ensino')
+        if niveis_ensino is not None and (not niveis_ensino or 'nivel_ensino' not in columns):
+            return None
+        conditions, params = [], []
+
+        def add_in(column, values):
+            conditions.append(f"{_quote(column)} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+
+        if niveis_ensino is not None:
+            add_in('nivel_ensino', list(niveis_ensino))
+        if 'ano' in columns:
+            conditions.append('"ano" BETWEEN ? AND ?')
+            params.extend(int(year) for year in filter_state['anos'])
+        for key, column in LIST_FILTERS.items():
+            if filter_state.get(key) and column in columns:
+                add_in(column, list(filter_state[key]))
+        return ('WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+    def _query(self, sql, params):
+        """Executa a consulta em um cursor próprio e retorna o resultado como tabela Arrow."""
+        return self._connection.cursor().execute(sql, params).fetch_arrow_table()
+
+    @timed('sql_filtros')
+    def filter_rows(self, name, filter_state):
+        """Linhas de 'name' que passam pelos filtros globais (ver analytics.filter_rows)."""
+        where = self._where(name, filter_state)
+        if where is None:
+            return pd.DataFrame()
+        clause, params = where
+        columns = self._columns[name]
+        select = ', '.join(_quote(col) for col in columns + [ROW_COLUMN])
+        table = self._query(f"SELECT {select} FROM {_quote(name)} {clause} ORDER BY {ROW_COLUMN}", params)
+        result = table.to_pandas()
+        # Índice original das linhas mantidas; o filtro em pandas preserva o índice inteiro quando nada é descartado
+        positions = result.pop(ROW_COLUMN).to_numpy()
+        index = self._index[name]
+        result.index = index if len(positions) == len(index) else index.take(positions)
+        for col, dtype in self._dtypes[name].items():
+            if dtype == object:
+                # Arrow devolve None nos textos ausentes; o pandas lê os CSVs com NaN
+                result[col] = result[col].where(result[col].notna(), np.nan)
+        return result.astype(self._dtypes[name].to_dict())
+
+    @timed('sql_contagens')
+    def count_rows(self, name, filter_state, dims):
+        """Contagem das linhas filtradas de 'name' por combinação de 'dims' (ver figures.count_rows)."""
+        where = self._where(name, filter_state)
+        if where is None:
+            return pd.DataFrame(columns=list(dims) + ['count'])
+        clause, params = where
+        not_null = ' AND '.join(f"{_quote(dim)} IS NOT NULL" for dim in dims)
+        clause = f"{clause} AND {not_null}" if clause else f"WHERE {not_null}"
+        keys = ', '.join(_quote(dim) for dim in dims)
+        table = self._query(f"SELECT {keys}, count(*) AS count FROM {_quote(name)} {clause} "
+                            f"GROUP BY {keys} ORDER BY {keys}", params)
+        return table.to_pandas().astype({dim: self._dtypes[name][dim] for dim in dims})
+
+    @timed('sql_cubo')
+    def count_cube(self, frames, filter_state, dims=COMPARATIVO_DIMENSOES):
+        """
+        Cubo de contagens por ('Tipo de Aluno', *dims) das linhas filtradas de cada conjunto, com
+        'frames' = {tipo: nome do conjunto} (ver figures.build_count_cube).
+        """
+        wheres = {tipo: self._where(name, filter_state) for tipo, name in frames.items()}
+        if any(where is None for where in wheres.values()):
+            return build_count_cube({tipo: pd.DataFrame() for tipo in frames}, dims)
+        dims = [dim for dim in dims if all(dim in self._columns[name] for name in frames.values())]
+        keys = ', '.join(_quote(dim) for dim in dims)
+        parts, params = [], []
+        for order, (tipo, name) in enumerate(frames.items()):
+            clause, where_params = wheres[tipo]
+            parts.append(f"SELECT {order} AS ordem{', ' + keys if keys else ''} FROM {_quote(name)} {clause}")
+            params.extend(where_params)
+        group = f"ordem, {keys}" if keys else "ordem"
+        not_null = ''.join(f" AND {_quote(dim)} IS NOT NULL" for dim in dims)
+        table = self._query(f"SELECT {group}, count(*) AS Contagem FROM ({' UNION ALL '.join(parts)}) "
+                            f"WHERE TRUE{not_null} GROUP BY {group} ORDER BY {group}", params)
+        cube = table.to_pandas()
+        tipos = list(frames)
+        cube.insert(0, 'Tipo de Aluno', pd.Categorical.from_codes(cube.pop('ordem'), categories=tipos, ordered=True))
+        first_frame = next(iter(frames.values()))
+        return cube.astype({dim: self._dtypes[first_frame][dim] for dim in dims})
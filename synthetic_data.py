@@ -0,0 +1,206 @@
+"""
+Gerador de datasets sintéticos no formato de dataset/ (ingressantes e egressos) em escala maior.
+
+Para cada arquivo real, aprende:
+  - a distribuição conjunta dos cursos (curso, modalidade, nível de ensino e unidade): cada unidade
+    mantém os seus cursos e o peso de cada um;
+  - condicionadas ao curso, as distribuições de sexo, forma de ingresso, status e das datas de
+    ingresso e conclusão (sorteadas em conjunto, preservando a distância ingresso-conclusão do curso);
+  - nomes: primeiro nome condicionado ao sexo e sobrenomes sorteados da lista de sobrenomes reais.
+
+Os arquivos gerados têm os mesmos nomes, colunas (na mesma ordem), aspas e separador ';' dos reais,
+com 'escala' vezes o número de linhas de cada um, e são determinísticos para a mesma semente.
+Com '--campi N', o catálogo de unidades e cursos é replicado em N campi (unidades com sufixo
+' - CAMPUS k' e ids deslocados), para simular a cardinalidade de uma instituição com vários campi.
+
+Uso (a partir da raiz do repositório):
+    python -m synthetic_data [--escala 10 100 1000] [--semente 42] [--campi N] [--saida dataset_sintetico]
+
+O resultado de cada escala fica em '<saida>/x<escala>/{ingressantes,egressos}'; para abrir o dashboard
+com ele, use DASHBOARD_DATASET=<saida>/x<escala>.
+"""
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loading import DATASET_FOLDER, extract_year_from_filename
+
+SUBFOLDERS = ['ingressantes', 'egressos']
+SYNTHETIC_FOLDER = "dataset_sintetico"
+# Linhas geradas e gravadas de cada vez (limita a memória em escalas grandes)
+CHUNK_ROWS = 500_000
+
+# Colunas que identificam o curso (e a sua unidade), sorteadas em conjunto de um aluno real
+COURSE_COLUMNS = ['id_curso', 'nome_curso', 'modalidade_educacao', 'sigla_nivel_ensino', 'nivel_ensino',
+                  'id_unidade', 'nome_unidade', 'id_unidade_gestora', 'nome_unidade_gestora']
+# Grupos de colunas copiados juntos de um aluno real do curso sorteado (um aluno por grupo)
+CONDITIONAL_GROUPS = [
+    ['sexo'],
+    ['forma_ingresso', 'tipo_discente'],
+    ['status'],
+    # Datas juntas: preserva a distância ingresso-conclusão de cada curso
+    ['ano_conclusao', 'periodo_conclusao', 'ano_ingresso', 'periodo_ingresso'],
+]
+# Colunas replicadas por campus
+CAMPUS_NAME_COLUMNS = ['nome_unidade', 'nome_unidade_gestora']
+CAMPUS_ID_COLUMNS = ['id_curso', 'id_unidade', 'id_unidade_gestora']
+CAMPUS_ID_OFFSET = 10 ** 10
+
+
+def read_raw_csv(path):
+    """Lê o CSV como texto, sem conversões, preservando valores vazios."""
+    return pd.read_csv(path, sep=';', dtype=str, keep_default_na=False)
+
+
+def learn_file_distribution(df):
+    """
+    Aprende, de um arquivo real, as distribuições usadas para gerar as linhas sintéticas.
+    Os alunos reais ficam ordenados por curso, de modo que os de cada curso ocupam um intervalo contíguo
+    ('course_start', 'course_size') do qual os 'doadores' de cada grupo de colunas são sorteados.
+    """
+    course_columns = [col for col in COURSE_COLUMNS if col in df.columns]
+    if course_columns:
+        course_codes = df.groupby(course_columns, sort=False).ngroup().to_numpy()
+    else:
+        course_codes = np.zeros(len(df), dtype=np.intp)
+    order = np.argsort(course_codes, kind='stable')
+    donors = df.iloc[order].reset_index(drop=True)
+    course_size = np.bincount(course_codes)
+    course_start = np.concatenate([[0], np.cumsum(course_size)[:-1]])
+
+    grouped = {col for group in CONDITIONAL_GROUPS for col in group}
+    generated = set(course_columns) | {'matricula', 'nome_discente'}
+    groups = [[col for col in group if col in df.columns] for group in CONDITIONAL_GROUPS]
+    # Colunas desconhecidas formam um grupo próprio, também condicionado ao curso
+    groups += [[col] for col in df.columns if col not in grouped and col not in generated]
+
+    names = df['nome_discente'].str.split() if 'nome_discente' in df.columns else pd.Series(dtype=object)
+    names = names[names.str.len() > 0]
+    sexo = df.loc[names.index, 'sexo'] if 'sexo' in df.columns else pd.Series('', index=names.index)
+    return {
+        'columns': list(df.columns),
+        'course_columns': course_columns,
+        'course_weights': course_size / course_size.sum(),
+        'course_start': course_start,
+        'course_size': course_size,
+        'donors': donors,
+        'groups': [group for group in groups if group],
+        'first_names': {value: names[sexo == value].str[0].to_numpy() for value in sexo.unique()},
+        'surnames': names.str[1:].explode().dropna().to_numpy(),
+        'name_lengths': names.str.len().to_numpy(),
+    }
+
+
+def synthetic_names(distribution, sexo, rng):
+    """Nomes com primeiro nome condicionado ao sexo e sobrenomes sorteados, com o número de palavras real."""
+    first_names = distribution['first_names']
+    surnames = distribution['surnames']
+    lengths = rng.choice(distribution['name_lengths'], size=len(sexo))
+    first = np.empty(len(sexo), dtype=object)
+    for value, pool in first_names.items():
+        mask = sexo == value
+        first[mask] = rng.choice(pool, size=mask.sum())
+    picks = surnames[rng.integers(len(surnames), size=(len(sexo), max(lengths.max() - 1, 0)))] \
+        if len(surnames) else np.empty((len(sexo), 0), dtype=object)
+    return [' '.join([f, *row[:n - 1]]) for f, row, n in zip(first, picks, lengths)]
+
+
+def generate_rows(distribution, n_rows, rng, first_id, id_width, year, campuses=1):
+    """Gera 'n_rows' linhas sintéticas (texto, na ordem de colunas do arquivo real)."""
+    donors = distribution['donors']
+    course = rng.choice(len(distribution['course_size']), size=n_rows, p=distribution['course_weights'])
+    start, size = distribution['course_start'][course], distribution['course_size'][course]
+
+    columns = {}
+    course_donor = start + (rng.random(n_rows) * size).astype(np.intp)
+    for col in distribution['course_columns']:
+        columns[col] = donors[col].to_numpy()[course_donor]
+    for group in distribution['groups']:
+        donor = start + (rng.random(n_rows) * size).astype(np.intp)
+        for col in group:
+            columns[col] = donors[col].to_numpy()[donor]
+
+    if 'matricula' in distribution['columns']:
+        # Matrículas únicas no arquivo (ano + sequencial), para que nenhuma linha seja descartada como duplicata
+        columns['matricula'] = [f"{year}{i:0{id_width}d}" for i in range(first_id, first_id + n_rows)]
+    if 'nome_discente' in distribution['columns']:
+        sexo = columns['sexo'] if 'sexo' in columns else np.full(n_rows, '', dtype=object)
+        columns['nome_discente'] = synthetic_names(distribution, sexo, rng)
+
+    rows = pd.DataFrame(columns)
+    if campuses > 1:
+        campus = rng.integers(campuses, size=n_rows)
+        replicated = campus > 0
+        for col in CAMPUS_NAME_COLUMNS:
+            if col in rows.columns:
+                filled = replicated & (rows[col] != '')
+                rows.loc[filled, col] = rows.loc[filled, col] + ' - CAMPUS ' + pd.Series(campus + 1).astype(str)[filled]
+        for col in CAMPUS_ID_COLUMNS:
+            if col in rows.columns:
+                filled = replicated & (rows[col] != '')
+                ids = pd.to_numeric(rows.loc[filled, col]) + campus[filled] * CAMPUS_ID_OFFSET
+                rows.loc[filled, col] = ids.astype(str)
+    return rows[distribution['columns']]
+
+
+def generate_file(source_path, output_path, scale, seed, file_index, campuses=1, chunk_rows=CHUNK_ROWS):
+    """
+    Gera o arquivo sintético correspondente a 'source_path' com 'scale' vezes o número de linhas,
+    em blocos de 'chunk_rows' linhas. Cada bloco usa um gerador derivado de (semente, arquivo, bloco).
+    Retorna o número de linhas gravadas.
+    """
+    real = read_raw_csv(source_path)
+    distribution = learn_file_distribution(real)
+    n_rows = int(round(len(real) * scale))
+    year = extract_year_from_filename(os.path.basename(source_path)) or 0
+    id_width = max(7, len(str(n_rows)))
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        pd.DataFrame(columns=distribution['columns']).to_csv(f, sep=';', index=False, quoting=csv.QUOTE_ALL)
+        for chunk_index, first_id in enumerate(range(0, n_rows, chunk_rows)):
+            rng = np.random.default_rng([seed, file_index, chunk_index])
+            rows = generate_rows(distribution, min(chunk_rows, n_rows - first_id), rng, first_id, id_width, year,
+                                 campuses)
+            rows.to_csv(f, sep=';', index=False, header=False, quoting=csv.QUOTE_ALL)
+    return n_rows
+
+
+def generate_dataset(output_folder, scale, seed=42, campuses=1, source_folder=DATASET_FOLDER):
+    """Gera todos os arquivos de ingressantes e egressos de 'source_folder' em 'output_folder'."""
+    written = {}
+    for subfolder_index, subfolder in enumerate(SUBFOLDERS):
+        source_dir = os.path.join(source_folder, subfolder)
+        files = sorted(f for f in os.listdir(source_dir) if f.endswith('.csv'))
+        for file_index, file_name in enumerate(files):
+            written[os.path.join(subfolder, file_name)] = generate_file(
+                os.path.join(source_dir, file_name), os.path.join(output_folder, subfolder, file_name),
+                scale, seed, subfolder_index * 1000 + file_index, campuses
+            )
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', type=float, nargs='+', default=[10],
+                        help="Multiplicadores do número de linhas (ex.: 10 100 1000).")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--campi', type=int, default=1, help="Número de campi com o catálogo de cursos replicado.")
+    parser.add_argument('--origem', default=DATASET_FOLDER, help="Pasta com os dados reais.")
+    parser.add_argument('--saida', default=SYNTHETIC_FOLDER, help="Pasta onde gravar os datasets gerados.")
+    args = parser.parse_args()
+
+    for scale in args.escala:
+        output_folder = os.path.join(args.saida, f"x{scale:g}")
+        start = time.perf_counter()
+        written = generate_dataset(output_folder, scale, args.semente, args.campi, args.origem)
+        print(f"{output_folder}: {sum(written.values())} linhas em {len(written)} arquivos "
+              f"({time.perf_counter() - start:.1f} s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import classification_dataset, regression_dataset
+from batch_scoring import (COLUNA_DESEMPENHO, COLUNA_OBSERVACAO, COLUNA_PERIODOS, invalid_inputs, prepare_features,
+                           read_student_chunks, score_chunk, score_csv)
+from ml_pipeline import train_classifier, train_regression_bundle
+
+CURSOS = ['DIREITO', 'MEDICINA', 'FÍSICA']
+
+# Arquivo enviado: uma linha válida e uma para cada caso que o modelo não sabe (ou sabe) pontuar
+CSV = """matricula;nivel_ensino;sexo;nome_curso;nome_unidade;ano_ingresso
+1;GRADUAÇÃO;M;DIREITO;CCSA;2018
+2;GRADUAÇÃO;F;ASTRONOMIA;CCSA;2018
+3;MESTRADO;F;MEDICINA;CCS;dois mil
+4;GRADUAÇÃO;M;FÍSICA;CCS;1850
+5;GRADUAÇÃO;F;DIREITO;CCSA;
+6;graduação; feminino ; direito ;ccsa;2019
+"""
+
+
+@pytest.fixture(scope='module')
+def egressos():
+    rng = np.random.default_rng(0)
+    n = 400
+    return pd.DataFrame({
+        'nivel_ensino': rng.choice(['GRADUAÇÃO', 'MESTRADO'], n),
+        'sexo': rng.choice(['M', 'F'], n),
+        'nome_curso': rng.choice(CURSOS, n),
+        'nome_unidade': rng.choice(['CCSA', 'CCS'], n),
+        'ano_ingresso': rng.integers(2010, 2020, n),
+        'total_periodos': rng.integers(6, 14, n).astype(float),
+    })
+
+
+@pytest.fixture(scope='module')
+def classification_bundle(egressos):
+    X, y, encoders = classification_dataset(egressos, 9)
+    model = train_classifier('decision_tree_classifier', {'max_depth': 3, 'random_state': 0}, X, y,
+                             [len(encoders[col].classes_) for col in X.columns])
+    return {'model': model, 'encoders': encoders, 'feature_columns': list(X.columns)}
+
+
+@pytest.fixture(scope='module')
+def regression_bundle(egressos):
+    X, y = regression_dataset(egressos)
+    return train_regression_bundle('random_forest_regressor', {'n_estimators': 5, 'random_state': 0}, X, y)
+
+
+def _chunk():
+    return next(iter(read_student_chunks(io.StringIO(CSV), chunksize=100)))
+
+
+def test_invalid_inputs_flags_unseen_categories_and_bad_numbers(regression_bundle):
+    invalid = invalid_inputs(prepare_features(_chunk()), regression_bundle)
+
+    assert invalid['nome_curso'].tolist() == [False, True, False, False, False, False]
+    # Texto e vazio viram NaN em prepare_features; anos fora da faixa do treino continuam pontuáveis
+    assert invalid['ano_ingresso'].tolist() == [False, False, True, False, True, False]
+    assert not invalid[['nivel_ensino', 'sexo', 'nome_unidade']].any().any()
+
+
+def test_score_chunk_adds_predictions_and_notes(classification_bundle, regression_bundle):
+    chunk = _chunk()
+    scored = score_chunk(chunk, classification_bundle, regression_bundle)
+
+    # O arquivo original é devolvido sem alterações, com as colunas de predição ao final
+    pd.testing.assert_frame_equal(scored[chunk.columns], chunk)
+    assert list(scored.columns[len(chunk.columns):]) == [
+        COLUNA_DESEMPENHO, 'probabilidade_curto', 'probabilidade_longo', COLUNA_PERIODOS, COLUNA_OBSERVACAO]
+
+    # Curso não visto: sem predição em nenhum dos modelos
+    assert scored.loc[1, COLUNA_DESEMPENHO] == '' and np.isnan(scored.loc[1, COLUNA_PERIODOS])
+    # ano_ingresso só é feature da regressão: a classificação pontua as linhas 2 e 4
+    assert scored.loc[[2, 4], COLUNA_DESEMPENHO].isin(['Curto', 'Longo']).all()
+    assert scored.loc[[2, 4], COLUNA_PERIODOS].isna().all()
+    assert scored[COLUNA_OBSERVACAO].tolist() == [
+        '',
+        'valor inválido ou não visto no treino: nome_curso',
+        'valor inválido ou não visto no treino: ano_ingresso',
+        '',
+        'valor inválido ou não visto no treino: ano_ingresso',
+        '',
+    ]
+
+    valid = scored[COLUNA_OBSERVACAO] == ''
+    assert scored.loc[valid, COLUNA_DESEMPENHO].isin(['Curto', 'Longo']).all()
+    assert scored.loc[valid, COLUNA_PERIODOS].between(6, 14).all()
+    probabilities = scored.loc[valid, ['probabilidade_curto', 'probabilidade_longo']].sum(axis=1)
+    assert np.allclose(probabilities, 1, atol=1e-3)
+
+
+def test_score_chunk_standardizes_values_like_the_loaders(classification_bundle, regression_bundle):
+    scored = score_chunk(_chunk(), classification_bundle, regression_bundle)
+    standardized = _chunk().iloc[[5]].assign(nivel_ensino='GRADUAÇÃO', sexo='F', nome_curso='DIREITO', nome_unidade='CCSA')
+    reference = score_chunk(standardized, classification_bundle, regression_bundle)
+
+    # ' feminino ', ' direito ' e 'ccsa' são padronizados como nos carregadores
+    assert scored.loc[5, COLUNA_OBSERVACAO] == ''
+    assert scored.loc[5, COLUNA_DESEMPENHO] == reference.loc[5, COLUNA_DESEMPENHO]
+    assert scored.loc[5, COLUNA_PERIODOS] == reference.loc[5, COLUNA_PERIODOS]
+
+
+def test_score_chunk_with_a_single_model(regression_bundle):
+    scored = score_chunk(_chunk(), regression_bundle=regression_bundle)
+
+    assert COLUNA_DESEMPENHO not in scored.columns
+    assert scored[COLUNA_PERIODOS].notna().tolist() == [True, False, False, True, False, True]
+
+
+@pytest.mark.parametrize('chunksize', [1, 2, 4, 100])
+def test_score_csv_is_independent_of_chunk_boundaries(classification_bundle, regression_bundle, chunksize):
+    expected = score_chunk(_chunk(), classification_bundle, regression_bundle)
+    output = score_csv(io.BytesIO(CSV.encode()), classification_bundle, regression_bundle, chunksize=chunksize)
+    text = output.getvalue().decode('utf-8')
+
+    # Cabeçalho só no primeiro bloco
+    assert text.count('matricula;') == 1
+    scored = pd.read_csv(io.StringIO(text), sep=';', dtype=str, keep_default_na=False)
+    assert scored[COLUNA_OBSERVACAO].tolist() == expected[COLUNA_OBSERVACAO].tolist()
+    assert scored[COLUNA_DESEMPENHO].tolist() == expected[COLUNA_DESEMPENHO].tolist()
+    np.testing.assert_allclose(pd.to_numeric(scored[COLUNA_PERIODOS]), expected[COLUNA_PERIODOS])
+    assert scored['nome_curso'].tolist() == ['DIREITO', 'ASTRONOMIA', 'MEDICINA', 'FÍSICA', 'DIREITO', ' direito ']
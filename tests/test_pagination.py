@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import paginate_dataframe, sort_order
+
+
+def _frame(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'matricula': np.arange(n) * 7 + 1,
+        'nome_discente': [f'aluno {i}' for i in range(n)],
+        'sexo': rng.choice(['M', 'F', 'INDEFINIDO'], n),
+        'ano': rng.integers(2014, 2025, n),
+        'periodo_ingresso': np.where(rng.random(n) < 0.1, np.nan, rng.integers(1, 3, n)),
+    })
+
+
+def _all_pages(df, page_size, **kwargs):
+    _, total_pages = paginate_dataframe(df, page_size, 1, **kwargs)
+    return [paginate_dataframe(df, page_size, page, **kwargs)[0] for page in range(1, total_pages + 1)]
+
+
+@pytest.mark.parametrize('sort_column', ['sexo', 'ano', 'periodo_ingresso', 'matricula', None])
+@pytest.mark.parametrize('ascending', [True, False])
+def test_pages_partition_rows_with_ties(sort_column, ascending):
+    df = _frame()
+    pages = _all_pages(df, 50, sort_column=sort_column, ascending=ascending)
+    matriculas = pd.concat(pages)['matricula']
+
+    assert len(matriculas) == len(df)
+    assert matriculas.is_unique
+
+
+@pytest.mark.parametrize('ascending', [True, False])
+def test_ties_follow_original_position(ascending):
+    df = _frame()
+    paged = pd.concat(_all_pages(df, 50, sort_column='ano', ascending=ascending))
+    expected = df.sort_values('ano', ascending=ascending, kind='stable')
+
+    assert paged['matricula'].tolist() == expected['matricula'].tolist()
+
+
+def test_hidden_columns_and_page_bounds():
+    df = _frame(n=120)
+    page, total_pages = paginate_dataframe(df, 50, 10)
+
+    assert total_pages == 3
+    assert len(page) == 20
+    assert 'nome_discente' not in page.columns
+
+
+@pytest.mark.parametrize('ascending', [True, False])
+def test_precomputed_order_gives_the_same_pages(ascending):
+    df = _frame()
+    order = sort_order(df, 'sexo', ascending)
+
+    for page_number in (1, 7, 100):
+        page, _ = paginate_dataframe(df, 50, page_number, sort_column='sexo', ascending=ascending)
+        cached, _ = paginate_dataframe(df, 50, page_number, sort_column='sexo', ascending=ascending, order=order)
+        pd.testing.assert_frame_equal(cached, page)
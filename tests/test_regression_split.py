@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from analytics import REGRESSION_SPLIT, regression_dataset, regression_split
+
+
+def _egressos(years, rows_per_year=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for year in years:
+        frames.append(pd.DataFrame({
+            'matricula': [f"{year}{i:05d}" for i in range(rows_per_year)],
+            'nivel_ensino': rng.choice(['GRADUAÇÃO', 'MESTRADO'], rows_per_year),
+            'sexo': rng.choice(['M', 'F'], rows_per_year),
+            'nome_curso': rng.choice(['DIREITO', 'MEDICINA', 'FÍSICA'], rows_per_year),
+            'nome_unidade': rng.choice(['CCSA', 'CCS'], rows_per_year),
+            'ano_ingresso': year - rng.integers(3, 7, rows_per_year),
+            'total_periodos': rng.integers(6, 14, rows_per_year).astype(float),
+            'ano': year,
+        }))
+    # Como na concatenação dos arquivos: o índice das linhas muda quando um ano é acrescentado
+    return pd.concat(frames, ignore_index=True).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def _split_sides(egressos):
+    X, y = regression_dataset(egressos)
+    X_train, X_test, _, _ = regression_split(egressos, X, y)
+    return set(egressos.loc[X_train.index, 'matricula']), set(egressos.loc[X_test.index, 'matricula'])
+
+
+def test_new_year_does_not_move_training_rows_to_test():
+    base_train, base_test = _split_sides(_egressos([2018, 2019, 2020]))
+    train, test = _split_sides(_egressos([2018, 2019, 2020, 2021], seed=1))
+
+    assert base_train <= train
+    assert base_test <= test
+    assert not base_train & test
+
+
+def test_split_matches_requested_test_size():
+    egressos = _egressos([2018, 2019, 2020])
+    X, y = regression_dataset(egressos)
+    X_train, X_test, y_train, y_test = regression_split(egressos, X, y)
+
+    assert len(X_train) + len(X_test) == len(X)
+    assert X_train.index.equals(y_train.index) and X_test.index.equals(y_test.index)
+    assert abs(len(X_test) / len(X) - REGRESSION_SPLIT['test_size']) < 0.02
+
+
+def test_falls_back_to_random_split_without_id_column():
+    egressos = _egressos([2018]).drop(columns='matricula')
+    X, y = regression_dataset(egressos)
+    X_train, X_test, _, _ = regression_split(egressos, X, y)
+
+    assert len(X_test) == round(len(X) * REGRESSION_SPLIT['test_size'])
+    assert not X_train.index.intersection(X_test.index).size
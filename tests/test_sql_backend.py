@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('duckdb')
+
+from analytics import filter_rows
+from figures import build_count_cube, count_rows
+from sql_backend import DuckDBBackend
+
+FILTER_STATES = {
+    'todos': {'anos': [2015, 2024]},
+    'anos_e_unidade': {'anos': [2017, 2020], 'niveis_ensino': ['GRADUAÇÃO', 'MESTRADO'], 'unidades': ['CCSA']},
+    'listas_vazias': {'anos': [2015, 2024], 'niveis_ensino': ['GRADUAÇÃO', 'MESTRADO', 'DESCONHECIDO'],
+                      'unidades': [], 'cursos': [], 'sexos': []},
+    'sem_niveis': {'anos': [2015, 2024], 'niveis_ensino': []},
+    'desconhecidos': {'anos': [2015, 2024], 'niveis_ensino': ['DESCONHECIDO'], 'cursos': ['DESCONHECIDO', 'DIREITO']},
+    'sexo_e_curso': {'anos': [2016, 2023], 'sexos': ['F'], 'cursos': ['MEDICINA']},
+}
+
+
+def _frame(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'matricula': np.arange(n) * 3 + seed,
+        'ano': rng.integers(2015, 2025, n),
+        # Placeholders do carregamento (data_loading) para nível e curso ausentes
+        'nivel_ensino': rng.choice(['GRADUAÇÃO', 'MESTRADO', 'DESCONHECIDO'], n),
+        # Textos ausentes como o pandas lê dos CSVs (NaN)
+        'sexo': pd.Series(rng.choice(['M', 'F'], n)).mask(rng.random(n) < 0.1),
+        'nome_curso': rng.choice(['DIREITO', 'MEDICINA', 'DESCONHECIDO'], n),
+        'nome_unidade': pd.Series(rng.choice(['CCSA', 'CCS'], n)).mask(rng.random(n) < 0.1),
+    }).sample(frac=1, random_state=seed).set_index(pd.RangeIndex(n) * 2)
+
+
+@pytest.fixture(scope='module')
+def frames():
+    return {'ingressantes': _frame(3000, 1), 'egressos': _frame(2000, 2)}
+
+
+@pytest.fixture(scope='module')
+def backend(frames, tmp_path_factory):
+    return DuckDBBackend(frames, parquet_folder=str(tmp_path_factory.mktemp('parquet')), threads=1)
+
+
+@pytest.mark.parametrize('state', FILTER_STATES, ids=str)
+@pytest.mark.parametrize('name', ['ingressantes', 'egressos'])
+def test_filter_rows_matches_pandas(frames, backend, name, state):
+    expected = filter_rows(frames[name], FILTER_STATES[state])
+    result = backend.filter_rows(name, FILTER_STATES[state])
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize('state', FILTER_STATES, ids=str)
+@pytest.mark.parametrize('dims', [['ano'], ['sexo', 'nivel_ensino'], ['nome_curso', 'nome_unidade']], ids=str)
+def test_count_rows_matches_pandas(frames, backend, state, dims):
+    filtered = filter_rows(frames['egressos'], FILTER_STATES[state])
+    result = backend.count_rows('egressos', FILTER_STATES[state], dims)
+
+    if filtered.empty and filtered.columns.empty:
+        # Sem níveis de ensino o filtro em pandas não tem colunas; o SQL devolve a tabela de contagens vazia
+        assert result.empty and list(result.columns) == dims + ['count']
+    else:
+        pd.testing.assert_frame_equal(result, count_rows(filtered, dims))
+
+
+@pytest.mark.parametrize('state', FILTER_STATES, ids=str)
+def test_count_cube_matches_pandas(frames, backend, state):
+    tipos = {'Ingressantes': 'ingressantes', 'Egressos': 'egressos'}
+    expected = build_count_cube({tipo: filter_rows(frames[name], FILTER_STATES[state]) for tipo, name in tipos.items()})
+    result = backend.count_cube(tipos, FILTER_STATES[state])
+
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Número máximo de slots com o último resultado bom guardado em memória
+MAX_SLOTS = 32
+
+
+class TrainingService:
+    """
+    Fila de treinamento em segundo plano, compartilhada por todas as sessões do processo.
+    Os treinos rodam em um pool de 'max_workers' threads, fora do rerun interativo.
+    Pedidos repetidos para a mesma chave enquanto o treino está em andamento são agrupados
+    em um único job, e o último modelo treinado com sucesso de cada 'slot' fica disponível
+    para ser exibido enquanto um novo modelo é treinado. Apenas os 'max_slots' slots usados mais
+    recentemente são mantidos em memória (os resultados continuam no registro em disco).
+
+    'observer(slot, resultado, guardado)', se informado, é chamado fora do lock quando o resultado de um
+    slot é guardado (guardado=True) ou lido, e com resultado None quando o slot sai da memória
+    (ex.: para a contabilidade de memória, que pode descartar slots com forget).
+    """
+
+    def __init__(self, max_workers=1, max_slots=MAX_SLOTS, observer=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='training')
+        self._lock = threading.Lock()
+        self._jobs = {}       # chave -> Future dos treinos em andamento
+        self._errors = {}     # chave -> mensagem do último erro de treino
+        self._last_good = OrderedDict()  # slot -> (chave, resultado) do último treino bem-sucedido, em ordem de uso
+        self._max_slots = max_slots
+        self._observer = observer
+
+    def submit(self, key, train_fn, slot=None):
+        """Agenda train_fn() para 'key', a menos que já exista um treino em andamento para ela."""
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is not None:
+                return future
+            self._errors.pop(key, None)
+            future = self._executor.submit(train_fn)
+            self._jobs[key] = future
+        future.add_done_callback(lambda done: self._finish(key, slot, done))
+        return future
+
+    def _finish(self, key, slot, future):
+        dropped = []
+        with self._lock:
+            self._jobs.pop(key, None)
+            error = future.exception()
+            if error is not None:
+                self._errors[key] = str(error)
+            elif slot is not None:
+                dropped = self._store(slot, key, future.result())
+        if error is None and slot is not None:
+            self._notify(slot, future.result(), dropped)
+
+    def _store(self, slot, key, result):
+        # Chamado com o lock; descarta os slots usados há mais tempo além de max_slots e retorna os descartados
+        self._last_good[slot] = (key, result)
+        self._last_good.move_to_end(slot)
+        dropped = []
+        while len(self._last_good) > self._max_slots:
+            dropped.append(self._last_good.popitem(last=False)[0])
+        return dropped
+
+    def _notify(self, slot, result, dropped=(), stored=True):
+        if self._observer is None:
+            return
+        self._observer(slot, result, stored)
+        for dropped_slot in dropped:
+            self._observer(dropped_slot, None, False)
+
+    def status(self, key):
+        """'training', 'failed' ou 'idle' para a chave informada."""
+        with self._lock:
+            if key in self._jobs:
+                return 'training'
+            if key in self._errors:
+                return 'failed'
+            return 'idle'
+
+    def error(self, key):
+        """Mensagem do último erro de treino da chave, se houver."""
+        with self._lock:
+            return self._errors.get(key)
+
+    def last_good(self, slot):
+        """(chave, resultado) do último treino bem-sucedido do slot, ou (None, None)."""
+        with self._lock:
+            if slot not in self._last_good:
+                return None, None
+            self._last_good.move_to_end(slot)
+            key, result = self._last_good[slot]
+        self._notify(slot, result, stored=False)
+        return key, result
+
+    def remember(self, slot, key, result):
+        """Registra um resultado obtido fora do serviço (ex.: carregado do disco) como o último bom do slot."""
+        with self._lock:
+            dropped = self._store(slot, key, result)
+        self._notify(slot, result, dropped)
+
+    def forget(self, slot):
+        """Tira o último resultado bom do slot da memória (ele continua no registro em disco)."""
+        with self._lock:
+            self._last_good.pop(slot, None)